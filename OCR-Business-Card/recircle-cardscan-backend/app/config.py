@@ -7,6 +7,10 @@ class Settings(BaseSettings):
     
     MAX_FILE_SIZE_MB: int = 10
     MAX_FILES_PER_BATCH: int = 300
+    MAX_BATCH_SIZE_MB: int = 20
+    UPLOAD_WRITE_CONCURRENCY: int = 8  # Uploads of one batch copied to storage at once
+    UPLOAD_CHUNK_SIZE_MB: int = 1  # Chunk size suggested to resumable upload clients
+    UPLOAD_SESSION_TTL_HOURS: int = 24  # Unfinished resumable uploads are discarded after this
     ALLOWED_EXTENSIONS: str = "jpg,jpeg,png,pdf"
     TEMP_STORAGE_PATH: str = "./storage"
     OUTPUT_CSV_PATH: str = "./output"
@@ -15,6 +19,79 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = ""
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-2.0-flash-exp"
+    GEMINI_MAX_CONCURRENT_CALLS: int = 8
+    GEMINI_RATE_LIMIT_RPS: float = 5.0  # Upper bound; adapts down on 429/quota errors
+    GEMINI_MIN_RATE_RPS: float = 0.2
+    GEMINI_RATE_LIMIT_BURST: int = 10
+    # Opt-in model-path changes; all off by default, so requests match earlier releases until enabled
+    GEMINI_STREAMING: bool = False  # Stream responses to send partial fields over WebSocket
+    GEMINI_STRUCTURED_OUTPUT: bool = False  # Schema-constrained JSON responses
+    GEMINI_FUSED_VALIDATION: bool = False  # One model call returns validation verdict and records
+    GEMINI_BATCH_SIZE: int = 1  # Max images packed into one extraction request (1 disables packing, e.g. 4 to enable)
+    GEMINI_BATCH_MAX_MB: int = 15
+    GEMINI_BATCH_MAX_INPUT_TOKENS: int = 20000
+
+    # Model backend: gemini, record (gemini + save responses), fake (canned JSON) or replay (recorded JSON)
+    MODEL_BACKEND: str = "gemini"
+    MODEL_RECORDINGS_PATH: str = "./storage/model_recordings"
+    FAKE_MODEL_LATENCY_MS: int = 1500  # Median latency
+    FAKE_MODEL_LATENCY_SIGMA: float = 0.4  # Log-normal spread
+    FAKE_MODEL_ERROR_RATE: float = 0.0
+    FAKE_MODEL_429_RATE: float = 0.0  # Chance a call starts a burst of 429 errors
+    FAKE_MODEL_429_BURST_LENGTH: int = 5
+    FAKE_MODEL_SEED: int = 42
+
+    # Local-first extraction cascade: local OCR + regex, the model only for missing or low-confidence fields
+    EXTRACTION_CASCADE_ENABLED: bool = False
+    LOCAL_TEXT_DETECTOR: str = "tesseract"  # tesseract, sidecar (<image>.txt) or none
+    LOCAL_OCR_LANG: str = "eng"
+    LOCAL_OCR_LONG_EDGE: int = 2000
+    LOCAL_FIELD_MIN_CONFIDENCE: float = 0.8
+    LOCAL_MIN_ACCEPTED_FIELDS: int = 2  # Fewer confident fields means the local text is unusable
+
+    # Local card detection: multi-card photos are split into per-card crops extracted in parallel
+    CARD_DETECTION_ENABLED: bool = False
+    CARD_MIN_AREA_RATIO: float = 0.04  # Smallest card, as a share of the photo
+    CARD_SINGLE_MIN_AREA_RATIO: float = 0.2  # A lone detection smaller than this is a logo or label, not a card
+    CARD_CROP_MAX_AREA_RATIO: float = 0.85  # A lone card filling more of the photo is sent uncropped
+
+    # Local pre-screen: obvious cards and non-cards skip the model validation call
+    PRESCREEN_ENABLED: bool = False
+    PRESCREEN_CALIBRATION_PATH: str = "./prescreen_calibration.json"  # Written by calibrate_prescreen.py
+
+    # Image upload settings (long edge 0 sends full resolution; the defaults send what the SDK sent
+    # for a PIL image: full-size lossless WebP. 1600 / JPEG / 85 cuts upload size several times)
+    MODEL_IMAGE_LONG_EDGE: int = 0
+    MODEL_IMAGE_FORMAT: str = "WEBP"  # JPEG, WEBP or PNG
+    MODEL_IMAGE_QUALITY: int = 0  # 0 = lossless WebP (JPEG has no lossless mode and uses 95)
+    CPU_POOL_WORKERS: int = 0  # Processes for enhancement, PDF rasterization and thumbnails (0 = one per core)
+
+    # Digitally generated PDFs are extracted from their text layer without rasterizing
+    PDF_TEXT_LAYER_ENABLED: bool = False
+    PDF_TEXT_MIN_CHARS: int = 20  # Fewer characters on a page means it is a scan
+
+    # PDF rasterization: pages are rendered a window at a time and passed to extraction in memory
+    PDF_RASTER_DPI: int = 300
+    PDF_PAGE_WINDOW: int = 2  # Pages rendered and held at once
+    PDF_RASTER_THREADS: int = 2  # pdftoppm processes per window
+    PDF_PAGE_CONCURRENCY: int = 4  # Pages of one PDF extracted at once (model calls are still capped globally)
+    PDF_PAIR_CARD_SIDES: bool = False  # Send consecutive card-sized pages as front and back in one request
+
+    # Preview renders: page-1 previews of PDFs and thumbnails, cached per file content
+    PREVIEW_CACHE_PATH: str = "./storage/preview_cache"
+    PREVIEW_CACHE_MAX_MB: int = 200
+    PREVIEW_THUMBNAIL_SIZES: str = "160,320,640"  # Long edges; a requested size snaps up to the next one
+    PREVIEW_PDF_DPI: int = 150
+
+    # Near-duplicate detection (max differing bits of a 64-bit dHash)
+    DUPLICATE_HASH_THRESHOLD: int = 6
+    DUPLICATE_INDEX_MAX_ENTRIES: int = 20000
+
+    # Extraction result cache settings (also how records from fused /validate reach /process)
+    EXTRACTION_CACHE_ENABLED: bool = False
+    EXTRACTION_CACHE_PATH: str = "./storage/extraction_cache"
+    EXTRACTION_CACHE_MAX_ENTRIES: int = 5000
+    EXTRACTION_CACHE_MAX_MB: int = 100
     
     # MySQL Database settings
     DB_HOST: str = "localhost"
@@ -18,6 +18,15 @@ class DataStore:
         with self._lock:
             return self._data.get(batch_id, [])
     
+    def get_file_records(self, file_id: str) -> List[Dict]:
+        """Get extracted records of one file from whichever batch holds it"""
+        with self._lock:
+            for records in self._data.values():
+                file_records = [record for record in records if record.get("file_id") == file_id]
+                if file_records:
+                    return file_records
+            return []
+    
     def clear_batch_data(self, batch_id: str):
         """Clear data for a batch"""
         with self._lock:
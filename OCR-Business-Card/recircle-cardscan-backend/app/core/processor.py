@@ -1,11 +1,14 @@
-from app.services.gemini_service import GeminiService
+from app.services.service_registry import get_gemini_service
 from app.services.csv_writer import CSVWriter
 from app.services.pdf_converter import PDFConverter
+from app.services.cpu_pool import cpu_pool
 from app.core.resource_manager import resource_manager
 from app.core.data_store import data_store
+from app.services.duplicate_index import duplicate_index
 from app.utils.logger import app_logger
+from app.config import settings
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import os
 import asyncio
 
@@ -14,7 +17,7 @@ class FileProcessor:
     
     def __init__(self, batch_id: str):
         self.batch_id = batch_id
-        self.gemini_service = GeminiService()
+        self.gemini_service = get_gemini_service()
         self.pdf_converter = PDFConverter()
         import threading
 
@@ -36,6 +39,36 @@ class FileProcessor:
         """Process one file through complete cycle with card side merging"""
         await resource_manager.acquire_file_slot(self.batch_id)
         
+        try:
+            await self._process_file(file_info)
+        finally:
+            resource_manager.release_file_slot(self.batch_id)
+    
+    async def process_image_group(self, group: List[Dict]) -> None:
+        """Extract a group of images in one packed model request and process each, holding one file slot
+        
+        A file that fails is logged and does not stop the rest of its group.
+        """
+        await resource_manager.acquire_file_slot(self.batch_id)
+        
+        try:
+            prefetched = {}
+            if len(group) > 1:
+                try:
+                    prefetched = await self.gemini_service.extract_batch([f['file_path'] for f in group])
+                except Exception as e:
+                    app_logger.error(f"[PROCESSOR] Batched extraction failed, extracting per file: {e}")
+            
+            for file_info in group:
+                try:
+                    await self._process_file(file_info, prefetched.get(file_info['file_path']))
+                except Exception as e:
+                    app_logger.error(f"[QUEUE] Error processing file {file_info['filename']}: {e}")
+        finally:
+            resource_manager.release_file_slot(self.batch_id)
+    
+    async def _process_file(self, file_info: Dict, prefetched_records: List[Dict] = None) -> None:
+        """Process one file; the caller holds its file slot"""
         try:
             file_key = f"{file_info['filename']}_{file_info.get('file_id', '')}"
             if file_key in self.processed_files:
@@ -46,33 +79,35 @@ class FileProcessor:
             
             self.processed_files.add(file_key)
             
+            # Exact re-uploads of an earlier file reuse its extraction
+            reused_records = duplicate_index.get_reused_records(file_info['file_id'])
+            
             # Handle PDF or Image
-            if file_info['file_type'] == 'application/pdf':
-                images = self.pdf_converter.convert_pdf_to_images(file_info['file_path'])
-                if not images:
+            if reused_records is not None:
+                app_logger.info(f"[PROCESSOR] {file_info['filename']} duplicates {file_info.get('duplicate_of_filename')}, reusing extraction")
+                extracted_records = reused_records
+            elif file_info['file_type'] == 'application/pdf':
+                # Digitally generated PDFs are read from their text layer; the rest are rasterized
+                page_records = await self.gemini_service.extract_pdf_text_layer(file_info['file_path'])
+                if page_records is not None:
+                    all_extracted_data = [record for records in page_records for record in records]
+                    self._update_page_progress(file_info['filename'], len(page_records), len(page_records))
+                else:
+                    all_extracted_data = await self._extract_pdf_pages(file_info)
+                if all_extracted_data is None:
                     return
                 
-                all_extracted_data = []
-                temp_image_paths = []
-                
-                for page_num, image in enumerate(images):
-                    temp_image_path = file_info['file_path'].replace('.pdf', f'_page{page_num+1}.jpg')
-                    image.save(temp_image_path)
-                    temp_image_paths.append(temp_image_path)
-                    
-                    page_data = await self.gemini_service.extract_document_data(temp_image_path)
-                    all_extracted_data.extend(page_data)
-                
-                for temp_path in temp_image_paths:
-                    os.remove(temp_path)
-                
                 extracted_records = self._combine_multi_page_data(all_extracted_data)
             else:
                 processing_path = file_info['file_path']
                 
-                extracted_records = await self.gemini_service.extract_document_data(processing_path)
+                if prefetched_records is not None:
+                    extracted_records = prefetched_records
+                else:
+                    extracted_records = await self.gemini_service.extract_document_data(processing_path)
             
-            pass
+            if extracted_records and reused_records is None:
+                duplicate_index.record_extraction(file_info['file_id'], extracted_records)
             
             # Store extracted records
             with self.records_lock:
@@ -106,6 +141,7 @@ class FileProcessor:
                         "company_website": extracted_data.get("company_website", "N/A"),
                         "designation": extracted_data.get("designation", "N/A"),
                         "address": extracted_data.get("address", "N/A"),
+                        "prompt_version": extracted_data.get("prompt_version", "N/A"),
                         "image_data": image_data
                 
                     }
@@ -132,26 +168,42 @@ class FileProcessor:
             import traceback
             traceback.print_exc()
             raise e
-        finally:
-            resource_manager.release_file_slot(self.batch_id)
     
     async def process_all_files(self, files_list: List[Dict]) -> Dict:
         """Process all uploaded files with fair resource allocation"""
         app_logger.info(f"[PROCESSOR] Starting queue-based processing for {len(files_list)} files in batch {self.batch_id}")
         
+        # Images to extract are packed GEMINI_BATCH_SIZE to a model request; each group is one unit of work
+        units = []
+        group = []
+        for file_info in files_list:
+            if (settings.GEMINI_BATCH_SIZE > 1 and file_info['file_type'] != 'application/pdf'
+                    and duplicate_index.get_reused_records(file_info['file_id']) is None):
+                group.append(file_info)
+                if len(group) == settings.GEMINI_BATCH_SIZE:
+                    units.append(group)
+                    group = []
+            else:
+                units.append([file_info])
+        if group:
+            units.append(group)
+        
         semaphore = asyncio.Semaphore(3)
         
-        async def process_with_semaphore(file_info):
+        async def process_with_semaphore(unit):
             async with semaphore:
-                await self.process_single_file(file_info)
+                if len(unit) > 1:
+                    await self.process_image_group(unit)
+                else:
+                    await self.process_single_file(unit[0])
         
-        tasks = [process_with_semaphore(file_info) for file_info in files_list]
+        tasks = [process_with_semaphore(unit) for unit in units]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Log any exceptions
         for i, result in enumerate(results):
             if isinstance(result, Exception):
-                app_logger.error(f"[QUEUE] Error processing file {files_list[i]['filename']}: {result}")
+                app_logger.error(f"[QUEUE] Error processing file {units[i][0]['filename']}: {result}")
         
         # Store extracted records in memory (CSV will be generated on download)
         final_records = self.all_extracted_records
@@ -168,6 +220,74 @@ class FileProcessor:
             "queue_summary": f"Processed {len(files_list)} files, queued {len(final_records)} valid records"
         }
     
+    async def _extract_pdf_pages(self, file_info: Dict) -> Optional[List[Dict]]:
+        """Extract PDF pages concurrently, in page order; None if no page could be rendered
+        
+        Pages are extracted as they are rendered, at most PDF_PAGE_CONCURRENCY at a
+        time for this file, which holds one file slot; the model client and rate
+        limiter cap model calls across all files. Consecutive card-sized pages of
+        the same size are sent as front and back in one request.
+        """
+        pdf_path, filename = file_info['file_path'], file_info['filename']
+        try:
+            total_pages = await cpu_pool.run(PDFConverter.page_count, pdf_path)
+        except Exception as e:
+            app_logger.error(f"[PROCESSOR] Could not read page count of {filename}: {e}")
+            total_pages = None
+        self._update_page_progress(filename, total_pages, 0)
+        
+        semaphore = asyncio.Semaphore(max(1, settings.PDF_PAGE_CONCURRENCY))
+        tasks = []
+        extracted_pages = 0
+        
+        async def extract(pages: List[Tuple[int, bytes]]) -> List[Dict]:
+            nonlocal extracted_pages
+            try:
+                records = None
+                if len(pages) == 2:
+                    records = await self.gemini_service.extract_card_sides(pages[0][1], pages[1][1])
+                if records is None:
+                    records = []
+                    for _, page_image in pages:
+                        records.extend(await self.gemini_service.extract_document_data(page_image))
+                return records
+            finally:
+                semaphore.release()
+                extracted_pages += len(pages)
+                self._update_page_progress(filename, total_pages, extracted_pages)
+        
+        async def start(pages: List[Tuple[int, bytes]]) -> None:
+            # Waiting for a free slot also stops rendering further pages, which bounds memory
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(extract(pages)))
+        
+        front = None  # Odd page waiting to see whether the next page is its back
+        async for page in PDFConverter.stream_pages(pdf_path):
+            if front is not None:
+                if PDFConverter.is_card_side_pair(front[1], page[1]):
+                    await start([front, page])
+                    front = None
+                    continue
+                await start([front])
+                front = None
+            if settings.PDF_PAIR_CARD_SIDES and page[0] % 2 == 1:
+                front = page
+            else:
+                await start([page])
+        if front is not None:
+            await start([front])
+        
+        if not tasks:
+            return None
+        
+        all_extracted_data = []
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Exception):
+                app_logger.error(f"[PROCESSOR] Page extraction failed for {filename}: {result}")
+                continue
+            all_extracted_data.extend(result)
+        return all_extracted_data
+    
     def _combine_multi_page_data(self, all_data: List[Dict]) -> List[Dict]:
         """Combine data from multiple pages into complete records"""
         if not all_data:
@@ -211,6 +331,9 @@ class FileProcessor:
             
             if merged_record["address"] == "N/A" and record.get("address", "N/A") != "N/A":
                 merged_record["address"] = record["address"]
+            
+            if "prompt_version" not in merged_record and record.get("prompt_version"):
+                merged_record["prompt_version"] = record["prompt_version"]
         
         if all_phones:
             merged_record["phone"] = ','.join(list(dict.fromkeys(all_phones)))
@@ -242,6 +365,13 @@ class FileProcessor:
             if self.batch_id in self.processing_status:
                 self.processing_status[self.batch_id]["current_file"] = current_filename
     
+    def _update_page_progress(self, filename: str, total_pages: Optional[int], extracted_pages: int):
+        """Update the page progress of a PDF being extracted"""
+        with self.status_lock:
+            if self.batch_id in self.processing_status:
+                pages = self.processing_status[self.batch_id].setdefault("pages", {})
+                pages[filename] = {"total": total_pages, "extracted": extracted_pages}
+    
     def _update_progress(self, processed_count: int):
         """Update the progress count"""
         with self.status_lock:
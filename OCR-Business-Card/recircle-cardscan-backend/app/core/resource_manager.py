@@ -3,6 +3,15 @@ import threading
 from typing import Dict, List
 from datetime import datetime, timedelta
 import queue
+from app.services.extraction_cache import extraction_cache
+from app.services.rate_limiter import rate_limiter
+from app.services.json_repair import parse_metrics
+from app.services.extraction_cascade import extraction_cascade
+from app.services.card_prescreen import card_prescreen
+from app.services.cpu_pool import cpu_pool
+from app.services.pdf_converter import text_layer_stats
+from app.services.preview_cache import preview_cache
+from app.services.file_registry import file_registry
 
 class ResourceManager:
     """Manages system resources and ensures fair allocation across users"""
@@ -85,7 +94,16 @@ class ResourceManager:
                 "max_concurrent_batches": self.max_concurrent_batches,
                 "available_batch_slots": self.batch_semaphore._value,
                 "available_file_slots": self.global_file_semaphore._value,
-                "active_batch_details": self.active_batches.copy()
+                "active_batch_details": self.active_batches.copy(),
+                "extraction_cache": extraction_cache.get_stats(),
+                "model_rate_limiter": rate_limiter.get_stats(),
+                "model_output_parsing": parse_metrics.get_stats(),
+                "extraction_cascade": extraction_cascade.stats.get_stats(),
+                "card_prescreen": card_prescreen.get_stats(),
+                "cpu_pool": cpu_pool.get_stats(),
+                "pdf_text_layer": text_layer_stats.get_stats(),
+                "preview_cache": preview_cache.get_stats(),
+                "file_registry": file_registry.get_stats()
             }
 
 # Global resource manager instance
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import upload, process, download, pdf_preview_simple, vcf_export, prompt_manager, extracted_data, save_data, process_single, websocket_router, email_filters, email_sender, attachment_upload, view_data
+from app.routers import upload, resumable_upload, process, download, pdf_preview_simple, vcf_export, prompt_manager, extracted_data, save_data, process_single, websocket_router, email_filters, email_sender, attachment_upload, view_data
 from app.config import settings
 import os
 import logging
@@ -52,6 +52,11 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ DATABASE CONNECTION ERROR: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.cpu_pool import cpu_pool
+    cpu_pool.shutdown()
+
 # CORS middleware for React frontend
 app.add_middleware(
     CORSMiddleware,
@@ -63,6 +68,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(upload.router)
+app.include_router(resumable_upload.router)
 app.include_router(process.router)
 app.include_router(process_single.router)
 app.include_router(websocket_router.router)
@@ -16,6 +16,17 @@ class FileInfo(BaseModel):
     size: int
     file_path: str
     validation: Optional[ValidationResult] = None
+    duplicate_of: Optional[str] = None
+    duplicate_of_filename: Optional[str] = None
+    duplicate_exact: bool = False
+
+class UploadFileSpec(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+
+class UploadSessionRequest(BaseModel):
+    files: List[UploadFileSpec]
 
 class UploadResponse(BaseModel):
     status: str
@@ -50,6 +61,7 @@ class StatusResponse(BaseModel):
     batch_id: str
     progress: dict
     current_file: Optional[str] = None
+    pages: Optional[dict] = None  # PDF filename -> {"total", "extracted"} while its pages are extracted
     error: Optional[str] = None
 
 class FormData(BaseModel):
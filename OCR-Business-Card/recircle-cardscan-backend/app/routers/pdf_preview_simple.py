@@ -1,9 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
+from typing import Optional
 import os
 import json
-import glob
 
 router = APIRouter()
 
@@ -20,87 +20,123 @@ class UpdateFieldRequest(BaseModel):
 data_store = {}
 
 @router.get("/preview/{file_id}")
-async def get_document_preview(file_id: str):
-    """Get document preview with actual extracted data"""
+async def get_document_preview(file_id: str, response: Response):
+    """Get document preview with actual extracted data
+
+    Files that were already processed are answered from what processing
+    stored (the batch data store, the extraction cache or the single-file
+    queue output) and only a true miss is extracted. The X-Preview-Source
+    header names the path taken.
+    """
     try:
-        from app.config import settings
-        from app.services.gemini_service import GeminiService
-        import glob
+        from app.services.file_registry import file_registry
+        from app.services.service_registry import get_gemini_service
         
         # Find the actual uploaded file
-        file_patterns = [
-            os.path.join(settings.TEMP_STORAGE_PATH, f"{file_id}.*"),
-            os.path.join(settings.TEMP_STORAGE_PATH, f"*{file_id}*")
-        ]
-        
-        found_file = None
-        for pattern in file_patterns:
-            matches = glob.glob(pattern)
-            if matches:
-                found_file = matches[0]
-                break
-        
-        if found_file and os.path.exists(found_file):
-            # Extract actual data from the file
-            gemini_service = GeminiService()
-            filename = os.path.basename(found_file)
-            
-            # Detect document type
-            document_type = "business_card"
-            if any(keyword in filename.lower() for keyword in ['challan', 'invoice', 'receipt', 'transport']):
-                document_type = "delivery_challan"
+        found_file = file_registry.get_path(file_id)
+        
+        extracted_records, source, stored_filename = _stored_records(file_id)
+        if extracted_records is None and not found_file:
+            # File not found - return error
+            raise HTTPException(status_code=404, detail="File not found or not processed yet")
+        
+        filename = os.path.basename(found_file) if found_file else stored_filename
+        
+        # Detect document type
+        document_type = "business_card"
+        if any(keyword in filename.lower() for keyword in ['challan', 'invoice', 'receipt', 'transport']):
+            document_type = "delivery_challan"
+        # Business cards use the default prompt, as batch processing does, so cached records match
+        prompt_id = None if document_type == "business_card" else document_type
+        
+        if extracted_records is None and not found_file.lower().endswith('.pdf'):
+            extracted_records = await get_gemini_service().get_cached_records(found_file, prompt_id)
+            source = "extraction_cache"
+        
+        if extracted_records is None:
+            gemini_service = get_gemini_service()
+            source = "extracted"
             
-            # Handle PDF conversion if needed
+            # Handle PDF conversion if needed (digitally generated card PDFs are read from their text layer)
             processing_file = found_file
             if found_file.lower().endswith('.pdf'):
-                from app.services.pdf_converter import PDFConverter
-                pdf_converter = PDFConverter()
-                images = pdf_converter.convert_pdf_to_images(found_file)
-                if images:
-                    temp_image_path = found_file.replace('.pdf', '_temp.jpg')
-                    images[0].save(temp_image_path)
-                    processing_file = temp_image_path
+                page_records = None
+                if document_type == "business_card":
+                    page_records = await gemini_service.extract_pdf_text_layer(found_file, max_pages=1)
+                if page_records:
+                    extracted_records = page_records[0]
+                else:
+                    from app.services.pdf_converter import PDFConverter
+                    async for _, page_image in PDFConverter.stream_pages(found_file, last_page=1):
+                        processing_file = page_image
             
             # Extract data using Gemini (this returns records with multiple phone entries)
-            extracted_records = await gemini_service.extract_document_data(processing_file, document_type)
+            if extracted_records is None:
+                extracted_records = await gemini_service.extract_document_data(processing_file, prompt_id)
+        
+        response.headers["X-Preview-Source"] = source
+        
+        if extracted_records and len(extracted_records) > 0:
+            # Group records by business card (consolidate phone number rows)
+            consolidated_records = _consolidate_phone_records(extracted_records)
             
-            if extracted_records and len(extracted_records) > 0:
-                # Group records by business card (consolidate phone number rows)
-                consolidated_records = _consolidate_phone_records(extracted_records)
-                
-                response_data = {
-                    "filename": filename,
-                    "page": 1,
-                    "document_type": document_type,
-                    "total_records": len(consolidated_records),
-                    "records": []
+            response_data = {
+                "filename": filename,
+                "page": 1,
+                "document_type": document_type,
+                "total_records": len(consolidated_records),
+                "records": []
+            }
+            
+            # Process each consolidated record
+            for i, consolidated_data in enumerate(consolidated_records):
+                record = {
+                    "record_id": i + 1,
+                    "data": consolidated_data
                 }
                 
-                # Process each consolidated record
-                for i, consolidated_data in enumerate(consolidated_records):
-                    record = {
-                        "record_id": i + 1,
-                        "data": consolidated_data
-                    }
-                    
-                    # Apply any manual updates for this specific record
-                    record_key = f"{file_id}_{i}"
-                    if record_key in data_store:
-                        record["data"].update(data_store[record_key])
-                    
-                    response_data["records"].append(record)
+                # Apply any manual updates for this specific record
+                record_key = f"{file_id}_{i}"
+                if record_key in data_store:
+                    record["data"].update(data_store[record_key])
                 
-                return response_data
-            else:
-                raise HTTPException(status_code=500, detail="No data could be extracted from the file")
-        
-        # File not found - return error
-        raise HTTPException(status_code=404, detail="File not found or not processed yet")
+                response_data["records"].append(record)
+            
+            return response_data
+        else:
+            raise HTTPException(status_code=500, detail="No data could be extracted from the file")
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in preview: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to extract data: {str(e)}")
 
+def _stored_records(file_id):
+    """Records processing already stored for a file, with where they came from and the filename
+
+    Returns (None, None, None) when the file has not been processed.
+    """
+    from app.core.data_store import data_store as batch_data_store
+    from app.services.queue_manager import queue_manager
+    
+    # Batch output holds every card of the file
+    stored = batch_data_store.get_file_records(file_id)
+    source = "data_store"
+    if not stored:
+        # Single-file processing keeps only the first card
+        output = queue_manager.find_output(file_id)
+        if output is None:
+            return None, None, None
+        stored = [{**output["extracted_data"], "filename": output["filename"]}]
+        source = "queue"
+    
+    records = [
+        {key: value for key, value in record.items() if key not in ("file_id", "filename", "image_data")}
+        for record in stored
+    ]
+    return records, source, stored[0]["filename"]
+
 @router.patch("/preview/{file_id}/update")
 async def update_document_field(file_id: str, request: UpdateFieldRequest):
     """Update a field in the document"""
@@ -116,41 +152,28 @@ async def update_document_field(file_id: str, request: UpdateFieldRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/preview/{file_id}/image")
-async def get_document_image(file_id: str):
-    """Get actual document image"""
+async def get_document_image(file_id: str, request: Request, size: Optional[int] = Query(None, ge=16)):
+    """Get document image (a PDF's first page), or a thumbnail with ?size=<long edge>
+
+    Renders are cached per file content and carry an ETag and Last-Modified,
+    so a client revalidating an image it already has gets a 304.
+    """
     try:
-        from app.config import settings
-        import glob
-        
-        # Find the actual uploaded file
-        file_patterns = [
-            os.path.join(settings.TEMP_STORAGE_PATH, f"{file_id}.*"),
-            os.path.join(settings.TEMP_STORAGE_PATH, f"*{file_id}*")
-        ]
-        
-        found_file = None
-        for pattern in file_patterns:
-            matches = glob.glob(pattern)
-            if matches:
-                found_file = matches[0]
-                break
-        
-        if found_file and os.path.exists(found_file):
-            # If it's a PDF, convert to image
-            if found_file.lower().endswith('.pdf'):
-                from app.services.pdf_converter import PDFConverter
-                pdf_converter = PDFConverter()
-                images = pdf_converter.convert_pdf_to_images(found_file)
-                if images:
-                    temp_image_path = found_file.replace('.pdf', '_preview.jpg')
-                    images[0].save(temp_image_path)
-                    return FileResponse(temp_image_path)
-            else:
-                # Return image file directly
-                return FileResponse(found_file)
+        from app.services.preview_cache import preview_cache
+
+        preview = await preview_cache.get(file_id, size)
+        if preview:
+            headers = {
+                "ETag": preview["etag"],
+                "Last-Modified": preview["last_modified"],
+                "Cache-Control": "private, max-age=86400"
+            }
+            if preview_cache.is_not_modified(preview, request.headers.get("if-none-match"),
+                                             request.headers.get("if-modified-since")):
+                return Response(status_code=304, headers=headers)
+            return FileResponse(preview["path"], media_type=preview["media_type"], headers=headers)
         
         # Fallback to SVG placeholder
-        from fastapi.responses import Response
         doc_type = "Business Card" if "card" in file_id.lower() else "Document"
         
         svg_content = f"""
@@ -176,7 +176,8 @@ async def get_status(batch_id: str):
             "processed": status_info.get("processed", 0),
             "percentage": int((status_info.get("processed", 0) / status_info.get("total_files", 1)) * 100)
         },
-        current_file=status_info.get("current_file")
+        current_file=status_info.get("current_file"),
+        pages=status_info.get("pages")
     )
 
 @router.get("/extracted-data/{batch_id}")
@@ -205,6 +206,12 @@ async def get_extracted_data(batch_id: str):
         "extracted_data": extracted_data
     }
 
+@router.get("/system-stats")
+async def get_system_stats():
+    """Get resource usage and extraction cache statistics"""
+    from app.core.resource_manager import resource_manager
+    return resource_manager.get_system_stats()
+
 @router.get("/file-status/{batch_id}")
 async def get_file_status(batch_id: str):
     """Get individual file processing status"""
@@ -311,7 +318,8 @@ async def process_files_individually(batch_id: str):
                 "file_id": file_id,
                 "filename": file_info['filename'],
                 "is_valid": is_valid,
-                "reasoning": validation_result.get('reasoning', '') if validation_result else ''
+                "reasoning": validation_result.get('reasoning', '') if validation_result else '',
+                "duplicate_of": file_info.get('duplicate_of')
             })
             
             app_logger.info(f"[VALIDATION] {file_info['filename']} validation result: {'VALID' if is_valid else 'INVALID'}")
@@ -335,11 +343,18 @@ async def process_files_individually(batch_id: str):
                 
                 # Real OCR extraction using Gemini service
                 try:
-                    from app.services.gemini_service import GeminiService
-                    gemini_service = GeminiService()
+                    from app.services.service_registry import get_gemini_service
+                    from app.services.duplicate_index import duplicate_index
                     
-                    # Extract data from the actual file
-                    extracted_records = await gemini_service.extract_document_data(file_info['file_path'])
+                    # Exact re-uploads of an earlier file reuse its extraction
+                    extracted_records = duplicate_index.get_reused_records(file_id)
+                    if extracted_records is None:
+                        gemini_service = get_gemini_service()
+                        
+                        # Extract data from the actual file
+                        extracted_records = await gemini_service.extract_document_data(file_info['file_path'])
+                        if extracted_records:
+                            duplicate_index.record_extraction(file_id, extracted_records)
                     
                     if extracted_records and len(extracted_records) > 0:
                         # Process ALL extracted records from the image
@@ -369,6 +384,7 @@ async def process_files_individually(batch_id: str):
                                     "company_website": extracted_data.get("company_website", "N/A"),
                                     "designation": extracted_data.get("designation", "N/A"),
                                     "address": extracted_data.get("address", "N/A"),
+                                    "prompt_version": extracted_data.get("prompt_version", "N/A"),
                                     "image_data": image_data,
                                     "remark": ""
                                 })
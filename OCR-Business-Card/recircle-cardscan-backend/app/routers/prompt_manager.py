@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from app.services.gemini_memory import GeminiMemoryManager, initialize_default_prompts
+from app.services.gemini_memory import initialize_default_prompts
+from app.services.service_registry import get_memory_manager
 from typing import Optional
 
 router = APIRouter(prefix="/api/v1/prompts", tags=["prompts"])
@@ -17,7 +18,7 @@ class PromptUpdateRequest(BaseModel):
 @router.post("/store")
 async def store_prompt(request: PromptRequest):
     """Store a new prompt in Gemini memory"""
-    memory = GeminiMemoryManager()
+    memory = get_memory_manager()
     success = await memory.store_prompt(request.prompt_id, request.content, request.description)
     
     if success:
@@ -28,7 +29,7 @@ async def store_prompt(request: PromptRequest):
 @router.get("/get/{prompt_id}")
 async def get_prompt(prompt_id: str):
     """Retrieve a stored prompt"""
-    memory = GeminiMemoryManager()
+    memory = get_memory_manager()
     prompt = await memory.get_prompt(prompt_id)
     
     if prompt:
@@ -39,7 +40,7 @@ async def get_prompt(prompt_id: str):
 @router.put("/update")
 async def update_prompt(request: PromptUpdateRequest):
     """Update an existing prompt"""
-    memory = GeminiMemoryManager()
+    memory = get_memory_manager()
     success = await memory.update_prompt(request.prompt_id, request.new_content)
     
     if success:
@@ -50,7 +51,7 @@ async def update_prompt(request: PromptUpdateRequest):
 @router.get("/list")
 async def list_prompts():
     """List all stored prompts"""
-    memory = GeminiMemoryManager()
+    memory = get_memory_manager()
     prompts = await memory.list_stored_prompts()
     return prompts
 
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Query, Request
+from app.models.schemas import UploadResponse, UploadSessionRequest, FileInfo
+from app.utils.upload_sessions import upload_sessions
+from app.utils.logger import app_logger
+
+router = APIRouter(prefix="/api/v1", tags=["upload"])
+
+@router.post("/uploads")
+async def create_upload(request: UploadSessionRequest):
+    """Start a resumable upload: declare the batch's files and get a batch_id and a file_id per file"""
+    status = await upload_sessions.create([file.model_dump() for file in request.files])
+    app_logger.info(f"[UPLOAD] Resumable upload {status['batch_id']} started: {status['total']} files, {status['total_bytes'] / (1024 * 1024):.1f}MB")
+    return status
+
+@router.get("/uploads/{batch_id}")
+async def get_upload_status(batch_id: str):
+    """Bytes received of each file, to resume from after a dropped connection"""
+    return await upload_sessions.status(batch_id)
+
+@router.put("/uploads/{batch_id}/files/{file_id}")
+async def upload_chunk(batch_id: str, file_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Append the request body to a file at offset (409 with the expected offset if it does not match)
+
+    A file is queued for processing as soon as its last chunk arrives.
+    """
+    file_status = await upload_sessions.write_chunk(batch_id, file_id, offset, request.stream())
+    if file_status["complete"] and file_status["duplicate_of"]:
+        app_logger.info(f"[UPLOAD] {file_status['filename']} duplicates {file_status['duplicate_of']}")
+    return file_status
+
+@router.post("/uploads/{batch_id}/finalize", response_model=UploadResponse)
+async def finalize_upload(batch_id: str):
+    """Finish a resumable upload once every file is complete; the batch then works like one from /upload"""
+    from app.routers.upload import batch_storage, active_sessions
+    import time
+
+    uploaded_files = await upload_sessions.finalize(batch_id)
+
+    # Store in memory and track the session, as /upload does
+    batch_storage[batch_id] = uploaded_files
+    active_sessions[batch_id] = {
+        "created_at": time.time(),
+        "status": "active"
+    }
+
+    app_logger.info(f"[UPLOAD] Resumable upload {batch_id} completed: {len(uploaded_files)} files uploaded and queued")
+
+    return UploadResponse(
+        status="success",
+        batch_id=batch_id,
+        uploaded_files=[FileInfo(**f) for f in uploaded_files],
+        total_count=len(uploaded_files),
+        message=f"Files uploaded successfully. WebSocket: ws://localhost:8000/ws/{batch_id}",
+        warning="⚠️⚠️⚠️ CRITICAL WARNING ⚠️⚠️⚠️\n\nDo NOT reload or close this page until your data is saved!\n\nAll processing progress will be LOST if you refresh!"
+    )
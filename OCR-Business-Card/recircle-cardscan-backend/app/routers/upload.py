@@ -3,7 +3,7 @@ from typing import List
 from app.models.schemas import UploadResponse, FileInfo, ValidationResult
 from app.utils.file_validator import FileValidator
 from app.utils.file_manager import FileManager
-from app.services.business_card_validator import BusinessCardValidator
+from app.services.service_registry import get_business_card_validator
 from app.utils.logger import app_logger
 
 router = APIRouter(prefix="/api/v1", tags=["upload"])
@@ -35,25 +35,29 @@ async def upload_files(files: List[UploadFile] = File(...)):
     # Generate batch ID
     batch_id = FileManager.generate_batch_id()
     app_logger.info(f"[UPLOAD] Batch ID: {batch_id}")
-    uploaded_files = []
     
     # Skip database batch creation
     
+    # Validate file extensions before anything is written
     for file in files:
-        # Validate file extension
         if not FileValidator.validate_file_extension(file.filename):
             app_logger.error(f"[UPLOAD] Invalid file type: {file.filename}")
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid file type: {file.filename}"
             )
-        
-        # Generate unique file ID
-        file_id = FileManager.generate_file_id()
-        
-        # Save file
-        file_info = await FileManager.save_uploaded_file(file, file_id)
-        uploaded_files.append(file_info)
+    
+    # Stream files to storage concurrently, hashing and enforcing size limits as they are written
+    try:
+        uploaded_files = await FileManager.save_uploaded_files(files, batch_id)
+    except HTTPException as e:
+        app_logger.error(f"[UPLOAD] Upload rejected: {str(e.detail)}")
+        raise
+    
+    for file_info in uploaded_files:
+        if file_info["duplicate_of"]:
+            kind = "is a copy of" if file_info["duplicate_exact"] else "looks like"
+            app_logger.info(f"[UPLOAD] {file_info['filename']} {kind} {file_info['duplicate_of_filename']} ({file_info['duplicate_of']})")
         
         # Skip database record creation
     
@@ -96,8 +100,8 @@ async def validate_batch(batch_id: str):
     files_list = batch_storage[batch_id]
     files_list = batch_storage[batch_id]
     
-    # Initialize validator
-    validator = BusinessCardValidator()
+    # Shared validator
+    validator = get_business_card_validator()
     
     # Validate all files
     validation_results = await validator.validate_batch(files_list)
@@ -201,6 +205,14 @@ async def terminate_batch(batch_id: str):
         del batch_storage[batch_id]
         app_logger.info(f"[TERMINATE] Removed batch {batch_id} from batch_storage")
     
+    # Delete the batch's uploads, partial resumable uploads and their preview renders
+    from app.services.preview_cache import preview_cache
+    from app.utils.upload_sessions import upload_sessions
+    upload_sessions.discard(batch_id)
+    removed_files = FileManager.cleanup_temp_files(batch_id)
+    evicted = preview_cache.evict_uploads(removed_files)
+    app_logger.info(f"[TERMINATE] Deleted {len(removed_files)} uploads and {evicted} preview renders of batch {batch_id}")
+    
     if batch_id in validation_storage:
         del validation_storage[batch_id]
         app_logger.info(f"[TERMINATE] Removed batch {batch_id} from validation_storage")
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import time
 from app.services.queue_manager import queue_manager
 from app.services.websocket_manager import websocket_manager
@@ -74,10 +75,26 @@ class AutoProcessor:
                 "progress": 25
             })
             
-            # Call validation
-            from app.services.business_card_validator import BusinessCardValidator
-            validator = BusinessCardValidator()
-            validation_result = await validator.validate_business_card(file_path)
+            # Call validation (fused mode validates and extracts in one model call)
+            from app.config import settings
+            from app.services.service_registry import get_gemini_service, get_business_card_validator
+            from app.services.duplicate_index import duplicate_index
+            gemini_service = get_gemini_service()
+            send_partial = functools.partial(websocket_manager.send_partial_extraction, batch_id, file_id, filename)
+            send_detection = functools.partial(websocket_manager.send_card_detection, batch_id, file_id, filename)
+            
+            # Exact re-uploads of an earlier file reuse its validation and extraction; near-duplicates are processed
+            validation_result = duplicate_index.get_reused_validation(file_id)
+            extracted_records = duplicate_index.get_reused_records(file_id) if validation_result else None
+            if validation_result is None:
+                # Obvious cards and non-cards are decided locally without a model call
+                validation_result = await get_business_card_validator().prescreen(file_path)
+            if validation_result is None and settings.GEMINI_FUSED_VALIDATION:
+                validation_result, extracted_records = await gemini_service.validate_and_extract(file_path, send_partial, send_detection)
+            if validation_result is None:
+                validator = get_business_card_validator()
+                validation_result = await validator.validate_business_card(file_path)
+            duplicate_index.record_validation(file_id, validation_result)
             
             # Send validation result
             await websocket_manager.broadcast(batch_id, {
@@ -86,7 +103,8 @@ class AutoProcessor:
                 "filename": filename,
                 "is_valid": validation_result["is_business_card"],
                 "confidence": validation_result.get("confidence", "Unknown"),
-                "reasoning": validation_result.get("reasoning", "")
+                "reasoning": validation_result.get("reasoning", ""),
+                "duplicate_of": file_info.get("duplicate_of")
             })
             
             if not validation_result["is_business_card"]:
@@ -113,10 +131,11 @@ class AutoProcessor:
                 "progress": 50
             })
             
-            # Call Gemini extraction
-            from app.services.gemini_service import GeminiService
-            gemini_service = GeminiService()
-            extracted_records = await gemini_service.extract_document_data(file_path)
+            # Call Gemini extraction unless the fused call already returned records
+            if not extracted_records:
+                extracted_records = await gemini_service.extract_document_data(file_path, on_partial=send_partial, on_detection=send_detection)
+            if extracted_records:
+                duplicate_index.record_extraction(file_id, extracted_records)
             
             if not extracted_records or len(extracted_records) == 0:
                 # Extraction failed
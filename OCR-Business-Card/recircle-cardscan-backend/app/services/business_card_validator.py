@@ -1,27 +1,18 @@
-import google.generativeai as genai
-from PIL import Image
 from app.config import settings
-from typing import Dict, List
+from typing import Dict, List, Optional
 import json
 from app.utils.logger import app_logger
+from app.services.model_client import model_client
+from app.services.model_backends import get_model_backend
+from app.services.extraction_cache import extraction_cache
+from app.services.image_preprocessor import ImagePreprocessor
+from app.services.duplicate_index import duplicate_index
+from app.services.card_prescreen import card_prescreen
+from app.services.cpu_pool import cpu_pool
 
-class BusinessCardValidator:
-    
-    def __init__(self):
-        genai.configure(api_key=settings.GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
-    
-    async def validate_business_card(self, image_path: str) -> Dict:
-        """Validate if the uploaded image is a business card"""
-        try:
-            pass
-            image = Image.open(image_path)
-            
-            # Convert to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            prompt = """
+VALIDATION_PROMPT_ID = "business_card_validation"
+
+VALIDATION_PROMPT = """
 Analyze the uploaded image and determine if it is a business card.
 
 A business card typically contains:
@@ -43,6 +34,30 @@ Confidence: [High/Medium/Low]
 Reasoning: [Your explanation]
 Information Found: [List if applicable]
 """
+
+
+class BusinessCardValidator:
+    
+    def __init__(self):
+        self.model = get_model_backend().create_model(settings.GEMINI_MODEL, api_key=settings.GOOGLE_API_KEY)
+        self._gemini_service = None
+    
+    async def validate_business_card(self, image_path: str) -> Dict:
+        """Validate if the uploaded image is a business card"""
+        try:
+            cache_key = None
+            if settings.EXTRACTION_CACHE_ENABLED:
+                image_hash = await extraction_cache.hash_image_async(image_path)
+                cache_key = extraction_cache.make_key(
+                    image_hash, VALIDATION_PROMPT_ID, extraction_cache.hash_prompt(VALIDATION_PROMPT)
+                )
+                cached_result = await extraction_cache.get_async(cache_key)
+                if cached_result is not None:
+                    return cached_result
+            
+            image = await self._load_image(image_path)
+            
+            prompt = VALIDATION_PROMPT
             
             generation_config = {
                 "temperature": 0.1,
@@ -52,7 +67,8 @@ Information Found: [List if applicable]
             }
             
             pass
-            response = self.model.generate_content(
+            response = await model_client.generate_content(
+                self.model,
                 [prompt, image],
                 generation_config=generation_config
             )
@@ -99,6 +115,9 @@ Information Found: [List if applicable]
             
             status = "VALID" if is_business_card else "INVALID"
             
+            if cache_key:
+                await extraction_cache.put_async(cache_key, result, {"image_path": image_path, "prompt_id": VALIDATION_PROMPT_ID})
+            
             return result
             
         except Exception as e:
@@ -111,6 +130,42 @@ Information Found: [List if applicable]
                 "raw_response": ""
             }
     
+    async def validate_with_extraction(self, image_path: str) -> Dict:
+        """Validate using the fused validate-and-extract call, caching the extracted records
+        
+        The records are stored in the extraction cache, so a later /process call for the
+        same image returns them without another model round trip.
+        """
+        validation_result, _ = await self._get_gemini_service().validate_and_extract(image_path)
+        if validation_result is None:
+            return await self.validate_business_card(image_path)
+        return validation_result
+    
+    async def prescreen(self, image_path: str) -> Optional[Dict]:
+        """Local verdict for obvious cards and non-cards, None when the model has to decide"""
+        if not settings.PRESCREEN_ENABLED:
+            return None
+        result = await card_prescreen.classify(image_path)
+        validation_result = card_prescreen.to_validation(result)
+        if validation_result is not None:
+            app_logger.info(f"[VALIDATOR] Pre-screen {result['verdict']}: {image_path} ({'; '.join(result['reasons'])})")
+        return validation_result
+    
+    def _get_gemini_service(self):
+        """Shared GeminiService used for fused validation"""
+        if self._gemini_service is None:
+            from app.services.service_registry import get_gemini_service
+            self._gemini_service = get_gemini_service()
+        return self._gemini_service
+    
+    @staticmethod
+    async def _load_image(image_path: str) -> Dict:
+        """Load image as RGB, downscaled and re-encoded for upload (in the CPU pool)"""
+        return await cpu_pool.run(
+            ImagePreprocessor.prepare, image_path,
+            settings.MODEL_IMAGE_LONG_EDGE, settings.MODEL_IMAGE_FORMAT, settings.MODEL_IMAGE_QUALITY
+        )
+    
     async def validate_batch(self, file_list: List[Dict]) -> Dict:
         """Validate multiple files for business card detection"""
         app_logger.info(f"[VALIDATOR] Validating {len(file_list)} files")
@@ -128,12 +183,25 @@ Information Found: [List if applicable]
         for i, file_info in enumerate(file_list, 1):
             try:
                 pass
-                validation_result = await self.validate_business_card(file_info['file_path'])
+                # Exact re-uploads of an earlier file reuse its verdict
+                validation_result = duplicate_index.get_reused_validation(file_info['file_id'])
+                if validation_result is not None:
+                    app_logger.info(f"[VALIDATOR] {file_info['filename']} duplicates {file_info.get('duplicate_of_filename')}, reusing validation")
+                else:
+                    # Obvious cards and non-cards are decided locally without a model call
+                    validation_result = await self.prescreen(file_info['file_path'])
+                if validation_result is None:
+                    if settings.GEMINI_FUSED_VALIDATION:
+                        validation_result = await self.validate_with_extraction(file_info['file_path'])
+                    else:
+                        validation_result = await self.validate_business_card(file_info['file_path'])
+                duplicate_index.record_validation(file_info['file_id'], validation_result)
                 
                 file_result = {
                     "file_id": file_info['file_id'],
                     "filename": file_info['filename'],
                     "file_path": file_info['file_path'],
+                    "duplicate_of": file_info.get('duplicate_of'),
                     "validation": validation_result
                 }
                 
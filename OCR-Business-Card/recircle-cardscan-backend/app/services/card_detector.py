@@ -0,0 +1,145 @@
+from typing import Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from app.config import settings
+
+# Standard business cards are 3.5 x 2 in (1.75); allow for perspective and other formats
+MIN_ASPECT = 1.25
+MAX_ASPECT = 2.3
+RECTANGULARITY = 0.9  # Contour area / bounding rectangle area for cards with rounded corners
+
+
+class CardDetector:
+    """Find business card quadrilaterals in a photo and warp each to a flat crop
+
+    Edges are found on a downscaled grayscale copy, closed into outlines and
+    the convex hull of every external contour that approximates to a quadrilateral with a
+    card-like aspect ratio is kept. Several cards must be of similar size; a
+    single card must cover a good part of the photo, so a logo box on a card
+    scanned edge to edge is never mistaken for the card itself.
+
+    The area thresholds default to the CARD_* settings at construction. A
+    detector sent to the CPU pool carries them along, so workers use the
+    parent's runtime values instead of their own env defaults.
+    """
+
+    def __init__(self, detect_long_edge: int = 1000, min_area_ratio: float = None,
+                 single_min_area_ratio: float = None, crop_max_area_ratio: float = None):
+        self.detect_long_edge = detect_long_edge
+        self.min_area_ratio = settings.CARD_MIN_AREA_RATIO if min_area_ratio is None else min_area_ratio
+        self.single_min_area_ratio = settings.CARD_SINGLE_MIN_AREA_RATIO if single_min_area_ratio is None else single_min_area_ratio
+        self.crop_max_area_ratio = settings.CARD_CROP_MAX_AREA_RATIO if crop_max_area_ratio is None else crop_max_area_ratio
+
+    def detect(self, image: np.ndarray) -> List[Dict]:
+        """Card quadrilaterals in image, ordered top-to-bottom then left-to-right
+
+        Each detection is {"quad": 4 [x, y] corners (tl, tr, br, bl) in image
+        pixels, "area_ratio": share of the image area, "width", "height": size
+        of the flattened card}.
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, self.detect_long_edge / max(height, width))
+        small = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        median = float(np.median(blurred))
+        edges = cv2.Canny(blurred, int(max(0, 0.66 * median)), int(min(255, 1.33 * median)))
+        edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)), iterations=2)
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        image_area = float(small.shape[0] * small.shape[1])
+        detections = []
+        for contour in contours:
+            area_ratio = cv2.contourArea(contour) / image_area
+            if area_ratio < self.min_area_ratio or area_ratio > 0.98:
+                continue
+            hull = cv2.convexHull(contour)
+            quad = cv2.approxPolyDP(hull, 0.02 * cv2.arcLength(hull, True), True)
+            if len(quad) == 4:
+                points = quad.reshape(4, 2).astype(np.float32)
+            else:
+                # Rounded corners do not approximate to four points; accept outlines that fill their bounding box
+                box = cv2.minAreaRect(hull)
+                if cv2.contourArea(hull) < RECTANGULARITY * box[1][0] * box[1][1]:
+                    continue
+                points = cv2.boxPoints(box).astype(np.float32)
+
+            corners = self._order_corners(points / scale)
+            card_width = max(np.linalg.norm(corners[1] - corners[0]), np.linalg.norm(corners[2] - corners[3]))
+            card_height = max(np.linalg.norm(corners[3] - corners[0]), np.linalg.norm(corners[2] - corners[1]))
+            aspect = max(card_width, card_height) / max(1.0, min(card_width, card_height))
+            if not MIN_ASPECT <= aspect <= MAX_ASPECT:
+                continue
+
+            detections.append({
+                "quad": corners.round().astype(int).tolist(),
+                "area_ratio": round(area_ratio, 4),
+                "width": int(card_width),
+                "height": int(card_height)
+            })
+
+        if len(detections) == 1 and detections[0]["area_ratio"] < self.single_min_area_ratio:
+            return []
+        if len(detections) > 1:
+            # Cards photographed together are the same size; drop outliers against the largest
+            largest = max(detection["area_ratio"] for detection in detections)
+            detections = [detection for detection in detections if detection["area_ratio"] >= largest / 2]
+
+        row_height = max(1, height // 8)
+        detections.sort(key=lambda d: (min(y for _, y in d["quad"]) // row_height, min(x for x, _ in d["quad"])))
+        return detections
+
+    def crop_cards(self, source: Union[str, bytes]) -> List[Dict]:
+        """Detect cards and encode one flattened JPEG per card
+
+        source is an image path or encoded image bytes. Returns the
+        detections with "index" and "image" (the crop's JPEG bytes) added, or
+        [] when the photo is best sent whole: no card found, or one card
+        filling it.
+        """
+        image = self.read_image(source)
+        if image is None:
+            return []
+
+        detections = self.detect(image)
+        if len(detections) == 1 and detections[0]["area_ratio"] >= self.crop_max_area_ratio:
+            return []
+
+        for index, detection in enumerate(detections):
+            _, crop = cv2.imencode(".jpg", self.warp(image, detection), [cv2.IMWRITE_JPEG_QUALITY, 95])
+            detection["index"] = index
+            detection["image"] = crop.tobytes()
+        return detections
+
+    @staticmethod
+    def read_image(source: Union[str, bytes]) -> Optional[np.ndarray]:
+        """BGR image from a path or encoded bytes, None if it cannot be decoded"""
+        if isinstance(source, bytes):
+            return cv2.imdecode(np.frombuffer(source, np.uint8), cv2.IMREAD_COLOR)
+        return cv2.imread(source, cv2.IMREAD_COLOR)
+
+    @staticmethod
+    def warp(image: np.ndarray, detection: Dict) -> np.ndarray:
+        """Perspective-correct one detected card into a flat crop"""
+        corners = np.array(detection["quad"], dtype=np.float32)
+        width, height = detection["width"], detection["height"]
+        target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+        return cv2.warpPerspective(image, cv2.getPerspectiveTransform(corners, target), (width, height))
+
+    @staticmethod
+    def _order_corners(points: np.ndarray) -> np.ndarray:
+        """Order four points as top-left, top-right, bottom-right, bottom-left"""
+        sums = points.sum(axis=1)
+        diffs = np.diff(points, axis=1).ravel()
+        return np.array([
+            points[np.argmin(sums)],
+            points[np.argmin(diffs)],
+            points[np.argmax(sums)],
+            points[np.argmax(diffs)]
+        ], dtype=np.float32)
+
+# Global instance
+card_detector = CardDetector()
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.card_detector import CardDetector, card_detector
+from app.services.cpu_pool import cpu_pool
+
+CARD = "card"
+NOT_CARD = "not_card"
+UNSURE = "unsure"
+
+# Used until calibrate_prescreen.py has written calibrated values
+DEFAULT_THRESHOLDS = {
+    "blank_std_max": 8.0,  # Grayscale std below this is a blank or uniform page
+    "min_edge_density": 0.006,  # Fewer edge pixels than this: nothing printed on it
+    "screenshot_flat_min": 0.5,  # Share of pixels with zero Laplacian (rendered, noise-free UI), at any aspect ratio
+    "single_card_aspect_min": 1.5,  # One outline only counts as a card in the card range (A4 is 1.41)
+    "single_card_aspect_max": 2.0,
+    # Print needed inside a lone outline for it to count; None until calibration has single-card photos to set it from,
+    # since a window on a photographed monitor looks the same
+    "single_card_inner_edges_min": None,
+    "single_card_outer_ratio_max": 0.6  # Print around it as dense as inside is a bordered box on a document or screen
+}
+
+
+class CardPrescreen:
+    """Fast local card / not-card / unsure verdict from image statistics
+
+    Features come from a downscaled grayscale copy: aspect ratio, grayscale
+    spread, edge density and flat (zero Laplacian) share, plus the card
+    outlines CardDetector finds. Only clear cases get a verdict: blank pages,
+    edge-free images and screenshots are not cards; several card outlines,
+    or one outline with card proportions, print inside it and little print
+    around it, are cards. Everything else is unsure and goes to the model
+    validator.
+    """
+
+    def __init__(self, calibration_path: str = None, work_long_edge: int = 1000):
+        self.calibration_path = calibration_path or settings.PRESCREEN_CALIBRATION_PATH
+        self.work_long_edge = work_long_edge
+        self.thresholds = self._load_thresholds()
+        self._lock = threading.Lock()
+        self.verdicts = {CARD: 0, NOT_CARD: 0, UNSURE: 0}
+
+    def _load_thresholds(self) -> Dict:
+        thresholds = dict(DEFAULT_THRESHOLDS)
+        if os.path.isfile(self.calibration_path):
+            try:
+                with open(self.calibration_path, 'r', encoding='utf-8') as f:
+                    thresholds.update(json.load(f).get("thresholds", {}))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not load pre-screen calibration, using defaults: {e}")
+        return thresholds
+
+    def compute_features(self, image: np.ndarray, detector: CardDetector = None) -> Dict:
+        height, width = image.shape[:2]
+        scale = min(1.0, self.work_long_edge / max(height, width))
+        small = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA) if scale < 1 else image
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        edges = cv2.Canny(gray, 50, 150) > 0
+
+        detections = (detector or card_detector).detect(image)
+        features = {
+            "aspect": round(max(height, width) / max(1, min(height, width)), 3),
+            "gray_std": round(float(gray.std()), 2),
+            "edge_density": round(float(edges.mean()), 4),
+            "flat_share": round(float((cv2.Laplacian(gray, cv2.CV_16S) == 0).mean()), 4),
+            "card_outlines": len(detections),
+            "card_aspect": None,
+            "card_inner_edges": None,
+            "card_outer_edges": None
+        }
+        if len(detections) == 1:
+            detection = detections[0]
+            features["card_aspect"] = round(max(detection["width"], detection["height"]) / max(1, min(detection["width"], detection["height"])), 3)
+            features["card_inner_edges"], features["card_outer_edges"] = self._outline_edge_densities(edges, detection["quad"], scale)
+        return features
+
+    @staticmethod
+    def _outline_edge_densities(edges: np.ndarray, quad: List, scale: float) -> Tuple[float, float]:
+        """Edge density inside an outline (its own border excluded) and outside it"""
+        corners = np.array(quad, np.float32) * scale
+        inside = np.zeros(edges.shape, np.uint8)
+        cv2.fillConvexPoly(inside, corners.round().astype(np.int32), 1)
+        outside = inside == 0
+        # Shrink the outline towards its centre by 8% so its border does not count as print
+        centre = corners.mean(axis=0)
+        interior = np.zeros(edges.shape, np.uint8)
+        cv2.fillConvexPoly(interior, (centre + (corners - centre) * 0.92).round().astype(np.int32), 1)
+        interior = interior > 0
+
+        inner = float(edges[interior].mean()) if interior.any() else 0.0
+        outer = float(edges[outside].mean()) if outside.any() else 0.0
+        return round(inner, 4), round(outer, 4)
+
+    def classify_features(self, features: Dict) -> Tuple[str, List[str]]:
+        """(verdict, reasons) for precomputed features"""
+        t = self.thresholds
+        if features["gray_std"] < t["blank_std_max"]:
+            return NOT_CARD, [f"blank or uniform image (grayscale std {features['gray_std']})"]
+        if features["edge_density"] < t["min_edge_density"]:
+            return NOT_CARD, [f"almost no edges or print (edge density {features['edge_density']})"]
+        if features["flat_share"] >= t["screenshot_flat_min"]:
+            return NOT_CARD, [f"looks like a screenshot (flat share {features['flat_share']})"]
+
+        if features["card_outlines"] >= 2:
+            return CARD, [f"{features['card_outlines']} card-shaped outlines of similar size"]
+        aspect = features["card_aspect"]
+        if aspect is None or not t["single_card_aspect_min"] <= aspect <= t["single_card_aspect_max"]:
+            return UNSURE, []
+        # One outline alone is as likely a window, frame or bordered box; it needs print inside and not around it
+        inner, outer = features["card_inner_edges"], features["card_outer_edges"]
+        if t["single_card_inner_edges_min"] is None or inner < t["single_card_inner_edges_min"] or outer > t["single_card_outer_ratio_max"] * inner:
+            return UNSURE, []
+        return CARD, [f"card-shaped outline with aspect ratio {aspect} and print inside (edge density {inner} inside, {outer} around)"]
+
+    async def classify(self, image_path: str) -> Dict:
+        """{"verdict": card|not_card|unsure, "reasons", "features"} for an image file, decoded in the CPU pool"""
+        # The detector is built here so the worker uses this process's CARD_* settings
+        features = await cpu_pool.run(CardPrescreen.file_features, image_path, CardDetector())
+        if features is None:
+            verdict, reasons, features = UNSURE, ["not decodable locally"], {}
+        else:
+            verdict, reasons = self.classify_features(features)
+        with self._lock:
+            self.verdicts[verdict] += 1
+        return {"verdict": verdict, "reasons": reasons, "features": features}
+
+    @staticmethod
+    def file_features(image_path: str, detector: CardDetector) -> Optional[Dict]:
+        """Features of an image file, None if it cannot be decoded (runs in a CPU pool worker)"""
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return card_prescreen.compute_features(image, detector)
+
+    @staticmethod
+    def to_validation(result: Dict) -> Optional[Dict]:
+        """Validation in the BusinessCardValidator shape, or None when the model has to decide"""
+        if result["verdict"] == UNSURE:
+            return None
+        is_card = result["verdict"] == CARD
+        return {
+            "is_business_card": is_card,
+            "confidence": "High" if not is_card or result["features"].get("card_outlines", 0) >= 2 else "Medium",
+            "reasoning": f"Local pre-screen: {'; '.join(result['reasons'])}",
+            "information_found": [],
+            "raw_response": ""
+        }
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = sum(self.verdicts.values()) or 1
+            return {
+                "enabled": settings.PRESCREEN_ENABLED,
+                **self.verdicts,
+                "model_calls_skipped_rate": round((self.verdicts[CARD] + self.verdicts[NOT_CARD]) / total, 4),
+                "calibrated": os.path.isfile(self.calibration_path)
+            }
+
+# Global instance
+card_prescreen = CardPrescreen()
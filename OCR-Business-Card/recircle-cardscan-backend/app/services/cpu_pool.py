@@ -0,0 +1,81 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+
+from app.config import settings
+
+
+def _init_worker():
+    # One worker per core already; OpenCV's own threads would oversubscribe the host
+    import cv2
+    cv2.setNumThreads(1)
+
+
+class CPUPool:
+    """Process pool for CPU-bound image work: enhancement, PDF rasterization, thumbnails
+
+    Image decoding, filtering and PDF rendering hold the GIL for long
+    stretches, so on the model client's thread pool they slow down every
+    other request. The pool is created on first use with one process per
+    core (spawned, so workers never inherit the server's threads or sockets)
+    and is recreated if a worker dies. Tasks must be picklable module-level
+    functions or static methods, and take and return plain data.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.CPU_POOL_WORKERS or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) in a worker process"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        executor = self._get_executor()
+        with self._lock:
+            self.tasks += 1
+        try:
+            return await loop.run_in_executor(executor, call)
+        except BrokenProcessPool:
+            print("⚠️ CPU pool worker died, restarting pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+                    self.restarts += 1
+            executor.shutdown(wait=False)
+            return await loop.run_in_executor(self._get_executor(), call)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "started": self._executor is not None,
+                "tasks": self.tasks,
+                "restarts": self.restarts
+            }
+
+# Global instance
+cpu_pool = CPUPool()
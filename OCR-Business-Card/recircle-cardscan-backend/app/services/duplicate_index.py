@@ -0,0 +1,212 @@
+import copy
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+from app.config import settings
+
+
+class DuplicateIndex:
+    """Content and perceptual-hash index of uploads for duplicate detection across batches
+
+    A byte-identical re-upload (same SHA-256) is an exact duplicate and reuses
+    the original's validation and extracted records. An image whose dHash is
+    only within the Hamming threshold is a near-duplicate: it is flagged with
+    duplicate_of but still validated and extracted, since cards printed from
+    one template differ only in the text that matters.
+    """
+
+    def __init__(self, index_path: str = None, threshold: int = None, max_entries: int = None):
+        # Append-only JSON-lines log, replayed on startup and compacted when it grows
+        self.index_path = index_path or os.path.join(settings.TEMP_STORAGE_PATH, "duplicate_index.jsonl")
+        self.threshold = settings.DUPLICATE_HASH_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or settings.DUPLICATE_INDEX_MAX_ENTRIES
+
+        # file_id -> entry, oldest first; sha256 -> file_ids with that content, oldest first
+        self._entries: Dict[str, Dict] = {}
+        self._hashes: Dict[str, List[str]] = {}
+        self._log_lines = 0
+        self._lock = threading.Lock()
+
+        self._load()
+
+    @staticmethod
+    def compute_dhash(image_path: str) -> Optional[str]:
+        """64-bit difference hash (dHash) as hex, or None if the file is not a readable image"""
+        image = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+        if image is None:
+            return None
+
+        # 9x8 thumbnail: each bit says whether a pixel is brighter than its right neighbour
+        small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        return np.packbits(bits).tobytes().hex()
+
+    def register(self, file_id: str, filename: str, file_path: str, phash: Optional[str], batch_id: str = None,
+                 sha256: str = None) -> Optional[Dict]:
+        """Add an uploaded file and return the earlier file it duplicates, if any ("exact" when byte-identical)"""
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is not None and entry.get("sha256") == sha256:
+                # Registered before (an upload finished after a restart): keep the entry and its results
+                original = self._entries.get(entry["duplicate_of"]) if entry["duplicate_of"] else None
+                if original is None:
+                    return None
+                return {"file_id": original["file_id"], "filename": original["filename"], "distance": None, "exact": entry["exact"]}
+
+            duplicate_of = (self._find_exact(sha256) if sha256 else None) or (self._find_nearest(phash) if phash else None)
+
+            entry = {
+                "file_id": file_id,
+                "filename": filename,
+                "file_path": file_path,
+                "batch_id": batch_id,
+                "phash": phash,
+                "sha256": sha256,
+                "duplicate_of": duplicate_of["file_id"] if duplicate_of else None,
+                "exact": bool(duplicate_of and duplicate_of["exact"]),
+                "registered_at": time.time(),
+                "validation": None,
+                "records": None
+            }
+            self._apply({"op": "register", "entry": entry})
+            self._append({"op": "register", "entry": entry})
+
+        return duplicate_of
+
+    def get_duplicate_of(self, file_id: str) -> Optional[Dict]:
+        """Return the original file entry this file duplicates"""
+        with self._lock:
+            original = self._get_original(file_id)
+            if not original:
+                return None
+            return {"file_id": original["file_id"], "filename": original["filename"]}
+
+    def get_reused_validation(self, file_id: str) -> Optional[Dict]:
+        """Validation result of the original file, if this file is an exact duplicate of a validated one"""
+        with self._lock:
+            original = self._get_original(file_id, exact=True)
+            if not original or original["validation"] is None:
+                return None
+            return copy.deepcopy(original["validation"])
+
+    def get_reused_records(self, file_id: str) -> Optional[List[Dict]]:
+        """Extracted records of the original file, if this file is an exact duplicate of an extracted one"""
+        with self._lock:
+            original = self._get_original(file_id, exact=True)
+            if not original or not original["records"]:
+                return None
+            return copy.deepcopy(original["records"])
+
+    def record_validation(self, file_id: str, validation: Dict) -> None:
+        """Remember a file's validation result for later duplicates"""
+        self._record({"op": "validation", "file_id": file_id, "validation": validation})
+
+    def record_extraction(self, file_id: str, records: List[Dict]) -> None:
+        """Remember a file's extracted records for later duplicates"""
+        records = [{key: value for key, value in record.items() if key != "image_data"} for record in records]
+        self._record({"op": "records", "file_id": file_id, "records": records})
+
+    def _find_exact(self, sha256: str) -> Optional[Dict]:
+        """Oldest entry with the same content hash (caller holds lock)"""
+        file_ids = self._hashes.get(sha256)
+        if not file_ids:
+            return None
+        original = self._entries[file_ids[0]]
+        return {"file_id": original["file_id"], "filename": original["filename"], "distance": 0, "exact": True}
+
+    def _find_nearest(self, phash: str) -> Optional[Dict]:
+        """Closest original entry within the Hamming threshold (caller holds lock)"""
+        candidates = [entry for entry in self._entries.values() if entry["phash"] and not entry["duplicate_of"]]
+        if not candidates:
+            return None
+
+        target = np.uint64(int(phash, 16))
+        hashes = np.array([int(entry["phash"], 16) for entry in candidates], dtype=np.uint64)
+        xor_bytes = np.bitwise_xor(hashes, target).view(np.uint8).reshape(-1, 8)
+        distances = np.unpackbits(xor_bytes, axis=1).sum(axis=1)
+
+        best = int(np.argmin(distances))
+        if distances[best] > self.threshold:
+            return None
+        return {
+            "file_id": candidates[best]["file_id"],
+            "filename": candidates[best]["filename"],
+            "distance": int(distances[best]),
+            "exact": False
+        }
+
+    def _get_original(self, file_id: str, exact: bool = False) -> Optional[Dict]:
+        entry = self._entries.get(file_id)
+        if not entry or not entry["duplicate_of"] or exact and not entry.get("exact"):
+            return None
+        return self._entries.get(entry["duplicate_of"])
+
+    def _record(self, operation: Dict) -> None:
+        with self._lock:
+            if operation["file_id"] in self._entries:
+                self._apply(operation)
+                self._append(operation)
+
+    def _apply(self, operation: Dict) -> None:
+        """Apply one log operation to the in-memory index (caller holds lock)"""
+        if operation["op"] == "register":
+            entry = operation["entry"]
+            self._drop(entry["file_id"])
+            self._entries[entry["file_id"]] = entry
+            if entry.get("sha256"):
+                self._hashes.setdefault(entry["sha256"], []).append(entry["file_id"])
+
+            # Drop oldest entries beyond the size bound
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        elif operation["file_id"] in self._entries:
+            key = "validation" if operation["op"] == "validation" else "records"
+            self._entries[operation["file_id"]][key] = copy.deepcopy(operation[key])
+
+    def _drop(self, file_id: str) -> None:
+        """Remove an entry and its content hash (caller holds lock)"""
+        entry = self._entries.pop(file_id, None)
+        if entry and entry.get("sha256"):
+            file_ids = self._hashes[entry["sha256"]]
+            file_ids.remove(file_id)
+            if not file_ids:
+                del self._hashes[entry["sha256"]]
+
+    def _append(self, operation: Dict) -> None:
+        """Append one operation to the log (caller holds lock)"""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(operation) + "\n")
+        self._log_lines += 1
+
+    def _load(self) -> None:
+        """Replay the log, compacting it if most lines are stale"""
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                    self._log_lines += 1
+                except (ValueError, KeyError):
+                    continue  # Skip a torn last line from an interrupted write
+
+        if self._log_lines > 2 * len(self._entries) + 100:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the log as one register operation per live entry"""
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps({"op": "register", "entry": entry}) + "\n")
+        os.replace(temp_path, self.index_path)
+        self._log_lines = len(self._entries)
+
+# Global instance
+duplicate_index = DuplicateIndex()
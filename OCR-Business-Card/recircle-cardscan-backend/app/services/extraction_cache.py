@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+from app.config import settings
+
+
+class ExtractionCache:
+    """Persistent on-disk cache of model results keyed by image content and prompt version"""
+
+    def __init__(self, cache_dir: str = None, max_entries: int = None, max_size_mb: int = None):
+        self.cache_dir = cache_dir or settings.EXTRACTION_CACHE_PATH
+        self.max_entries = max_entries or settings.EXTRACTION_CACHE_MAX_ENTRIES
+        self.max_size_bytes = (max_size_mb or settings.EXTRACTION_CACHE_MAX_MB) * 1024 * 1024
+
+        # key -> entry size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    @staticmethod
+    def hash_image(image_path: Union[str, bytes]) -> str:
+        """SHA-256 of the raw image bytes (an image file or an in-memory encoded image)"""
+        if isinstance(image_path, bytes):
+            return hashlib.sha256(image_path).hexdigest()
+        sha256 = hashlib.sha256()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    @staticmethod
+    def hash_prompt(prompt_content: str) -> str:
+        """SHA-256 of the prompt text"""
+        return hashlib.sha256(prompt_content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def make_key(image_hash: str, prompt_id: str, prompt_hash: str) -> str:
+        """Combine image hash, prompt id and prompt hash into one cache key"""
+        return hashlib.sha256(f"{image_hash}:{prompt_id}:{prompt_hash}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return cached payload or None, refreshing its LRU position on hit"""
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+            try:
+                entry_path = self._entry_path(key)
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                os.utime(entry_path, None)  # Persist recency across restarts
+            except (OSError, ValueError):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.hits += 1
+            return entry["payload"]
+
+    def put(self, key: str, payload: Any, metadata: Dict = None) -> None:
+        """Store payload and evict least recently used entries over the size bounds"""
+        entry = {
+            "key": key,
+            "created_at": time.time(),
+            "metadata": metadata or {},
+            "payload": payload
+        }
+        data = json.dumps(entry).encode('utf-8')
+
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(key)
+            temp_path = f"{entry_path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, entry_path)
+
+            if key in self._index:
+                self._total_size -= self._index.pop(key)
+            self._index[key] = len(data)
+            self._total_size += len(data)
+
+            self._evict()
+
+    async def hash_image_async(self, image_path: Union[str, bytes]) -> str:
+        """hash_image on a default-executor thread, so cache lookups never queue behind model calls"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.hash_image, image_path)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get on a worker thread, for coroutines (the entry read must not block the event loop)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get, key)
+
+    async def put_async(self, key: str, payload: Any, metadata: Dict = None) -> None:
+        """put on a worker thread, for coroutines"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.put, key, payload, metadata)
+
+    def clear(self) -> None:
+        """Remove all cached entries"""
+        with self._lock:
+            for key in list(self._index.keys()):
+                self._remove(key)
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters and current cache size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": settings.EXTRACTION_CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "size_mb": round(self._total_size / (1024 * 1024), 2),
+                "max_entries": self.max_entries,
+                "max_size_mb": round(self.max_size_bytes / (1024 * 1024), 2)
+            }
+
+    def _load_index(self) -> None:
+        """Rebuild LRU order from entry files on disk, oldest access first"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, filename))
+            entries.append((stat.st_mtime, filename[:-5], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_size += size
+
+        with self._lock:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until within bounds (caller holds lock)"""
+        while self._index and (len(self._index) > self.max_entries or self._total_size > self.max_size_bytes):
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Remove entry from index and disk (caller holds lock)"""
+        self._total_size -= self._index.pop(key, 0)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+# Global instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,258 @@
+import json
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.json_repair import CARD_FIELDS, parse_card_records
+from app.services.cpu_pool import cpu_pool
+from app.services.model_client import model_client
+from app.services.image_preprocessor import ImageSource, describe_source
+from app.services.regex_extractor import FieldResult, RegexExtractor
+from app.services.text_detector import get_text_detector
+from app.services.text_scanner import text_scanner
+
+CASCADE_PROMPT_ID = "cascade_text_fields"
+LOCAL_PROMPT_VERSION = "local_regex"
+
+CASCADE_TEXT_PROMPT = """
+Below is OCR text read from ONE business card. These fields were already extracted from it:
+{known}
+
+From the text, extract ONLY these fields: {missing}
+• name: the person's name, company: the organization, designation: the job title, address: the full postal address
+• phone: digits only, email: lowercase, multiple values comma-separated with no spaces
+• Correct obvious OCR mistakes, but never invent data: use "N/A" if a field is not in the text
+Return ONLY a JSON object with exactly these keys, for example: {example}
+
+OCR TEXT:
+{text}
+"""
+
+TEXT_LAYER_PROMPT_ID = "pdf_text_layer"
+
+TEXT_LAYER_PROMPT = """
+Below is the embedded text of a digitally generated document, such as a vCard or an email signature exported to PDF. It holds the details of one or more business contacts.
+
+Return one JSON object per contact, in the order they appear, with exactly the keys name, phone, email, company, designation, address:
+• phone: digits only, email: lowercase, multiple values comma-separated with no spaces
+• Never invent data: use "N/A" if a field is not in the text; without a person name, use the company name in "name"
+Return ONLY the JSON array.
+
+DOCUMENT TEXT:
+{text}
+"""
+
+TEXT_LAYER_MAX_CHARS = 12000
+
+# Fields worth a vision call when neither the local pass nor the text prompt found them
+VISION_FALLBACK_FIELDS = ("name", "phone", "email", "company")
+
+
+class CascadeStats:
+    """Counters for how far down the cascade each card had to go"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cards = 0
+        self.no_text = 0
+        self.multiple_cards = 0
+        self.low_confidence = 0
+        self.resolved_locally = 0
+        self.text_only = 0
+        self.vision_fields = 0
+        self.local_fields = 0
+        self.model_fields = 0
+        self.local_seconds = 0.0
+
+    def record(self, outcome: str, local_seconds: float, local_fields: int = 0, model_fields: int = 0) -> None:
+        with self._lock:
+            self.cards += 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            self.local_fields += local_fields
+            self.model_fields += model_fields
+            self.local_seconds += local_seconds
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            cards = self.cards or 1
+            return {
+                "enabled": settings.EXTRACTION_CASCADE_ENABLED,
+                "text_detector": settings.LOCAL_TEXT_DETECTOR,
+                "cards": self.cards,
+                "resolved_locally": self.resolved_locally,
+                "resolved_locally_rate": round(self.resolved_locally / cards, 4),
+                "text_only": self.text_only,
+                "vision_fields": self.vision_fields,
+                "fell_through": self.no_text + self.multiple_cards + self.low_confidence,
+                "local_fields": self.local_fields,
+                "model_fields": self.model_fields,
+                "avg_local_ms": round(self.local_seconds / cards * 1000, 1)
+            }
+
+
+class ExtractionCascade:
+    """Local text detection + regex first; the model only for what the local pass could not settle
+
+    1. The text detector reads the card text and RegexExtractor scores every field.
+    2. Fields at or above LOCAL_FIELD_MIN_CONFIDENCE are kept as they are.
+    3. The remaining fields are asked for with a short text-only prompt over the OCR text.
+    4. Key fields still missing after that get a vision re-request for those fields only.
+
+    extract() returns None whenever the local text is unusable (no detector, no text,
+    several cards in one image, too few confident fields); the caller then runs the
+    normal full vision extraction.
+    """
+
+    def __init__(self):
+        self.regex = RegexExtractor()
+        self.stats = CascadeStats()
+
+    async def detect_fields(self, image_path: ImageSource) -> Optional[Tuple[str, Dict[str, FieldResult]]]:
+        """Run the local pass only: (text, scored fields), or None without a usable detector"""
+        detector = get_text_detector()
+        if not detector.is_available():
+            return None
+        text = await cpu_pool.run(detector.detect_text, image_path, settings.LOCAL_OCR_LONG_EDGE, settings.LOCAL_OCR_LANG)
+        return text, self.regex.extract_with_confidence(text)
+
+    async def extract(self, service, image_path: ImageSource,
+                      on_partial: Optional[Callable[[int, str, object], Awaitable[None]]] = None,
+                      local_only: bool = False) -> Optional[list]:
+        """Records for a single-card image, or None to fall back to the vision extraction
+
+        With local_only, records are returned only if every field was settled locally.
+        """
+        start = time.perf_counter()
+        try:
+            local = await self.detect_fields(image_path)
+        except Exception as e:
+            print(f"⚠️ Local text detection failed for {describe_source(image_path)}: {e}")
+            local = None
+        if local is None:
+            return None
+        text, fields = local
+        local_seconds = time.perf_counter() - start
+
+        if not text.strip():
+            self.stats.record("no_text", local_seconds)
+            return None
+        if self.regex.looks_like_multiple_cards(text):
+            print(f"🪪 Several cards suspected in {image_path}, using vision extraction")
+            self.stats.record("multiple_cards", local_seconds)
+            return None
+
+        record = {
+            field: result["value"] for field, result in fields.items()
+            if result["confidence"] >= settings.LOCAL_FIELD_MIN_CONFIDENCE
+        }
+        missing = [field for field in CARD_FIELDS if field not in record]
+        if len(record) < settings.LOCAL_MIN_ACCEPTED_FIELDS or (local_only and missing):
+            self.stats.record("low_confidence", local_seconds)
+            return None
+
+        print(f"🏠 Local pass settled {len(record)}/{len(CARD_FIELDS)} fields for {describe_source(image_path)} in {local_seconds * 1000:.0f} ms")
+        if on_partial:
+            for field, value in record.items():
+                try:
+                    await on_partial(0, field, value)
+                except Exception as e:
+                    print(f"⚠️ Partial field update failed: {e}")
+
+        outcome = "resolved_locally"
+        if missing:
+            outcome = "text_only"
+            record.update(await self._extract_from_text(service, text, record, missing))
+            vision_fields = [
+                field for field in missing
+                if field in VISION_FALLBACK_FIELDS and record.get(field, "N/A") == "N/A"
+            ]
+            if vision_fields:
+                outcome = "vision_fields"
+                image = await service._prepare_image_for_model(image_path)
+                cards = [record]
+                await service._rerequest_fields(image, cards, {0: vision_fields})
+
+        self.stats.record(outcome, local_seconds, len(CARD_FIELDS) - len(missing), len(missing))
+        records = service._normalize_records([record])
+        prompt_version = LOCAL_PROMPT_VERSION if not missing else service._prompt_version(CASCADE_PROMPT_ID, CASCADE_TEXT_PROMPT)
+        return service._stamp_prompt_version(records, prompt_version)
+
+    async def extract_text_layer(self, service, text: str) -> Tuple[list, str]:
+        """Records from a document's own text, never the image: (records, outcome)
+
+        A single card whose fields all score as confident is resolved locally;
+        one with enough confident fields gets the text-only prompt for the
+        rest. Anything else, including several contacts on one page, is read
+        by the model from the whole text. outcome is "resolved_locally" or
+        "text_prompt".
+        """
+        if not self._several_contacts(text):
+            fields = self.regex.extract_with_confidence(text)
+            record = {
+                field: result["value"] for field, result in fields.items()
+                if result["confidence"] >= settings.LOCAL_FIELD_MIN_CONFIDENCE
+            }
+            missing = [field for field in CARD_FIELDS if field not in record]
+            if not missing:
+                return service._stamp_prompt_version(service._normalize_records([record]), LOCAL_PROMPT_VERSION), "resolved_locally"
+            if len(record) >= settings.LOCAL_MIN_ACCEPTED_FIELDS:
+                record.update(await self._extract_from_text(service, text, record, missing))
+                records = service._normalize_records([record])
+                return service._stamp_prompt_version(records, service._prompt_version(CASCADE_PROMPT_ID, CASCADE_TEXT_PROMPT)), "text_prompt"
+
+        prompt = TEXT_LAYER_PROMPT.format(text=text.strip()[:TEXT_LAYER_MAX_CHARS])
+        generation_config = {"temperature": 0.05, "top_p": 0.75, "top_k": 30, "max_output_tokens": 4096}
+        schema = {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {field: {"type": "string"} for field in CARD_FIELDS},
+                "required": CARD_FIELDS
+            }
+        }
+        generation_config = service._with_response_schema(generation_config, schema)
+        try:
+            response = await model_client.generate_content(service.model, [prompt], generation_config=generation_config)
+            cards, _, _ = parse_card_records(response.text)
+        except Exception as e:
+            print(f"❌ Text layer extraction failed: {e}")
+            cards = []
+        records = service._normalize_records(cards) if cards else [service._get_default_data()]
+        return service._stamp_prompt_version(records, service._prompt_version(TEXT_LAYER_PROMPT_ID, TEXT_LAYER_PROMPT)), "text_prompt"
+
+    def _several_contacts(self, text: str) -> bool:
+        """Several cards, or a contact sheet: several emails and several name lines"""
+        if self.regex.looks_like_multiple_cards(text):
+            return True
+        scan = text_scanner.scan(text)
+        return len({email["value"].lower() for email in scan["email"]}) > 1 and len(scan["name"]) > 1
+
+    async def _extract_from_text(self, service, text: str, known: Dict[str, str], missing: List[str]) -> Dict[str, str]:
+        """Text-only model call for the missing fields; N/A for any it cannot supply"""
+        prompt = CASCADE_TEXT_PROMPT.format(
+            known=json.dumps(known, ensure_ascii=False),
+            missing=", ".join(missing),
+            example=json.dumps({field: "..." for field in missing}),
+            text=text.strip()
+        )
+        generation_config = {"temperature": 0.05, "top_p": 0.75, "top_k": 30, "max_output_tokens": 512}
+        schema = {
+            "type": "object",
+            "properties": {field: {"type": "string"} for field in missing},
+            "required": missing
+        }
+        generation_config = service._with_response_schema(generation_config, schema)
+
+        try:
+            response = await model_client.generate_content(service.model, [prompt], generation_config=generation_config)
+            cards, _, _ = parse_card_records(response.text, fields=missing)
+            patch = cards[0] if cards else {}
+        except Exception as e:
+            print(f"❌ Text-only field extraction failed: {e}")
+            patch = {}
+
+        return {field: service._field_text(patch.get(field)) for field in missing}
+
+# Global instance
+extraction_cascade = ExtractionCascade()
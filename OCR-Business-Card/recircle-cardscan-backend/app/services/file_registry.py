@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from app.config import settings
+
+
+class FileRegistry:
+    """Index of stored uploads: file_id -> path, size, MIME type, content hash and batch
+
+    Uploads are looked up by file_id in O(1) instead of globbing the storage
+    directory. Like the duplicate index it is an append-only JSON-lines log,
+    replayed on startup and compacted when it grows, so lookups survive
+    restarts.
+    """
+
+    def __init__(self, index_path: str = None):
+        self.index_path = index_path or os.path.join(settings.TEMP_STORAGE_PATH, "file_registry.jsonl")
+
+        # file_id -> entry; batch_id -> file_ids; content hash -> number of entries with it
+        self._entries: Dict[str, Dict] = {}
+        self._batches: Dict[str, List[str]] = {}
+        self._hashes: Dict[str, int] = {}
+        self._log_lines = 0
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def register(self, file_id: str, filename: str, file_path: str, size: int, mime_type: str,
+                 sha256: str, batch_id: str = None) -> Dict:
+        """Add a stored upload"""
+        entry = {
+            "file_id": file_id,
+            "filename": filename,
+            "file_path": file_path,
+            "size": size,
+            "mime_type": mime_type,
+            "sha256": sha256,
+            "batch_id": batch_id,
+            "registered_at": time.time()
+        }
+        with self._lock:
+            self._apply({"op": "register", "entry": entry})
+            self._append({"op": "register", "entry": entry})
+        return dict(entry)
+
+    def get(self, file_id: str) -> Optional[Dict]:
+        """Entry of a registered upload"""
+        with self._lock:
+            entry = self._entries.get(file_id)
+            return dict(entry) if entry else None
+
+    def get_path(self, file_id: str) -> Optional[str]:
+        """Path of a registered upload that is still on disk"""
+        entry = self.get(file_id)
+        if entry and os.path.isfile(entry["file_path"]):
+            return entry["file_path"]
+        return None
+
+    def get_batch(self, batch_id: str) -> List[Dict]:
+        """Entries of a batch's uploads, in upload order"""
+        with self._lock:
+            return [dict(self._entries[file_id]) for file_id in self._batches.get(batch_id, [])]
+
+    def has_content(self, sha256: str) -> bool:
+        """Whether any registered upload has this content hash"""
+        with self._lock:
+            return self._hashes.get(sha256, 0) > 0
+
+    def remove(self, file_ids: List[str]) -> List[Dict]:
+        """Unregister uploads and return their entries"""
+        removed = []
+        with self._lock:
+            for file_id in file_ids:
+                if file_id in self._entries:
+                    removed.append(dict(self._entries[file_id]))
+                    self._apply({"op": "remove", "file_id": file_id})
+                    self._append({"op": "remove", "file_id": file_id})
+        return removed
+
+    def remove_batch(self, batch_id: str) -> List[Dict]:
+        """Unregister a batch's uploads and return their entries"""
+        with self._lock:
+            file_ids = list(self._batches.get(batch_id, []))
+        return self.remove(file_ids)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "batches": len(self._batches),
+                "size_mb": round(sum(entry["size"] or 0 for entry in self._entries.values()) / (1024 * 1024), 2),
+                "log_lines": self._log_lines
+            }
+
+    def _apply(self, operation: Dict) -> None:
+        """Apply one log operation to the in-memory index (caller holds lock)"""
+        file_id = operation["entry"]["file_id"] if operation["op"] == "register" else operation["file_id"]
+        previous = self._entries.pop(file_id, None)
+        if previous:
+            self._unlink(previous)
+
+        if operation["op"] == "register":
+            entry = operation["entry"]
+            self._entries[file_id] = entry
+            self._batches.setdefault(entry["batch_id"], []).append(file_id)
+            if entry["sha256"]:
+                self._hashes[entry["sha256"]] = self._hashes.get(entry["sha256"], 0) + 1
+
+    def _unlink(self, entry: Dict) -> None:
+        """Drop an entry from the batch and hash indexes (caller holds lock)"""
+        batch = self._batches.get(entry["batch_id"], [])
+        if entry["file_id"] in batch:
+            batch.remove(entry["file_id"])
+        if not batch:
+            self._batches.pop(entry["batch_id"], None)
+        if entry["sha256"] and self._hashes.get(entry["sha256"], 0) > 1:
+            self._hashes[entry["sha256"]] -= 1
+        else:
+            self._hashes.pop(entry["sha256"], None)
+
+    def _append(self, operation: Dict) -> None:
+        """Append one operation to the log (caller holds lock)"""
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(operation) + "\n")
+        self._log_lines += 1
+
+    def _load(self) -> None:
+        """Replay the log, compacting it if most lines are stale"""
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                    self._log_lines += 1
+                except (ValueError, KeyError):
+                    continue  # Skip a torn last line from an interrupted write
+
+        if self._log_lines > 2 * len(self._entries) + 100:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the log as one register operation per live entry"""
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps({"op": "register", "entry": entry}) + "\n")
+        os.replace(temp_path, self.index_path)
+        self._log_lines = len(self._entries)
+
+# Global instance
+file_registry = FileRegistry()
@@ -1,39 +1,126 @@
-import google.generativeai as genai
 from typing import Dict, Optional
+import asyncio
+import hashlib
 import json
 import os
-from app.config import settings
+import tempfile
+import threading
+import time
 from pathlib import Path
 
+# Lookups within this many seconds of the last check trust the cached prompts without a stat
+PROMPTS_CHECK_INTERVAL = 2.0
+
+# Serialises writes of every manager in the process
+_store_lock = threading.Lock()
+
 class GeminiMemoryManager:
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.prompts_file = Path("prompts_storage.json")
+    """Prompt registry cached in memory, backed by prompts_storage.json
+
+    The file is stat'ed at most every PROMPTS_CHECK_INTERVAL seconds (from a
+    worker thread on async paths) and re-read only when its mtime changed, so
+    edits by another process show up within that interval. Each prompt keeps a version
+    number (bumped on every change) and a content hash. Writes re-read the file
+    under a process-wide lock and go to a unique temp file that is atomically
+    renamed, off the event loop.
+    """
+    
+    def __init__(self, prompts_file: str = "prompts_storage.json"):
+        self.prompts_file = Path(prompts_file)
+        self.stored_prompts = {}
+        self._loaded_mtime = None
+        self._checked_at = None
         self._load_prompts()
         
-    def _load_prompts(self):
-        """Load prompts from local file"""
-        if self.prompts_file.exists():
+    def _check_due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= PROMPTS_CHECK_INTERVAL
+    
+    async def _refresh_prompts(self, force: bool = False):
+        """_load_prompts on a worker thread, when the check interval has passed (or force)"""
+        if force or self._check_due():
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._load_prompts, True)
+    
+    def _load_prompts(self, force: bool = False):
+        """Load prompts from local file if it changed since the last load"""
+        if not force and not self._check_due():
+            return
+        self._checked_at = time.monotonic()
+        try:
+            mtime = self.prompts_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        
+        if mtime == self._loaded_mtime:
+            return
+        
+        try:
+            prompts = self._read_prompts_file()
+        except ValueError as e:
+            print(f"❌ Failed to read {self.prompts_file}: {e}")
+            return
+        
+        self.stored_prompts = prompts
+        self._loaded_mtime = mtime
+    
+    def _read_prompts_file(self) -> Dict:
+        """Current prompts on disk ({} when there is no store yet)"""
+        try:
             with open(self.prompts_file, 'r') as f:
-                self.stored_prompts = json.load(f)
-        else:
-            self.stored_prompts = {}
-    
-    def _save_prompts(self):
-        """Save prompts to local file"""
-        with open(self.prompts_file, 'w') as f:
-            json.dump(self.stored_prompts, f, indent=2)
+                prompts = json.load(f)
+        except FileNotFoundError:
+            return {}
+        # Older files have no version/hash fields
+        for data in prompts.values():
+            data.setdefault("version", 1)
+            data.setdefault("content_hash", self._hash_content(data["content"]))
+        return prompts
+    
+    def _apply_write(self, prompt_id: str, content: str, description: Optional[str]) -> int:
+        """Read-modify-write of one prompt under the store lock (runs in a worker thread)
+        
+        The file is re-read under the lock, so a write by any other manager is
+        never overwritten and every change gets its own version number.
+        """
+        with _store_lock:
+            prompts = self._read_prompts_file()
+            current = prompts.get(prompt_id)
+            content_hash = self._hash_content(content)
+            if current and current["content_hash"] == content_hash and description in (None, current.get("description")):
+                return current["version"]  # Unchanged, keep the version
+            
+            prompts[prompt_id] = {
+                "content": content,
+                "description": description if description is not None else (current or {}).get("description", ""),
+                "version": (current["version"] + 1) if current else 1,
+                "content_hash": content_hash,
+                "updated_at": time.time()
+            }
+            
+            fd, temp_path = tempfile.mkstemp(prefix=f"{self.prompts_file.name}.", suffix=".tmp", dir=self.prompts_file.parent)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(prompts, f, indent=2)
+                os.replace(temp_path, self.prompts_file)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            
+            self.stored_prompts = prompts
+            self._loaded_mtime = self.prompts_file.stat().st_mtime_ns
+            self._checked_at = time.monotonic()
+            return prompts[prompt_id]["version"]
+    
+    async def _write_prompt(self, prompt_id: str, content: str, description: str = None) -> int:
+        """Set a prompt's content, bump its version and persist the store; returns the version"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._apply_write, prompt_id, content, description)
         
     async def store_prompt(self, prompt_id: str, prompt_content: str, description: str = "") -> bool:
         """Store a prompt locally"""
         try:
-            self.stored_prompts[prompt_id] = {
-                "content": prompt_content,
-                "description": description
-            }
-            self._save_prompts()
-            print(f"✅ Stored prompt '{prompt_id}' locally")
+            version = await self._write_prompt(prompt_id, prompt_content, description)
+            print(f"✅ Stored prompt '{prompt_id}' locally (v{version})")
             return True
             
         except Exception as e:
@@ -43,6 +130,7 @@ class GeminiMemoryManager:
     async def get_prompt(self, prompt_id: str) -> Optional[str]:
         """Retrieve a stored prompt locally"""
         try:
+            await self._refresh_prompts()
             if prompt_id in self.stored_prompts:
                 return self.stored_prompts[prompt_id]["content"]
             return None
@@ -51,13 +139,21 @@ class GeminiMemoryManager:
             print(f"❌ Failed to retrieve prompt '{prompt_id}': {e}")
             return None
     
+    def get_version_tag(self, prompt_id: str) -> Optional[str]:
+        """Version tag of a stored prompt, e.g. business_card_extraction@v3-1a2b3c4d"""
+        self._load_prompts()
+        data = self.stored_prompts.get(prompt_id)
+        if not data:
+            return None
+        return f"{prompt_id}@v{data['version']}-{data['content_hash'][:8]}"
+    
     async def update_prompt(self, prompt_id: str, new_content: str) -> bool:
         """Update an existing prompt locally"""
         try:
+            await self._refresh_prompts()
             if prompt_id in self.stored_prompts:
-                self.stored_prompts[prompt_id]["content"] = new_content
-                self._save_prompts()
-                print(f"✅ Updated prompt '{prompt_id}'")
+                version = await self._write_prompt(prompt_id, new_content)
+                print(f"✅ Updated prompt '{prompt_id}' (v{version})")
                 return True
             return False
             
@@ -68,11 +164,14 @@ class GeminiMemoryManager:
     async def list_stored_prompts(self) -> Dict:
         """List all stored prompts"""
         try:
+            await self._refresh_prompts()
             prompt_list = []
             for prompt_id, data in self.stored_prompts.items():
                 prompt_list.append({
                     "id": prompt_id,
                     "description": data.get("description", ""),
+                    "version": data["version"],
+                    "content_hash": data["content_hash"],
                     "content_preview": data["content"][:100] + "..."
                 })
             return {"prompts": prompt_list}
@@ -80,11 +179,16 @@ class GeminiMemoryManager:
         except Exception as e:
             print(f"❌ Failed to list prompts: {e}")
             return {"prompts": "Error retrieving prompts"}
+    
+    @staticmethod
+    def _hash_content(content: str) -> str:
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 # Initialize default prompts
 async def initialize_default_prompts():
     """Store default prompts in Gemini memory"""
-    memory = GeminiMemoryManager()
+    from app.services.service_registry import get_memory_manager
+    memory = get_memory_manager()
     
     # Business card extraction prompt
     business_card_prompt = """
@@ -1,46 +1,32 @@
-import google.generativeai as genai
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image
 import base64
 import io
 from app.config import settings
-from typing import Dict, Optional, List
+from typing import Awaitable, Callable, Dict, Optional, List, Tuple
 import json
-from app.services.gemini_memory import GeminiMemoryManager
+from app.services.service_registry import get_memory_manager
+from app.services.model_client import model_client
+from app.services.model_backends import get_model_backend
+from app.services.extraction_cache import extraction_cache
+from app.services.image_preprocessor import ImagePreprocessor, ImageSource, describe_source
+from app.services.cpu_pool import cpu_pool
+from app.services.json_stream import IncrementalJSONParser
+from app.services.json_repair import CARD_FIELDS, loads_tolerant, parse_card_records, parse_metrics
+from app.services.text_scanner import normalize_phone
+from app.services.extraction_cascade import CASCADE_PROMPT_ID, CASCADE_TEXT_PROMPT, TEXT_LAYER_PROMPT_ID, TEXT_LAYER_PROMPT, extraction_cascade
+from app.services.pdf_converter import PDFConverter, text_layer_stats
+from app.services.card_detector import CardDetector
 import numpy as np
 import cv2
+import asyncio
+import math
+import os
 
 
-class GeminiService:
-    
-    def __init__(self):
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
-        self.memory = GeminiMemoryManager()
-    
-    async def extract_document_data(self, image_path: str, custom_prompt_id: str = None) -> list:
-        """Extract structured data from business card using dynamic prompts"""
-        if custom_prompt_id:
-            return await self.extract_with_memory_prompt(image_path, custom_prompt_id)
-        else:
-            return await self.extract_business_card_data(image_path)
-    
+DEFAULT_PROMPT_ID = "business_card_extraction"
+BUILTIN_PROMPT_ID = "builtin_business_card"
 
-    
-    async def extract_business_card_data(self, image_path: str) -> list:
-        """Extract structured data from business card using stored prompt from Gemini memory"""
-        try:
-            # Try to get prompt from memory first
-            stored_prompt = await self.memory.get_prompt("business_card_extraction")
-            if stored_prompt:
-                print("✅ Using stored prompt from Gemini memory")
-                return await self.extract_with_memory_prompt(image_path, "business_card_extraction")
-            
-            print("⚠️ No stored prompt found, using hardcoded prompt")
-            # Load and enhance image
-            image = self._enhance_image_for_ocr(image_path)
-            
-            # Create enhanced prompt for better data extraction
-            prompt = """
+BUSINESS_CARD_PROMPT = """
 You are an expert OCR system specialized in business card data extraction. Analyze this business card image with extreme precision and extract ALL visible text.
 
 ⚠️ MULTIPLE CARDS DETECTION - CRITICAL:
@@ -237,6 +223,666 @@ Return an array with SEPARATE JSON object for EACH card:
 
 NOW ANALYZE THE IMAGE AND RETURN ONLY THE JSON ARRAY OUTPUT.
 """
+
+FUSED_PROMPT_ID = "fused_validate_extract"
+
+FUSED_VALIDATE_EXTRACT_PROMPT = """
+You are an expert OCR system for business cards. In ONE pass, decide whether this image is a business card and, if it is, extract every card's contact data.
+
+STEP 1 - VALIDATION:
+A business card typically contains a person's name and job title, a company/organization name, contact information (phone, email, address), logo or branding, and a professional layout in standard card dimensions.
+
+STEP 2 - EXTRACTION (only if it is a business card):
+• The image may contain MULTIPLE cards (side-by-side, stacked, grid) - create one object per card, left-to-right, top-to-bottom
+• Phone numbers are the highest priority: find every number on each card, digits only, comma-separated with no spaces
+• Multiple emails: comma-separated with no spaces
+• Extract text exactly as written; use "N/A" only when a field truly does not exist
+• No person name: use company name in "name"
+
+📋 OUTPUT FORMAT - return ONLY this JSON object, no markdown, no extra text:
+{
+  "is_business_card": true,
+  "confidence": "High",
+  "reasoning": "Brief explanation of your determination",
+  "information_found": ["key information visible on the card"],
+  "cards": [
+    {"name": "Full Person Name", "phone": "phone1,phone2", "email": "email1@domain.com", "company": "Complete Company Name", "designation": "Job Title", "address": "Full Address"}
+  ]
+}
+
+• "confidence" must be one of High, Medium, Low
+• If it is NOT a business card: set "is_business_card" to false and "cards" to []
+"""
+
+BATCH_PROMPT_ID = "batched_extraction"
+
+BATCH_EXTRACTION_WRAPPER = """
+📦 BATCHED REQUEST - {count} SEPARATE IMAGES:
+• Each image below is preceded by its label "IMAGE <index>" (0 to {last_index})
+• Apply the extraction instructions that follow to EACH image independently - never mix data between images
+• Return ONLY one JSON object keyed by image index, where each value is the JSON array you would return for that image:
+{{"0": [{{"name": "...", "phone": "...", "email": "...", "company": "...", "designation": "...", "address": "..."}}], "1": [...]}}
+• Every index from 0 to {last_index} MUST be present; use [] for an image with no business card
+
+EXTRACTION INSTRUCTIONS FOR EACH IMAGE:
+"""
+
+CARD_SIDES_PROMPT_ID = "card_sides"
+
+CARD_SIDES_WRAPPER = """
+🔄 TWO SIDES OF THE SAME BUSINESS CARD(S):
+• The images labelled "FRONT:" and "BACK:" below are the two sides of the same card(s), scanned as consecutive pages
+• Combine what both sides show into one object per card - never return a side as a separate card
+• A field printed on only one side still belongs to that card
+
+EXTRACTION INSTRUCTIONS:
+"""
+
+# Packing limits for batched requests
+BATCH_MAX_OUTPUT_TOKENS = 8192
+BATCH_OUTPUT_TOKENS_PER_IMAGE = 400
+BATCH_IMAGE_TILE_SIZE = 768
+BATCH_TOKENS_PER_TILE = 258
+
+# Schemas for structured (schema-constrained JSON) output
+CARD_RECORD_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": "string"} for field in CARD_FIELDS},
+    "required": CARD_FIELDS
+}
+
+CARD_LIST_SCHEMA = {"type": "array", "items": CARD_RECORD_SCHEMA}
+
+FUSED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "is_business_card": {"type": "boolean"},
+        "confidence": {"type": "string", "enum": ["High", "Medium", "Low"]},
+        "reasoning": {"type": "string"},
+        "information_found": {"type": "array", "items": {"type": "string"}},
+        "cards": CARD_LIST_SCHEMA
+    },
+    "required": ["is_business_card", "confidence", "reasoning", "information_found", "cards"]
+}
+
+FIELD_REREQUEST_PROMPT = """
+An earlier extraction of this business card image came back incomplete. These are the card(s) recovered so far, in order (index from 0):
+{cards}
+
+Look at the image again and extract ONLY these missing fields:
+{missing}
+
+Use the same rules as before: phone numbers digits only, multiple values comma-separated with no spaces, "N/A" only if the field truly does not exist on that card.
+Return ONLY a JSON object keyed by card index, for example: {{"0": {{"phone": "9876543210", "email": "name@company.com"}}}}
+"""
+
+# Receives (card_index, field, value) as each field of a streamed response completes
+PartialFieldCallback = Callable[[int, str, object], Awaitable[None]]
+
+# Receives the cards detected in a multi-card photo before their crops are extracted
+DetectionCallback = Callable[[List[Dict]], Awaitable[None]]
+
+
+class GeminiService:
+    
+    def __init__(self):
+        self.model = get_model_backend().create_model(settings.GEMINI_MODEL, api_key=settings.GEMINI_API_KEY)
+        self.memory = get_memory_manager()
+    
+    async def extract_document_data(self, image_path: ImageSource, custom_prompt_id: str = None,
+                                    on_partial: Optional[PartialFieldCallback] = None,
+                                    on_detection: Optional[DetectionCallback] = None) -> list:
+        """Extract structured data from business card using dynamic prompts
+        
+        With on_partial, the response is streamed and each card field is reported
+        as soon as it is complete. The returned records are the same either way.
+        Photos of several cards are split into per-card crops (reported to
+        on_detection) that are extracted in parallel.
+        """
+        cache_key = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            image_hash = await extraction_cache.hash_image_async(image_path)
+            cache_key, cached_records = await self._get_cached_records(image_hash, image_path, custom_prompt_id)
+            if cached_records is not None:
+                return cached_records
+        
+        if custom_prompt_id:
+            records = await self.extract_with_memory_prompt(image_path, custom_prompt_id, on_partial)
+        else:
+            records = await self._extract_card_crops(image_path, on_partial, on_detection)
+            if records is None:
+                records = await self._extract_single_card_image(image_path, on_partial)
+        
+        # Only cache real results, never the N/A fallback from a failed call
+        if cache_key and self._has_extracted_data(records):
+            await extraction_cache.put_async(cache_key, records, {"image_path": describe_source(image_path), "prompt_id": custom_prompt_id})
+        
+        return records
+    
+    async def get_cached_records(self, image_path: ImageSource, custom_prompt_id: str = None) -> Optional[list]:
+        """Records extract_document_data would return from the cache, without calling the model on a miss"""
+        if not settings.EXTRACTION_CACHE_ENABLED:
+            return None
+        image_hash = await extraction_cache.hash_image_async(image_path)
+        _, cached_records = await self._get_cached_records(image_hash, image_path, custom_prompt_id)
+        return cached_records
+    
+    async def _get_cached_records(self, image_hash: str, image_path: ImageSource,
+                                  custom_prompt_id: str = None) -> Tuple[str, Optional[list]]:
+        """Cache key for this image and prompt, and the records cached under it if any"""
+        cache_key = await self._get_cache_key(image_hash, custom_prompt_id)
+        cached_records = await extraction_cache.get_async(cache_key)
+        if cached_records is not None:
+            print(f"⚡ Using cached extraction for {describe_source(image_path)}")
+            return cache_key, cached_records
+        
+        # Reuse records from an earlier fused validate-and-extract call (e.g. from /validate)
+        if not custom_prompt_id and settings.GEMINI_FUSED_VALIDATION:
+            fused_result = await extraction_cache.get_async(self._get_fused_cache_key(image_hash))
+            if fused_result is not None and fused_result["records"]:
+                print(f"⚡ Using records from fused validation for {describe_source(image_path)}")
+                return cache_key, fused_result["records"]
+        
+        return cache_key, None
+    
+    async def _extract_single_card_image(self, image_path: ImageSource, on_partial: Optional[PartialFieldCallback] = None) -> list:
+        """Default-prompt extraction of an image without card detection"""
+        # Local-first cascade: the model only fills what local OCR + regex could not
+        if settings.EXTRACTION_CASCADE_ENABLED:
+            records = await self._extract_with_cascade(image_path, on_partial)
+            if records is not None:
+                return records
+        return await self.extract_business_card_data(image_path, on_partial)
+    
+    async def _detect_cards(self, image_path: ImageSource, on_detection: Optional[DetectionCallback] = None) -> List[Dict]:
+        """Per-card JPEG crops of a multi-card photo ([] to send the photo whole)"""
+        if not settings.CARD_DETECTION_ENABLED:
+            return []
+        try:
+            # A detector built here carries this process's CARD_* settings into the worker
+            detections = await cpu_pool.run(CardDetector().crop_cards, image_path)
+        except Exception as e:
+            print(f"⚠️ Card detection failed for {describe_source(image_path)}: {e}")
+            return []
+        if not detections:
+            return []
+        
+        print(f"🪪 Detected {len(detections)} card(s) in {describe_source(image_path)}")
+        if on_detection:
+            try:
+                await on_detection([
+                    {key: detection[key] for key in ("index", "quad", "area_ratio", "width", "height")}
+                    for detection in detections
+                ])
+            except Exception as e:
+                print(f"⚠️ Card detection update failed: {e}")
+        return detections
+    
+    @staticmethod
+    def _offset_partial(on_partial: Optional[PartialFieldCallback], offset: int) -> Optional[PartialFieldCallback]:
+        """Report a crop's fields under the card index of that crop in the whole photo"""
+        if on_partial is None:
+            return None
+        
+        async def send(card_index: int, field: str, value):
+            await on_partial(offset + card_index, field, value)
+        return send
+    
+    async def _extract_card_crops(self, image_path: ImageSource, on_partial: Optional[PartialFieldCallback] = None,
+                                  on_detection: Optional[DetectionCallback] = None) -> Optional[list]:
+        """Extract each detected card from its own crop in parallel; None if the photo was not split"""
+        detections = await self._detect_cards(image_path, on_detection)
+        if not detections:
+            return None
+        
+        results = await asyncio.gather(*(
+            self._extract_single_card_image(detection["image"], self._offset_partial(on_partial, detection["index"]))
+            for detection in detections
+        ))
+        
+        # A crop that yielded nothing (not a card, failed call) only adds an N/A row
+        records = [record for crop_records in results for record in crop_records if self._has_extracted_data([record])]
+        return records or [self._get_default_data()]
+    
+    async def validate_and_extract(self, image_path: str,
+                                   on_partial: Optional[PartialFieldCallback] = None,
+                                   on_detection: Optional[DetectionCallback] = None) -> Tuple[Optional[Dict], Optional[list]]:
+        """Validate and extract business card data in a single model call
+        
+        Returns (validation, records) where validation has the same shape as
+        BusinessCardValidator.validate_business_card. Returns (None, None) if the
+        fused response could not be used, so callers can fall back to separate calls.
+        Photos of several cards get one fused call per detected card, in parallel.
+        """
+        detections = await self._detect_cards(image_path, on_detection)
+        if detections:
+            results = await asyncio.gather(*(
+                self._validate_and_extract_image(detection["image"], self._offset_partial(on_partial, detection["index"]))
+                for detection in detections
+            ))
+            validation, records = self._combine_crop_validations(results)
+            if validation is not None:
+                if settings.EXTRACTION_CACHE_ENABLED and (not validation["is_business_card"] or self._has_extracted_data(records)):
+                    image_hash = await extraction_cache.hash_image_async(image_path)
+                    await extraction_cache.put_async(
+                        self._get_fused_cache_key(image_hash),
+                        {"validation": validation, "records": records},
+                        {"image_path": describe_source(image_path), "prompt_id": FUSED_PROMPT_ID}
+                    )
+                return validation, records
+        
+        return await self._validate_and_extract_image(image_path, on_partial)
+    
+    def _combine_crop_validations(self, results: List[Tuple[Optional[Dict], Optional[list]]]) -> Tuple[Optional[Dict], Optional[list]]:
+        """One validation for the photo: valid if any detected card is, with the records of the valid ones"""
+        answered = [(validation, records) for validation, records in results if validation is not None]
+        if len(answered) < len(results):
+            return None, None  # Let the whole photo go through the usual path
+        
+        valid = [(validation, records) for validation, records in answered if validation["is_business_card"]]
+        confidence_rank = {"High": 2, "Medium": 1, "Low": 0}
+        best = max(valid or answered, key=lambda result: confidence_rank.get(result[0]["confidence"], 0))[0]
+        information_found = []
+        for validation, _ in valid:
+            information_found += [info for info in validation["information_found"] if info not in information_found]
+        
+        validation = {
+            "is_business_card": bool(valid),
+            "confidence": best["confidence"],
+            "reasoning": f"{len(valid)} of {len(answered)} cards detected in the photo are business cards. {best['reasoning']}",
+            "information_found": information_found,
+            "raw_response": "\n".join(validation["raw_response"] for validation, _ in answered)
+        }
+        return validation, [record for _, records in valid for record in records or []]
+    
+    async def _validate_and_extract_image(self, image_path: ImageSource,
+                                          on_partial: Optional[PartialFieldCallback] = None) -> Tuple[Optional[Dict], Optional[list]]:
+        """Fused validate-and-extract call for one image, without card detection"""
+        cache_key = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            image_hash = await extraction_cache.hash_image_async(image_path)
+            cache_key = self._get_fused_cache_key(image_hash)
+            cached_result = await extraction_cache.get_async(cache_key)
+            if cached_result is not None:
+                print(f"⚡ Using cached validation and extraction for {describe_source(image_path)}")
+                return cached_result["validation"], cached_result["records"]
+        
+        # A card whose every field was read locally needs no model call to be validated
+        if settings.EXTRACTION_CASCADE_ENABLED:
+            records = await extraction_cascade.extract(self, image_path, on_partial, local_only=True)
+            if records:
+                print(f"✅ Resolved locally, skipping fused validation for {describe_source(image_path)}")
+                return {
+                    "is_business_card": True,
+                    "confidence": "Medium",
+                    "reasoning": "Name, contact details, company, designation and address read locally from the card text",
+                    "information_found": [field for field in CARD_FIELDS if records[0][field] != "N/A"],
+                    "raw_response": ""
+                }, records
+        
+        try:
+            image = await self._prepare_image_for_model(image_path)
+            
+            generation_config = {
+                "temperature": 0.05,
+                "top_p": 0.75,
+                "top_k": 30,
+                "max_output_tokens": 2048,
+            }
+            generation_config = self._with_response_schema(generation_config, FUSED_RESPONSE_SCHEMA)
+            
+            response_text = await self._generate_text([FUSED_VALIDATE_EXTRACT_PROMPT, image], generation_config, on_partial)
+            
+            validation, records = self._parse_fused_response(response_text)
+            print(f"✅ Fused validation: {'VALID' if validation['is_business_card'] else 'INVALID'}, {len(records)} card(s)")
+            
+        except Exception as e:
+            print(f"❌ Fused validation and extraction error: {e}")
+            return None, None
+        
+        if cache_key and (not validation["is_business_card"] or self._has_extracted_data(records)):
+            await extraction_cache.put_async(
+                cache_key,
+                {"validation": validation, "records": records},
+                {"image_path": describe_source(image_path), "prompt_id": FUSED_PROMPT_ID}
+            )
+        
+        return validation, records
+    
+    def _parse_fused_response(self, response_text: str) -> Tuple[Dict, list]:
+        """Parse the fused JSON object into a validation result and card records"""
+        raw_response = response_text.strip()
+        
+        try:
+            result, status = loads_tolerant(raw_response)
+        except ValueError:
+            parse_metrics.record_parse("failed")
+            raise
+        parse_metrics.record_parse(status)
+        if not isinstance(result, dict):
+            raise ValueError("Fused response is not a JSON object")
+        
+        is_business_card = result.get("is_business_card") in (True, "true", "YES", "yes")
+        confidence = str(result.get("confidence", "Medium")).capitalize()
+        if confidence not in ("High", "Medium", "Low"):
+            confidence = "Medium"
+        
+        information_found = result.get("information_found") or []
+        if not isinstance(information_found, list):
+            information_found = [str(information_found)]
+        
+        validation = {
+            "is_business_card": is_business_card,
+            "confidence": confidence,
+            "reasoning": result.get("reasoning", "Unable to determine"),
+            "information_found": [str(info) for info in information_found],
+            "raw_response": raw_response
+        }
+        
+        cards = result.get("cards") or []
+        if isinstance(cards, dict):
+            cards = [cards]
+        records = self._normalize_records(cards) if is_business_card else []
+        self._stamp_prompt_version(records, self._prompt_version(FUSED_PROMPT_ID, FUSED_VALIDATE_EXTRACT_PROMPT))
+        
+        return validation, records
+    
+    async def extract_batch(self, image_paths: List[str]) -> Dict[str, list]:
+        """Extract many images, packing several into each model request
+        
+        Returns records keyed by image path. Images whose packed result is missing
+        or malformed fall back to a normal per-image extract_document_data call.
+        """
+        results = {}
+        pending = []
+        
+        prompt_id, prompt_content = await self._resolve_prompt()
+        batch_prompt_id = f"{BATCH_PROMPT_ID}:{prompt_id}"
+        batch_prompt_hash = extraction_cache.hash_prompt(BATCH_EXTRACTION_WRAPPER + prompt_content)
+        batch_prompt_version = f"{BATCH_PROMPT_ID}:{self._prompt_version(prompt_id, prompt_content)}"
+        
+        # Serve images already extracted individually or in an earlier batch
+        for image_path in image_paths:
+            batch_key = None
+            if settings.EXTRACTION_CACHE_ENABLED:
+                image_hash = await extraction_cache.hash_image_async(image_path)
+                batch_key = extraction_cache.make_key(image_hash, batch_prompt_id, batch_prompt_hash)
+                for key in (await self._get_cache_key(image_hash), batch_key):
+                    cached_records = await extraction_cache.get_async(key)
+                    if cached_records is not None:
+                        results[image_path] = cached_records
+                        break
+            if image_path not in results:
+                pending.append((image_path, batch_key))
+        
+        if not pending:
+            return results
+        
+        # Planning only stats files and reads image headers, so a thread is enough
+        loop = asyncio.get_running_loop()
+        groups = await loop.run_in_executor(
+            None, GeminiService._plan_batches, [path for path, _ in pending],
+            settings.GEMINI_BATCH_SIZE, settings.GEMINI_BATCH_MAX_MB, settings.GEMINI_BATCH_MAX_INPUT_TOKENS, settings.MODEL_IMAGE_LONG_EDGE
+        )
+        cache_keys = dict(pending)
+        print(f"📦 Packing {len(pending)} image(s) into {len(groups)} request(s)")
+        
+        async def extract_group(group: List[str]):
+            packed_results = await self._extract_packed(group, prompt_content) if len(group) > 1 else {}
+            for image_path in group:
+                records = packed_results.get(image_path)
+                if records is None:
+                    records = await self.extract_document_data(image_path)
+                    results[image_path] = records
+                    continue
+                
+                self._stamp_prompt_version(records, batch_prompt_version)
+                if cache_keys[image_path] and self._has_extracted_data(records):
+                    await extraction_cache.put_async(cache_keys[image_path], records, {"image_path": describe_source(image_path), "prompt_id": batch_prompt_id})
+                results[image_path] = records
+        
+        await asyncio.gather(*[extract_group(group) for group in groups])
+        return results
+    
+    @staticmethod
+    def _plan_batches(image_paths: List[str], batch_size: int, max_mb: int, max_input_tokens: int,
+                      long_edge: Optional[int]) -> List[List[str]]:
+        """Group images into requests bounded by the batch size, payload size and token limits"""
+        max_images = max(1, min(batch_size, BATCH_MAX_OUTPUT_TOKENS // BATCH_OUTPUT_TOKENS_PER_IMAGE))
+        max_bytes = max_mb * 1024 * 1024
+        
+        groups = []
+        current, current_bytes, current_tokens = [], 0, 0
+        for image_path in image_paths:
+            image_bytes = os.path.getsize(image_path)
+            image_tokens = GeminiService._estimate_image_tokens(image_path, long_edge)
+            
+            if current and (
+                len(current) >= max_images or
+                current_bytes + image_bytes > max_bytes or
+                current_tokens + image_tokens > max_input_tokens
+            ):
+                groups.append(current)
+                current, current_bytes, current_tokens = [], 0, 0
+            
+            current.append(image_path)
+            current_bytes += image_bytes
+            current_tokens += image_tokens
+        
+        if current:
+            groups.append(current)
+        return groups
+    
+    @staticmethod
+    def _estimate_image_tokens(image_path: str, long_edge: Optional[int]) -> int:
+        """Estimate image input tokens from dimensions (one token block per tile)"""
+        try:
+            with Image.open(image_path) as image:
+                width, height = image.size
+        except Exception:
+            return BATCH_TOKENS_PER_TILE
+        
+        # Images are downscaled to long_edge before upload, so estimate from the size actually sent
+        if long_edge and max(width, height) > long_edge:
+            scale = long_edge / max(width, height)
+            width, height = width * scale, height * scale
+        tiles = math.ceil(width / BATCH_IMAGE_TILE_SIZE) * math.ceil(height / BATCH_IMAGE_TILE_SIZE)
+        return max(1, tiles) * BATCH_TOKENS_PER_TILE
+    
+    async def _extract_packed(self, image_paths: List[str], prompt_content: str) -> Dict[str, list]:
+        """Send several images in one request and split the response per image
+        
+        Returns only the images whose results could be parsed; an empty dict
+        means the whole packed response was unusable.
+        """
+        try:
+            contents = [BATCH_EXTRACTION_WRAPPER.format(count=len(image_paths), last_index=len(image_paths) - 1) + prompt_content]
+            for index, image_path in enumerate(image_paths):
+                image = await self._prepare_image_for_model(image_path)
+                contents.extend([f"IMAGE {index}:", image])
+            
+            generation_config = {
+                "temperature": 0.05,
+                "top_p": 0.75,
+                "top_k": 30,
+                "max_output_tokens": BATCH_MAX_OUTPUT_TOKENS,
+            }
+            if settings.GEMINI_STRUCTURED_OUTPUT:
+                generation_config["response_mime_type"] = "application/json"
+            
+            response = await model_client.generate_content(self.model, contents, generation_config=generation_config)
+            return self._parse_packed_response(response.text, image_paths)
+            
+        except Exception as e:
+            print(f"❌ Batched extraction error, falling back to per-image calls: {e}")
+            return {}
+    
+    def _parse_packed_response(self, response_text: str, image_paths: List[str]) -> Dict[str, list]:
+        """Split a JSON object keyed by image index into per-image records"""
+        try:
+            packed, status = loads_tolerant(response_text)
+        except ValueError as e:
+            parse_metrics.record_parse("failed")
+            print(f"❌ Malformed batched response: {e}")
+            return {}
+        parse_metrics.record_parse(status)
+        
+        if not isinstance(packed, dict):
+            return {}
+        
+        results = {}
+        for index, image_path in enumerate(image_paths):
+            cards = packed.get(str(index))
+            if isinstance(cards, dict):
+                cards = [cards]
+            if not isinstance(cards, list) or not all(isinstance(card, dict) for card in cards):
+                print(f"⚠️ Batched response missing image {index}, will extract individually")
+                continue
+            results[image_path] = self._normalize_records(cards)
+        
+        return results
+    
+    async def extract_card_sides(self, front: ImageSource, back: ImageSource, custom_prompt_id: str = None) -> Optional[list]:
+        """Extract a card from its front and back in one request; None to extract the sides separately"""
+        prompt_id, prompt_content = await self._resolve_prompt(custom_prompt_id)
+        prompt = CARD_SIDES_WRAPPER + prompt_content
+        
+        cache_key = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            front_hash, back_hash = await asyncio.gather(
+                extraction_cache.hash_image_async(front),
+                extraction_cache.hash_image_async(back)
+            )
+            cache_key = extraction_cache.make_key(f"{front_hash}:{back_hash}", CARD_SIDES_PROMPT_ID, extraction_cache.hash_prompt(prompt))
+            cached_records = await extraction_cache.get_async(cache_key)
+            if cached_records is not None:
+                print(f"⚡ Using cached front/back extraction for {describe_source(front)}")
+                return cached_records
+        
+        try:
+            front_image, back_image = await asyncio.gather(self._prepare_image_for_model(front), self._prepare_image_for_model(back))
+            generation_config = {
+                "temperature": 0.05,
+                "top_p": 0.75,
+                "top_k": 30,
+                "max_output_tokens": 2048,
+            }
+            generation_config = self._with_response_schema(generation_config, CARD_LIST_SCHEMA)
+            
+            raw_text = await self._generate_text([prompt, "FRONT:", front_image, "BACK:", back_image], generation_config)
+            cards = await self._parse_cards(raw_text, front_image, required=settings.GEMINI_STRUCTURED_OUTPUT)
+            records = self._stamp_prompt_version(self._normalize_records(cards), self._prompt_version(prompt_id, prompt_content))
+        except Exception as e:
+            print(f"❌ Front/back extraction error, extracting sides separately: {e}")
+            return None
+        
+        if not self._has_extracted_data(records):
+            return None
+        print(f"✅ Gemini extracted {len(records)} card(s) from front and back")
+        if cache_key:
+            await extraction_cache.put_async(cache_key, records, {"image_path": describe_source(front), "prompt_id": CARD_SIDES_PROMPT_ID})
+        return records
+    
+    async def extract_pdf_text_layer(self, pdf_path: str, max_pages: int = None) -> Optional[List[list]]:
+        """Records per page from a digitally generated PDF's text layer, or None to rasterize it
+        
+        Uses the local regex pass or a text-only prompt, so the PDF is never
+        rendered and no image tokens are sent.
+        """
+        if not settings.PDF_TEXT_LAYER_ENABLED:
+            return None
+        pages = await cpu_pool.run(PDFConverter.extract_text_layer, pdf_path, max_pages)
+        text_layer_stats.record_pdf(pages is not None, len(pages or []))
+        if pages is None:
+            return None
+        
+        print(f"📝 Extracting {pdf_path} from its text layer ({len(pages)} page(s)), skipping rasterization")
+        return list(await asyncio.gather(*(self._extract_page_text(text) for text in pages)))
+    
+    async def _extract_page_text(self, text: str) -> list:
+        cache_key = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            cache_key = extraction_cache.make_key(extraction_cache.hash_prompt(text), TEXT_LAYER_PROMPT_ID, extraction_cache.hash_prompt(TEXT_LAYER_PROMPT))
+            cached_records = await extraction_cache.get_async(cache_key)
+            if cached_records is not None:
+                text_layer_stats.record_page("cached")
+                return cached_records
+        
+        records, outcome = await extraction_cascade.extract_text_layer(self, text)
+        text_layer_stats.record_page(outcome)
+        if cache_key and self._has_extracted_data(records):
+            await extraction_cache.put_async(cache_key, records, {"image_path": "pdf text layer", "prompt_id": TEXT_LAYER_PROMPT_ID})
+        return records
+    
+    async def _extract_with_cascade(self, image_path: ImageSource, on_partial: Optional[PartialFieldCallback] = None) -> Optional[list]:
+        """Cascade extraction, cached under its own prompt; None falls back to vision extraction"""
+        cache_key = None
+        if settings.EXTRACTION_CACHE_ENABLED:
+            image_hash = await extraction_cache.hash_image_async(image_path)
+            cache_key = extraction_cache.make_key(image_hash, CASCADE_PROMPT_ID, extraction_cache.hash_prompt(CASCADE_TEXT_PROMPT))
+            cached_records = await extraction_cache.get_async(cache_key)
+            if cached_records is not None:
+                print(f"⚡ Using cached cascade extraction for {describe_source(image_path)}")
+                return cached_records
+        
+        records = await extraction_cascade.extract(self, image_path, on_partial)
+        if cache_key and records and self._has_extracted_data(records):
+            await extraction_cache.put_async(cache_key, records, {"image_path": describe_source(image_path), "prompt_id": CASCADE_PROMPT_ID})
+        return records
+    
+    def _get_fused_cache_key(self, image_hash: str) -> str:
+        return extraction_cache.make_key(image_hash, FUSED_PROMPT_ID, extraction_cache.hash_prompt(FUSED_VALIDATE_EXTRACT_PROMPT))
+    
+    async def _resolve_prompt(self, custom_prompt_id: str = None) -> Tuple[str, str]:
+        """Return the (prompt_id, content) that extraction will actually use"""
+        for prompt_id in (custom_prompt_id, DEFAULT_PROMPT_ID):
+            if prompt_id:
+                content = await self.memory.get_prompt(prompt_id)
+                if content:
+                    return prompt_id, content
+        return BUILTIN_PROMPT_ID, BUSINESS_CARD_PROMPT
+    
+    def _prompt_version(self, prompt_id: str, prompt_content: str) -> str:
+        """Version tag of the prompt that produced a result (stored prompts carry their version number)"""
+        return self.memory.get_version_tag(prompt_id) or f"{prompt_id}@{extraction_cache.hash_prompt(prompt_content)[:8]}"
+    
+    def _stamp_prompt_version(self, records: list, prompt_version: str) -> list:
+        for record in records:
+            if isinstance(record, dict):
+                record["prompt_version"] = prompt_version
+        return records
+    
+    async def _get_cache_key(self, image_hash: str, custom_prompt_id: str = None) -> str:
+        """Cache key from image SHA-256, prompt id and prompt content hash"""
+        prompt_id, prompt_content = await self._resolve_prompt(custom_prompt_id)
+        return extraction_cache.make_key(image_hash, prompt_id, extraction_cache.hash_prompt(prompt_content))
+    
+    def _has_extracted_data(self, records: list) -> bool:
+        """Check that at least one record has a non-N/A field"""
+        return any(
+            value not in ("N/A", "", None)
+            for record in records or []
+            for key, value in record.items()
+            if key != "prompt_version"
+        )
+    
+
+    
+    async def extract_business_card_data(self, image_path: ImageSource, on_partial: Optional[PartialFieldCallback] = None) -> list:
+        """Extract structured data from business card using stored prompt from Gemini memory"""
+        try:
+            # Try to get prompt from memory first
+            stored_prompt = await self.memory.get_prompt("business_card_extraction")
+            if stored_prompt:
+                print("✅ Using stored prompt from Gemini memory")
+                return await self.extract_with_memory_prompt(image_path, "business_card_extraction", on_partial)
+            
+            print("⚠️ No stored prompt found, using hardcoded prompt")
+            # Load and enhance image
+            image = await self._prepare_image_for_model(image_path)
+            
+            # Enhanced prompt for better data extraction
+            prompt = BUSINESS_CARD_PROMPT
             
             # Generate content with image and prompt - use high quality settings
             generation_config = {
@@ -245,91 +891,24 @@ NOW ANALYZE THE IMAGE AND RETURN ONLY THE JSON ARRAY OUTPUT.
                 "top_k": 30,
                 "max_output_tokens": 2048,
             }
+            generation_config = self._with_response_schema(generation_config, CARD_LIST_SCHEMA)
             
-            # Add retry logic for rate limiting
-            import time
-            max_retries = 3
-            retry_delay = 2
-            
-            for attempt in range(max_retries):
-                try:
-                    response = self.model.generate_content(
-                        [prompt, image],
-                        generation_config=generation_config
-                    )
-                    break
-                except Exception as e:
-                    if "429" in str(e) or "quota" in str(e).lower():
-                        if attempt < max_retries - 1:
-                            print(f"Rate limit hit, retrying in {retry_delay} seconds...")
-                            time.sleep(retry_delay)
-                            retry_delay *= 2  # Exponential backoff
-                            continue
-                    raise e
+            raw_text = await self._generate_text([prompt, image], generation_config, on_partial)
             
             # Debug: Print raw response
             print(f"\n🔍 RAW GEMINI RESPONSE:")
-            print(f"'{response.text}'")
-            print(f"Length: {len(response.text)} characters\n")
+            print(f"'{raw_text}'")
+            print(f"Length: {len(raw_text)} characters\n")
             
-            # Parse JSON response
-            try:
-                # Clean response text
-                response_text = response.text.strip()
-                
-                # Remove markdown code blocks if present
-                if response_text.startswith('```json'):
-                    response_text = response_text[7:]
-                elif response_text.startswith('```'):
-                    response_text = response_text[3:]
-                
-                if response_text.endswith('```'):
-                    response_text = response_text[:-3]
-                
-                response_text = response_text.strip()
-                
-                # Fix common JSON issues
-                response_text = response_text.replace(': N/A,', ': "N/A",').replace(': N/A}', ': "N/A"}')
-                
-                # Extract JSON if there's extra text
-                if '[' in response_text and ']' in response_text:
-                    start = response_text.find('[')
-                    end = response_text.rfind(']') + 1
-                    response_text = response_text[start:end]
-                elif '{' in response_text and '}' in response_text:
-                    # Handle case where single object returned instead of array
-                    start = response_text.find('{')
-                    end = response_text.rfind('}') + 1
-                    response_text = '[' + response_text[start:end] + ']'
-                
-                # Parse the JSON array
-                extracted_cards = json.loads(response_text)
-                
-                # Ensure it's a list
-                if not isinstance(extracted_cards, list):
-                    extracted_cards = [extracted_cards]
-                
-                # For multi-page processing, return single complete records without splitting phone numbers
-                all_records = []
-                for card_data in extracted_cards:
-                    # Create single complete record instead of multiple records
-                    complete_record = {
-                        "name": card_data.get('name', 'N/A'),
-                        "phone": self._clean_phone_numbers(card_data.get('phone', 'N/A')),
-                        "email": card_data.get('email', 'N/A'),
-                        "company": card_data.get('company', 'N/A'),
-                        "designation": card_data.get('designation', 'N/A'),
-                        "address": card_data.get('address', 'N/A')
-                    }
-                    all_records.append(complete_record)
-                
-                print(f"✅ Gemini extracted {len(extracted_cards)} card(s) with {len(all_records)} complete record(s)")
-                return all_records
-                
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON parsing error: {e}")
-                print(f"Raw response: {response.text}")
-                return [self._get_default_data()]
+            # Parse with the tolerant parser; only broken fields are asked for again
+            extracted_cards = await self._parse_cards(raw_text, image, required=settings.GEMINI_STRUCTURED_OUTPUT)
+            
+            # For multi-page processing, return single complete records without splitting phone numbers
+            all_records = self._normalize_records(extracted_cards)
+            self._stamp_prompt_version(all_records, self._prompt_version(BUILTIN_PROMPT_ID, prompt))
+            
+            print(f"✅ Gemini extracted {len(extracted_cards)} card(s) with {len(all_records)} complete record(s)")
+            return all_records
                 
         except Exception as e:
             print(f"❌ Gemini extraction error: {e}")
@@ -337,6 +916,108 @@ NOW ANALYZE THE IMAGE AND RETURN ONLY THE JSON ARRAY OUTPUT.
     
 
     
+    def _with_response_schema(self, generation_config: Dict, schema: Dict) -> Dict:
+        """Request schema-constrained JSON output when structured output is enabled"""
+        if settings.GEMINI_STRUCTURED_OUTPUT:
+            generation_config = dict(generation_config, response_mime_type="application/json", response_schema=schema)
+        return generation_config
+    
+    async def _parse_cards(self, response_text: str, image: Dict, required: bool = False) -> list:
+        """Parse card objects, re-requesting only fields that were broken or cut off
+        
+        A response that cannot be parsed at all counts as one card with every field broken.
+        """
+        try:
+            cards, broken, status = parse_card_records(response_text, required=required)
+            parse_metrics.record_parse(status, sum(len(fields) for fields in broken.values()))
+        except ValueError as e:
+            print(f"❌ JSON parsing error: {e}")
+            print(f"Raw response: {response_text}")
+            parse_metrics.record_parse("failed", len(CARD_FIELDS))
+            cards, broken = [{}], {0: list(CARD_FIELDS)}
+        
+        if broken:
+            await self._rerequest_fields(image, cards, broken)
+        return cards
+    
+    async def _rerequest_fields(self, image: Dict, cards: list, broken: Dict[int, List[str]]) -> None:
+        """Ask the model for the broken fields only and fill them into cards in place"""
+        requested = sum(len(fields) for fields in broken.values())
+        recovered = 0
+        missing = "\n".join(f"• Card {index}: {', '.join(fields)}" for index, fields in sorted(broken.items()))
+        print(f"🔁 Re-requesting {requested} broken field(s):\n{missing}")
+        
+        try:
+            prompt = FIELD_REREQUEST_PROMPT.format(cards=json.dumps(cards, ensure_ascii=False), missing=missing)
+            generation_config = {"temperature": 0.05, "top_p": 0.75, "top_k": 30, "max_output_tokens": 1024}
+            if settings.GEMINI_STRUCTURED_OUTPUT:
+                generation_config["response_mime_type"] = "application/json"
+            
+            response = await model_client.generate_content(self.model, [prompt, image], generation_config=generation_config)
+            patches, _ = loads_tolerant(response.text)
+            if isinstance(patches, list):
+                patches = {str(index): patch for index, patch in enumerate(patches)}
+            
+            for index, fields in broken.items():
+                patch = patches.get(str(index)) if isinstance(patches, dict) else None
+                if not isinstance(patch, dict):
+                    continue
+                for field in fields:
+                    value = patch.get(field)
+                    if isinstance(value, list):
+                        value = ",".join(str(item) for item in value)
+                    if isinstance(value, (str, int, float)):
+                        cards[index][field] = str(value)
+                        recovered += 1
+        except Exception as e:
+            print(f"❌ Field re-request failed: {e}")
+        
+        parse_metrics.record_rerequest(requested, recovered)
+    
+    async def _generate_text(self, contents: list, generation_config: Dict, on_partial: Optional[PartialFieldCallback] = None) -> str:
+        """Run the model and return the response text, streaming card fields to on_partial if given"""
+        if on_partial is None or not settings.GEMINI_STREAMING:
+            response = await model_client.generate_content(self.model, contents, generation_config=generation_config)
+            return response.text
+        
+        parser = IncrementalJSONParser()
+        
+        async def on_text(chunk: str):
+            for card_index, field, value in parser.feed(chunk):
+                if field == "phone" and isinstance(value, str):
+                    value = self._clean_phone_numbers(value)
+                try:
+                    await on_partial(card_index, field, value)
+                except Exception as e:
+                    print(f"⚠️ Partial field update failed: {e}")
+        
+        return await model_client.generate_content_stream(self.model, contents, generation_config, on_text)
+    
+    def _normalize_records(self, extracted_cards: list) -> list:
+        """Create single complete record per card instead of multiple records"""
+        all_records = []
+        for card_data in extracted_cards:
+            card_data = {field: self._field_text(card_data.get(field)) for field in CARD_FIELDS}
+            complete_record = {
+                "name": card_data['name'],
+                "phone": self._clean_phone_numbers(card_data['phone']),
+                "email": card_data['email'],
+                "company": card_data['company'],
+                "designation": card_data['designation'],
+                "address": card_data['address']
+            }
+            all_records.append(complete_record)
+        return all_records
+    
+    @staticmethod
+    def _field_text(value) -> str:
+        """Field value as text: lists comma-joined, missing values N/A"""
+        if value is None or value == "":
+            return 'N/A'
+        if isinstance(value, list):
+            return ','.join(str(item) for item in value) or 'N/A'
+        return str(value)
+    
     def _clean_phone_numbers(self, phone_str: str) -> str:
         """Clean and combine phone numbers without splitting into separate records"""
         if not phone_str or phone_str == 'N/A':
@@ -344,49 +1025,21 @@ NOW ANALYZE THE IMAGE AND RETURN ONLY THE JSON ARRAY OUTPUT.
         
         phones = []
         for phone in phone_str.split(','):
-            clean_phone = ''.join(filter(str.isdigit, phone.strip()))
-            
-            # Remove +91 if phone number is longer than 10 digits and starts with 91
-            if len(clean_phone) > 10 and clean_phone.startswith('91'):
-                clean_phone = clean_phone[2:]  # Remove the '91' prefix
-            
-            # Accept 8-digit landlines, 10-digit mobiles and 11-12 digit numbers (with STD codes)
-            if 8 <= len(clean_phone) <= 12 and clean_phone not in phones:
+            clean_phone = normalize_phone(phone)
+            if clean_phone and clean_phone not in phones:
                 phones.append(clean_phone)
         
         return ','.join(phones) if phones else 'N/A'
     
-    def _enhance_image_for_ocr(self, image_path: str) -> Image.Image:
-        """Enhance image brightness, contrast, and sharpness for better OCR"""
-        try:
-            # Load image
-            image = Image.open(image_path)
-            
-            # Convert to RGB if needed
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Enhance brightness (increase by 20%)
-            brightness_enhancer = ImageEnhance.Brightness(image)
-            image = brightness_enhancer.enhance(1.2)
-            
-            # Enhance contrast (increase by 30%)
-            contrast_enhancer = ImageEnhance.Contrast(image)
-            image = contrast_enhancer.enhance(1.3)
-            
-            # Enhance sharpness (increase by 50%)
-            sharpness_enhancer = ImageEnhance.Sharpness(image)
-            image = sharpness_enhancer.enhance(1.5)
-            
-            # Apply unsharp mask for better text clarity
-            image = image.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=3))
-            
+    async def _prepare_image_for_model(self, image_path: ImageSource, enhance: bool = True) -> Dict:
+        """Load downscaled image, optionally enhance it, and re-encode it for upload (in the CPU pool)"""
+        image = await cpu_pool.run(
+            ImagePreprocessor.prepare, image_path,
+            settings.MODEL_IMAGE_LONG_EDGE, settings.MODEL_IMAGE_FORMAT, settings.MODEL_IMAGE_QUALITY, enhance
+        )
+        if enhance:
             print("✅ Image enhanced for better OCR")
-            return image
-            
-        except Exception as e:
-            print(f"⚠️ Image enhancement failed, using original: {e}")
-            return Image.open(image_path)
+        return image
     
     def _get_default_data(self) -> Dict[str, str]:
         """Return default N/A values for business cards"""
@@ -411,16 +1064,17 @@ NOW ANALYZE THE IMAGE AND RETURN ONLY THE JSON ARRAY OUTPUT.
     
 
     
-    async def extract_with_memory_prompt(self, image_path: str, prompt_id: str) -> list:
+    async def extract_with_memory_prompt(self, image_path: ImageSource, prompt_id: str,
+                                         on_partial: Optional[PartialFieldCallback] = None) -> list:
         """Extract data using stored prompt from Gemini memory"""
         try:
-            image = Image.open(image_path)
+            image = await self._prepare_image_for_model(image_path, False)
             
             # Get prompt from memory
             stored_prompt = await self.memory.get_prompt(prompt_id)
             if not stored_prompt:
                 print(f"❌ Prompt '{prompt_id}' not found in memory, using default")
-                return await self.extract_business_card_data(image_path)
+                return await self.extract_business_card_data(image_path, on_partial)
             
             print(f"✅ Using stored prompt: {prompt_id}")
             
@@ -430,32 +1084,24 @@ NOW ANALYZE THE IMAGE AND RETURN ONLY THE JSON ARRAY OUTPUT.
                 "top_k": 40,
                 "max_output_tokens": 2048,
             }
+            # Only the business card prompt is known to produce card records
+            is_card_prompt = prompt_id == DEFAULT_PROMPT_ID
+            if is_card_prompt:
+                generation_config = self._with_response_schema(generation_config, CARD_LIST_SCHEMA)
             
-            response = self.model.generate_content([stored_prompt, image], generation_config=generation_config)
-            
-            print(f"🔍 MEMORY PROMPT RESPONSE: {response.text[:200]}...")
-            
-            # Parse JSON response
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3]
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3]
+            raw_text = await self._generate_text([stored_prompt, image], generation_config, on_partial)
             
-            if '[' in response_text and ']' in response_text:
-                start = response_text.find('[')
-                end = response_text.rfind(']') + 1
-                response_text = response_text[start:end]
-            elif '{' in response_text and '}' in response_text:
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                response_text = '[' + response_text[start:end] + ']'
+            print(f"🔍 MEMORY PROMPT RESPONSE: {raw_text[:200]}...")
             
-            extracted_data = json.loads(response_text)
-            if not isinstance(extracted_data, list):
-                extracted_data = [extracted_data]
+            if is_card_prompt:
+                extracted_data = await self._parse_cards(raw_text, image, required=settings.GEMINI_STRUCTURED_OUTPUT)
+            else:
+                extracted_data, status = loads_tolerant(raw_text)
+                parse_metrics.record_parse(status)
+                if not isinstance(extracted_data, list):
+                    extracted_data = [extracted_data]
             
-            return extracted_data
+            return self._stamp_prompt_version(extracted_data, self._prompt_version(prompt_id, stored_prompt))
             
         except Exception as e:
             print(f"❌ Memory prompt extraction error: {e}")
@@ -0,0 +1,290 @@
+import json
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+CARD_FIELDS = ["name", "phone", "email", "company", "designation", "address"]
+
+SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+LITERALS = ("true", "false", "null")
+# JSON's own number grammar: anything else bare (+91..., 1_000, inf, 007) is quoted
+JSON_NUMBER = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+# Bracket positions tried as the start of the JSON value before giving up
+MAX_CANDIDATES = 8
+
+
+class ParseMetrics:
+    """Counters for model output parsing and field re-requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.clean = 0
+        self.repaired = 0
+        self.truncated = 0
+        self.failed = 0
+        self.broken_fields = 0
+        self.rerequests = 0
+        self.rerequested_fields = 0
+        self.recovered_fields = 0
+
+    def record_parse(self, status: str, broken_fields: int = 0) -> None:
+        with self._lock:
+            self.responses += 1
+            setattr(self, status, getattr(self, status) + 1)
+            self.broken_fields += broken_fields
+
+    def record_rerequest(self, requested: int, recovered: int) -> None:
+        with self._lock:
+            self.rerequests += 1
+            self.rerequested_fields += requested
+            self.recovered_fields += recovered
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            responses = self.responses or 1
+            return {
+                "responses": self.responses,
+                "clean": self.clean,
+                "repaired": self.repaired,
+                "truncated": self.truncated,
+                "failed": self.failed,
+                "parse_failure_rate": round(self.failed / responses, 4),
+                "repair_rate": round((self.repaired + self.truncated) / responses, 4),
+                "broken_fields": self.broken_fields,
+                "rerequests": self.rerequests,
+                "rerequest_rate": round(self.rerequests / responses, 4),
+                "rerequested_fields": self.rerequested_fields,
+                "recovered_fields": self.recovered_fields
+            }
+
+
+def loads_tolerant(text: str) -> Tuple[Any, str]:
+    """Parse the JSON value in a model response, repairing common damage
+
+    Returns (value, status) where status is "clean" (valid as-is after removing
+    markdown fences and surrounding prose), "repaired" (unquoted values such as
+    N/A, trailing commas, smart quotes) or "truncated" (cut-off output whose open
+    strings and brackets had to be closed). Prose may contain brackets of its
+    own, so each bracket is tried in turn until one parses to records (an
+    object, or an array holding objects). Raises ValueError if no JSON value
+    can be recovered.
+    """
+    value, status, _ = _loads(text)
+    return value, status
+
+
+def _loads(text: str) -> Tuple[Any, str, bool]:
+    """loads_tolerant that also reports whether truncation cut through a value"""
+    text = (text or "").strip()
+    starts = [index for index, char in enumerate(text) if char in "[{"][:MAX_CANDIDATES]
+    if not starts:
+        raise ValueError("No JSON value in response")
+
+    first, error = None, None
+    for start in starts:
+        try:
+            parsed = _loads_at(text, start)
+        except ValueError as e:
+            error = error or e
+            continue
+        if _holds_records(parsed[0]):
+            return parsed
+        first = first or parsed
+
+    # Nothing held records: the first value that parsed, e.g. a bare [] for "no cards"
+    if first is not None:
+        return first
+    raise ValueError(f"Unrecoverable JSON: {error}") from error
+
+
+def _loads_at(text: str, start: int) -> Tuple[Any, str, bool]:
+    """Parse the JSON value starting at a bracket, as-is or repaired"""
+    closer = "]" if text[start] == "[" else "}"
+    end = text.rfind(closer)
+
+    if end > start:
+        try:
+            return json.loads(text[start:end + 1], strict=False), "clean", False
+        except ValueError:
+            pass
+
+    repaired, truncated, cut_value = _repair(text[start:])
+    return json.loads(repaired, strict=False), "truncated" if truncated else "repaired", cut_value
+
+
+def _holds_records(value: Any) -> bool:
+    return isinstance(value, dict) or isinstance(value, list) and any(isinstance(item, dict) for item in value)
+
+
+def parse_card_records(text: str, fields: List[str] = None, required: bool = False) -> Tuple[List[Dict], Dict[int, List[str]], str]:
+    """Parse card objects from a model response
+
+    Returns (cards, broken, status). broken maps card index to fields that are
+    unusable: values that are not scalars, fields missing from a truncated last
+    card (plus its last field if the cut went through that value), and with
+    required=True (schema constrained output) any missing field. Raises
+    ValueError if nothing parses.
+    """
+    fields = fields or CARD_FIELDS
+    value, status, cut_value = _loads(text)
+
+    if isinstance(value, dict):
+        value = value["cards"] if "cards" in value else [value]
+    if not isinstance(value, list):
+        raise ValueError(f"Expected card array, got {type(value).__name__}")
+
+    cards = [card for card in value if isinstance(card, dict)]
+    broken = {}
+    for index, card in enumerate(cards):
+        bad = [field for field in fields if field in card and not _is_scalar(card[field])]
+        if required or (status == "truncated" and index == len(cards) - 1):
+            bad += [field for field in fields if field not in card]
+        if cut_value and index == len(cards) - 1:
+            present = [field for field in card if field in fields]
+            if present and present[-1] not in bad:
+                bad.append(present[-1])
+        for field in bad:
+            card.pop(field, None)
+        if bad:
+            broken[index] = [field for field in fields if field in bad]
+
+    return cards, broken, status
+
+
+def _is_scalar(value: Any) -> bool:
+    if isinstance(value, list):
+        return all(isinstance(item, (str, int, float)) for item in value)
+    return isinstance(value, (str, int, float)) or value is None
+
+
+def _repair(text: str) -> Tuple[str, bool, bool]:
+    """Single pass over the text: quote bare words, drop trailing commas, close what is open
+
+    Returns (text, truncated, cut_value), cut_value meaning the text ended inside a value.
+    """
+    text = text.translate(SMART_QUOTES)
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    bare = []
+    index = 0
+    last_structural = ""
+    string_is_key = False
+
+    def flush_bare():
+        word = "".join(bare).strip()
+        bare.clear()
+        if not word:
+            return
+        if word in LITERALS or _is_number(word):
+            out.append(word)
+        else:
+            out.append(json.dumps(word))
+
+    while index < len(text):
+        char = text[index]
+        index += 1
+
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            flush_bare()
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "}" and last_structural in "{,"
+            out.append(char)
+        elif char in "[{":
+            flush_bare()
+            stack.append("]" if char == "[" else "}")
+            out.append(char)
+            last_structural = char
+        elif char in "]}":
+            flush_bare()
+            _strip_trailing_comma(out)
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                return "".join(out), False, False
+            last_structural = char
+        elif char in ",:":
+            flush_bare()
+            out.append(char)
+            last_structural = char
+        elif char.isspace() and not bare:
+            out.append(char)
+        else:
+            bare.append(char)
+
+    # Ran out of text: close the open string and containers
+    cut_value = (in_string and not string_is_key) or bool("".join(bare).strip())
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    else:
+        flush_bare()
+    _strip_dangling(out)
+    while stack:
+        _strip_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out), True, cut_value
+
+
+def _strip_trailing_comma(out: List[str]) -> None:
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1].rstrip().endswith(","):
+        out[-1] = out[-1].rstrip()[:-1]
+
+
+def _strip_dangling(out: List[str]) -> None:
+    """Drop a trailing key with no value ("key": or "key") left by truncation"""
+    text = "".join(out).rstrip()
+    if text.endswith(":"):
+        text = text[:-1].rstrip()
+        if text.endswith('"'):
+            text = text[:text.rfind('"', 0, len(text) - 1)]
+    elif text.endswith('"'):
+        # A string directly after '{' or ',' inside an object is a key without a value
+        opening = text.rfind('"', 0, len(text) - 1)
+        before = text[:opening].rstrip()
+        if before.endswith(",") and _innermost_open(before) == "{" or before.endswith("{"):
+            text = before
+    out[:] = [text]
+
+
+def _innermost_open(text: str) -> str:
+    depth = []
+    in_string = False
+    escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth.append(char)
+        elif char in "]}" and depth:
+            depth.pop()
+    return depth[-1] if depth else ""
+
+
+def _is_number(word: str) -> bool:
+    return JSON_NUMBER.fullmatch(word) is not None
+
+# Global instance
+parse_metrics = ParseMetrics()
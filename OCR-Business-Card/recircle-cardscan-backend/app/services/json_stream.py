@@ -0,0 +1,118 @@
+import json
+from typing import List, Tuple
+
+FieldEvent = Tuple[int, str, object]
+
+
+class IncrementalJSONParser:
+    """Incremental parser that reports card fields while a JSON response streams in
+
+    Feed text chunks as they arrive; each call returns (card_index, field, value)
+    for every scalar field that completed in that chunk. A card is any object
+    inside an array, so both the plain extraction array and the "cards" list of
+    the fused response are covered. Leading prose or markdown fences before the
+    first bracket and anything after the top-level value are ignored. This only
+    drives progress updates; the final result is still parsed from the full text.
+    """
+
+    def __init__(self):
+        self._stack = []  # containers: {"type", "index"} for arrays, {"type", "key", "expect"} for objects
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._scalar = []
+        self._done = False
+        self._emitted = set()
+
+    def feed(self, chunk: str) -> List[FieldEvent]:
+        events = []
+        for char in chunk:
+            if self._done:
+                break
+            if self._in_string:
+                self._feed_string_char(char, events)
+            else:
+                self._feed_structural_char(char, events)
+        return events
+
+    def _feed_string_char(self, char: str, events: List[FieldEvent]) -> None:
+        if self._escape:
+            self._escape = False
+            self._string.append(char)
+        elif char == "\\":
+            self._escape = True
+            self._string.append(char)
+        elif char == '"':
+            self._in_string = False
+            raw = "".join(self._string)
+            try:
+                value = json.loads(f'"{raw}"')
+            except ValueError:
+                value = raw
+            self._complete_token(value, is_string=True, events=events)
+        else:
+            self._string.append(char)
+
+    def _feed_structural_char(self, char: str, events: List[FieldEvent]) -> None:
+        if not self._stack:
+            # Skip anything before the top-level value
+            if char in "[{":
+                self._push(char)
+            return
+
+        if char == '"':
+            self._in_string = True
+            self._string = []
+        elif char in "[{":
+            self._push(char)
+        elif char in "]}":
+            self._flush_scalar(events)
+            self._stack.pop()
+            if not self._stack:
+                self._done = True
+        elif char == ",":
+            self._flush_scalar(events)
+            top = self._stack[-1]
+            if top["type"] == "array":
+                top["index"] += 1
+            else:
+                top["expect"] = "key"
+        elif char == ":":
+            self._stack[-1]["expect"] = "value"
+        elif not char.isspace():
+            self._scalar.append(char)
+        elif self._scalar:
+            self._scalar.append(char)
+
+    def _push(self, char: str) -> None:
+        if char == "[":
+            self._stack.append({"type": "array", "index": 0})
+        else:
+            self._stack.append({"type": "object", "key": None, "expect": "key"})
+
+    def _flush_scalar(self, events: List[FieldEvent]) -> None:
+        if not self._scalar:
+            return
+        raw = "".join(self._scalar).strip()
+        self._scalar = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw  # e.g. unquoted N/A
+        self._complete_token(value, is_string=False, events=events)
+
+    def _complete_token(self, value, is_string: bool, events: List[FieldEvent]) -> None:
+        top = self._stack[-1]
+        if top["type"] != "object":
+            return
+
+        if top["expect"] == "key" and is_string:
+            top["key"] = value
+            return
+
+        # A scalar value completed: report it if this object is a card in an array
+        if len(self._stack) >= 2 and self._stack[-2]["type"] == "array":
+            card_index = self._stack[-2]["index"]
+            if (card_index, top["key"]) not in self._emitted:
+                self._emitted.add((card_index, top["key"]))
+                events.append((card_index, top["key"], value))
@@ -0,0 +1,241 @@
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.api_core import gapic_v1
+from google.generativeai import client as genai_client
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from app.config import settings
+
+
+class ModelResponse:
+    """Minimal stand-in for a generate_content response (only .text is used)"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def request_key(model_name: str, contents: List[Any]) -> str:
+    """Stable key of a request: model name, text parts and image bytes"""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for part in contents:
+        if isinstance(part, dict) and "data" in part:
+            digest.update(part.get("mime_type", "").encode("utf-8"))
+            digest.update(part["data"])
+        else:
+            digest.update(str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class GeminiBackend:
+    """Real Gemini models via google-generativeai
+
+    Each service passes its own API key (GEMINI_API_KEY for extraction,
+    GOOGLE_API_KEY for validation). The model gets its own client bound to that
+    key when it is created; genai.configure is process-wide and a model only
+    picks up the default client on its first call, so it cannot keep two keys apart.
+    """
+
+    def create_model(self, model_name: str, api_key: str = None):
+        # Without a key fall back to the environment, as genai.configure does
+        api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        model = genai.GenerativeModel(model_name)
+        if api_key:
+            model._client = glm.GenerativeServiceClient(
+                client_options={"api_key": api_key},
+                client_info=gapic_v1.client_info.ClientInfo(user_agent=f"{genai_client.USER_AGENT}/{genai.__version__}"),
+            )
+        # With no key at all the default client raises on the first call, as before
+        return model
+
+
+class RecordingModel:
+    """Wraps a real model and saves every response to the recordings directory"""
+
+    def __init__(self, model, model_name: str, recordings_path: str):
+        self.model = model
+        self.model_name = model_name
+        self.recordings_path = recordings_path
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        if stream:
+            return self._record_stream(contents, self.model.generate_content(contents, generation_config=generation_config, stream=True))
+
+        response = self.model.generate_content(contents, generation_config=generation_config)
+        self._save(contents, response.text)
+        return response
+
+    def _record_stream(self, contents, chunks):
+        parts = []
+        for chunk in chunks:
+            try:
+                parts.append(chunk.text)
+            except ValueError:
+                pass
+            yield chunk
+        self._save(contents, "".join(parts))
+
+    def _save(self, contents, text: str) -> None:
+        key = request_key(self.model_name, contents)
+        os.makedirs(self.recordings_path, exist_ok=True)
+        temp_path = os.path.join(self.recordings_path, f"{key}.json.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"model": self.model_name, "text": text, "recorded_at": time.time()}, f)
+        os.replace(temp_path, os.path.join(self.recordings_path, f"{key}.json"))
+
+
+class RecordBackend(GeminiBackend):
+    """Real Gemini models whose responses are captured to disk for later replay"""
+
+    def create_model(self, model_name: str, api_key: str = None):
+        return RecordingModel(super().create_model(model_name, api_key), model_name, settings.MODEL_RECORDINGS_PATH)
+
+
+class FakeModel:
+    """Deterministic local model: recorded or canned JSON with simulated latency and failures"""
+
+    def __init__(self, backend: "FakeBackend", model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def generate_content(self, contents, generation_config=None, stream=False):
+        key = request_key(self.model_name, contents)
+        latency, failure = self.backend.next_outcome()
+
+        if failure == "rate_limit":
+            time.sleep(latency)
+            raise Exception("429 Resource has been exhausted (e.g. check quota). [fake backend]")
+        if failure == "error":
+            time.sleep(latency)
+            raise Exception("500 An internal error has occurred. [fake backend]")
+
+        text = self.backend.load_recording(key)
+        if text is None:
+            text = self.backend.canned_response(contents, key)
+
+        if stream:
+            return self._stream(text, latency)
+        time.sleep(latency)
+        return ModelResponse(text)
+
+    @staticmethod
+    def _stream(text: str, latency: float, chunk_count: int = 8):
+        """Yield text in chunks: a third of the latency to first chunk, the rest spread out"""
+        time.sleep(latency / 3)
+        chunk_size = max(1, -(-len(text) // chunk_count))
+        for start in range(0, len(text), chunk_size):
+            if start:
+                time.sleep(latency * 2 / 3 / chunk_count)
+            yield ModelResponse(text[start:start + chunk_size])
+
+
+class FakeBackend:
+    """Local stand-in for load testing without a Gemini key
+
+    Latency is log-normal around FAKE_MODEL_LATENCY_MS. Each call fails with
+    FAKE_MODEL_ERROR_RATE, or starts a run of FAKE_MODEL_429_BURST_LENGTH
+    consecutive 429 errors with FAKE_MODEL_429_RATE. In replay mode responses
+    recorded by the record backend are returned when present.
+    """
+
+    def __init__(self, replay: bool = False, seed: int = None):
+        self.replay = replay
+        self.recordings_path = settings.MODEL_RECORDINGS_PATH
+        self._random = random.Random(settings.FAKE_MODEL_SEED if seed is None else seed)
+        self._burst_remaining = 0
+        self._lock = threading.Lock()
+
+    def create_model(self, model_name: str, api_key: str = None):
+        return FakeModel(self, model_name)
+
+    def next_outcome(self) -> tuple:
+        """Draw (latency seconds, failure kind or None) for the next call"""
+        with self._lock:
+            median = settings.FAKE_MODEL_LATENCY_MS / 1000
+            latency = median * self._random.lognormvariate(0, settings.FAKE_MODEL_LATENCY_SIGMA) if median else 0.0
+
+            if self._burst_remaining == 0 and self._random.random() < settings.FAKE_MODEL_429_RATE:
+                self._burst_remaining = settings.FAKE_MODEL_429_BURST_LENGTH
+            if self._burst_remaining > 0:
+                self._burst_remaining -= 1
+                return latency / 4, "rate_limit"
+
+            if self._random.random() < settings.FAKE_MODEL_ERROR_RATE:
+                return latency, "error"
+            return latency, None
+
+    def load_recording(self, key: str) -> Optional[str]:
+        if not self.replay:
+            return None
+        try:
+            with open(os.path.join(self.recordings_path, f"{key}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)["text"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def canned_response(self, contents: List[Any], key: str) -> str:
+        """Response in the format the prompt asks for, with fields derived from the request"""
+        prompt = "\n".join(str(part) for part in contents if not isinstance(part, dict))
+        images = [part for part in contents if isinstance(part, dict) and "data" in part]
+
+        if "BATCHED REQUEST" in prompt:
+            return json.dumps({str(index): [self._canned_card(image["data"])] for index, image in enumerate(images)})
+
+        card = self._canned_card(images[0]["data"] if images else key.encode("utf-8"))
+        if '"is_business_card"' in prompt:
+            return json.dumps({
+                "is_business_card": True,
+                "confidence": "High",
+                "reasoning": "Canned response from the fake model backend",
+                "information_found": ["name", "phone", "email", "company"],
+                "cards": [card]
+            })
+        if "Business Card: [YES/NO]" in prompt:
+            return (
+                "Business Card: YES\n"
+                "Confidence: High\n"
+                "Reasoning: Canned response from the fake model backend\n"
+                "Information Found: name, phone, email, company"
+            )
+        return json.dumps([card])
+
+    @staticmethod
+    def _canned_card(seed_bytes: bytes) -> Dict:
+        digest = hashlib.sha256(seed_bytes).hexdigest()
+        digits = "".join(str(int(char, 16) % 10) for char in digest[:9])
+        return {
+            "name": f"Test Contact {digest[:6].upper()}",
+            "phone": f"9{digits}",
+            "email": f"contact.{digest[:6]}@example.com",
+            "company": f"Example Industries {digest[6:10].upper()}",
+            "designation": "Manager",
+            "address": "1 Test Street, Mumbai, Maharashtra - 400001"
+        }
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "record": RecordBackend,
+    "fake": FakeBackend,
+    "replay": lambda: FakeBackend(replay=True)
+}
+
+_backend = None
+_backend_mode = None
+_backend_lock = threading.Lock()
+
+
+def get_model_backend():
+    """Process-wide backend selected by settings.MODEL_BACKEND"""
+    global _backend, _backend_mode
+    with _backend_lock:
+        if _backend is None or _backend_mode != settings.MODEL_BACKEND:
+            if settings.MODEL_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown MODEL_BACKEND '{settings.MODEL_BACKEND}', expected one of {', '.join(BACKENDS)}")
+            _backend = BACKENDS[settings.MODEL_BACKEND]()
+            _backend_mode = settings.MODEL_BACKEND
+        return _backend
@@ -0,0 +1,107 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+from app.services.rate_limiter import rate_limiter
+
+
+class ModelClient:
+    """Runs blocking Gemini SDK calls on a bounded thread pool so the event loop stays free"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.GEMINI_MAX_CONCURRENT_CALLS
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="gemini")
+        self.max_retries = 3
+        self.retry_delay = 2
+
+    async def generate_content(self, model, contents: List[Any], generation_config: Optional[Dict] = None):
+        """Call model.generate_content off the event loop through the shared rate limiter, retrying on rate limits"""
+        retry_delay = self.retry_delay
+
+        for attempt in range(self.max_retries):
+            await rate_limiter.acquire()
+            throttled = False
+            try:
+                return await self.run_blocking(model.generate_content, contents, generation_config=generation_config)
+            except Exception as e:
+                throttled = self._is_rate_limit_error(e)
+                if not throttled or attempt == self.max_retries - 1:
+                    raise
+            finally:
+                # Also on cancellation, or the slot would be lost for good
+                await rate_limiter.release(throttled=throttled)
+            
+            print(f"Rate limit hit, retrying in {retry_delay} seconds...")
+            await asyncio.sleep(retry_delay)
+            retry_delay *= 2  # Exponential backoff
+
+    async def generate_content_stream(self, model, contents: List[Any], generation_config: Optional[Dict] = None,
+                                      on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """Stream model.generate_content, awaiting on_text for each chunk; returns the full text
+        
+        Rate-limit errors are retried only if nothing has been streamed yet.
+        """
+        retry_delay = self.retry_delay
+        loop = asyncio.get_running_loop()
+        
+        for attempt in range(self.max_retries):
+            await rate_limiter.acquire()
+            chunks = asyncio.Queue()
+            
+            def produce():
+                # Runs on the executor: iterate the blocking stream and hand chunks to the loop
+                try:
+                    for chunk in model.generate_content(contents, generation_config=generation_config, stream=True):
+                        try:
+                            text = chunk.text
+                        except ValueError:
+                            continue  # Chunk without text parts (e.g. finish reason only)
+                        loop.call_soon_threadsafe(chunks.put_nowait, ("text", text))
+                    loop.call_soon_threadsafe(chunks.put_nowait, ("done", None))
+                except Exception as e:
+                    loop.call_soon_threadsafe(chunks.put_nowait, ("error", e))
+            
+            parts = []
+            error = None
+            throttled = False
+            try:
+                producer = loop.run_in_executor(self._executor, produce)
+                while True:
+                    kind, value = await chunks.get()
+                    if kind == "text":
+                        parts.append(value)
+                        if on_text:
+                            await on_text(value)
+                    elif kind == "error":
+                        error = value
+                        break
+                    else:
+                        break
+                await producer
+                if error is not None:
+                    throttled = self._is_rate_limit_error(error)
+            finally:
+                # Also on cancellation, or the slot would be lost for good
+                await rate_limiter.release(throttled=throttled)
+            
+            if error is None:
+                return "".join(parts)
+            if throttled and not parts and attempt < self.max_retries - 1:
+                print(f"Rate limit hit, retrying in {retry_delay} seconds...")
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 2  # Exponential backoff
+                continue
+            raise error
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking callable (SDK call, image decode) on the shared executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    @staticmethod
+    def _is_rate_limit_error(error: Exception) -> bool:
+        return "429" in str(error) or "quota" in str(error).lower()
+
+# Global instance
+model_client = ModelClient()
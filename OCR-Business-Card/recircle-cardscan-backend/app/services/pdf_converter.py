@@ -1,32 +1,186 @@
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
-from typing import List
-import os
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import io
+import threading
+from app.config import settings
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader  # Older name of the same library, as pinned in requirements.txt
+    except ImportError:  # Optional: without a PDF reader every PDF is rasterized
+        PdfReader = None
+
+# (page number, JPEG bytes)
+Page = Tuple[int, bytes]
+
+# Standard cards are 3.5 x 2 in; a page much larger than that holds more than one card side
+CARD_PAGE_MAX_LONG_EDGE_IN = 4.5
+CARD_PAGE_ASPECT = (1.25, 2.3)
+
+
+class TextLayerStats:
+    """How many PDFs were extracted from their embedded text instead of being rasterized"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pdfs = 0
+        self.text_layer = 0
+        self.pages = 0
+        self.resolved_locally = 0
+        self.text_prompt = 0
+        self.cached = 0
+
+    def record_pdf(self, text_layer: bool, pages: int = 0) -> None:
+        with self._lock:
+            self.pdfs += 1
+            if text_layer:
+                self.text_layer += 1
+                self.pages += pages
+
+    def record_page(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "enabled": settings.PDF_TEXT_LAYER_ENABLED and PdfReader is not None,
+                "pdfs": self.pdfs,
+                "text_layer": self.text_layer,
+                "rasterized": self.pdfs - self.text_layer,
+                "text_layer_rate": round(self.text_layer / (self.pdfs or 1), 4),
+                "pages": self.pages,
+                "resolved_locally": self.resolved_locally,
+                "text_prompt": self.text_prompt,
+                "cached": self.cached
+            }
+
+# Global instance
+text_layer_stats = TextLayerStats()
+
 
 class PDFConverter:
-    
+    """Rasterize PDFs a small window of pages at a time
+
+    Only PDF_PAGE_WINDOW pages are rendered and held at once, each encoded
+    to JPEG bytes that go straight to extraction, so memory stays flat
+    however long the PDF is and no page touches the disk.
+    """
+
+    @staticmethod
+    def extract_text_layer(pdf_path: str, max_pages: int = None) -> Optional[List[str]]:
+        """Text of each page when the PDF has a usable text layer, else None
+
+        A page is usable with at least PDF_TEXT_MIN_CHARS characters that are
+        nearly all readable: fonts without a text mapping come out as (cid:N)
+        codes or replacement characters. One unusable page, such as a scan
+        inside a digital PDF, sends the whole PDF to rasterization.
+        """
+        if PdfReader is None:
+            return None
+        try:
+            reader = PdfReader(pdf_path)
+            if reader.is_encrypted:
+                return None
+            pages = reader.pages if max_pages is None else reader.pages[:max_pages]
+            texts = [page.extract_text() or "" for page in pages]
+        except Exception as e:
+            print(f"⚠️ Could not read the PDF text layer: {e}")
+            return None
+        if not texts or not all(PDFConverter._is_usable_text(text) for text in texts):
+            return None
+        return texts
+
+    @staticmethod
+    def _is_usable_text(text: str) -> bool:
+        characters = "".join(text.split())
+        if len(characters) < settings.PDF_TEXT_MIN_CHARS or "(cid:" in text:
+            return False
+        readable = sum(1 for char in characters if char.isprintable() and char != "\ufffd")
+        return readable >= 0.95 * len(characters)
+
+    @staticmethod
+    def page_count(pdf_path: str) -> int:
+        return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+    @staticmethod
+    def render_pages(pdf_path: str, first_page: int, last_page: int, dpi: int = None,
+                     thread_count: int = None) -> List[Page]:
+        """Render pages first_page..last_page (1-based, inclusive) to JPEG bytes"""
+        images = convert_from_path(
+            pdf_path,
+            dpi=dpi or settings.PDF_RASTER_DPI,
+            first_page=first_page,
+            last_page=last_page,
+            thread_count=thread_count or settings.PDF_RASTER_THREADS
+        )
+        pages = []
+        for page_num, image in enumerate(images, start=first_page):
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=95)
+            image.close()
+            pages.append((page_num, buffer.getvalue()))
+        return pages
+
     @staticmethod
-    def convert_pdf_to_images(pdf_path: str) -> List[Image.Image]:
-        """Convert PDF pages to images"""
+    def _windows(pdf_path: str, first_page: int, last_page: int, window: int) -> Iterator[Tuple[int, int]]:
+        page_count = PDFConverter.page_count(pdf_path)
+        last_page = min(last_page or page_count, page_count)
+        window = max(1, window or settings.PDF_PAGE_WINDOW)
+        for start in range(first_page, last_page + 1, window):
+            yield start, min(start + window - 1, last_page)
+
+    @staticmethod
+    def iter_pages(pdf_path: str, first_page: int = 1, last_page: int = None, window: int = None) -> Iterator[Page]:
+        """Yield (page number, JPEG bytes), rendering one window of pages at a time"""
         try:
-            images = convert_from_path(pdf_path, dpi=300)
-            print(f"📄 Converted PDF to {len(images)} images")
-            return images
+            for start, end in PDFConverter._windows(pdf_path, first_page, last_page, window):
+                yield from PDFConverter.render_pages(pdf_path, start, end)
         except Exception as e:
             print(f"❌ PDF conversion error: {e}")
-            return []
-    
+
+    @staticmethod
+    async def stream_pages(pdf_path: str, first_page: int = 1, last_page: int = None,
+                           window: int = None) -> AsyncIterator[Page]:
+        """iter_pages with each window rendered in the CPU pool"""
+        from app.services.cpu_pool import cpu_pool
+        try:
+            windows = list(await cpu_pool.run(PDFConverter._window_list, pdf_path, first_page, last_page, window))
+            for start, end in windows:
+                for page in await cpu_pool.run(PDFConverter.render_pages, pdf_path, start, end):
+                    yield page
+        except Exception as e:
+            print(f"❌ PDF conversion error: {e}")
+
+    @staticmethod
+    def _window_list(pdf_path: str, first_page: int, last_page: int, window: int) -> List[Tuple[int, int]]:
+        return list(PDFConverter._windows(pdf_path, first_page, last_page, window))
+
+    @staticmethod
+    def is_card_side_pair(front: bytes, back: bytes, dpi: int = None) -> bool:
+        """Consecutive pages that look like two sides of one card: both card-sized and the same size"""
+        dpi = dpi or settings.PDF_RASTER_DPI
+        with Image.open(io.BytesIO(front)) as front_image, Image.open(io.BytesIO(back)) as back_image:
+            front_size, back_size = sorted(front_image.size), sorted(back_image.size)
+        short_edge, long_edge = front_size
+        if long_edge > CARD_PAGE_MAX_LONG_EDGE_IN * dpi or not CARD_PAGE_ASPECT[0] <= long_edge / max(1, short_edge) <= CARD_PAGE_ASPECT[1]:
+            return False
+        return all(abs(front_edge - back_edge) <= 0.05 * front_edge for front_edge, back_edge in zip(front_size, back_size))
+
     @staticmethod
     def preprocess_image(image: Image.Image) -> Image.Image:
         """Enhance image for better OCR"""
         # Convert to grayscale
         image = image.convert('L')
-        
+
         # Resize if too large (max 2000px width)
         max_width = 2000
         if image.width > max_width:
             ratio = max_width / image.width
             new_size = (max_width, int(image.height * ratio))
             image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        return image
\ No newline at end of file
+
+        return image
@@ -0,0 +1,225 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+from app.config import settings
+from app.services.extraction_cache import ExtractionCache
+from app.services.file_registry import file_registry
+
+
+class PreviewCache:
+    """Page-1 previews and thumbnails of uploads, rendered once per file content
+
+    Renders are JPEG files named by the upload's content hash and variant
+    ("page1" for a PDF's first page, "thumb<edge>" for a thumbnail), so the
+    same file uploaded twice shares them and a file's ETag never changes.
+    Uploads and their hashes come from the file registry. Renders are
+    dropped when the last batch using them is cleaned up, and
+    least recently used renders go first once PREVIEW_CACHE_MAX_MB is reached.
+    """
+
+    def __init__(self, cache_dir: str = None, max_size_mb: int = None):
+        self.cache_dir = cache_dir or settings.PREVIEW_CACHE_PATH
+        self.max_size_bytes = (max_size_mb or settings.PREVIEW_CACHE_MAX_MB) * 1024 * 1024
+        self.sizes = sorted(int(size) for size in settings.PREVIEW_THUMBNAIL_SIZES.split(","))
+
+        # key -> render size in bytes, least recently used first
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_size = 0
+        self._rendering: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.renders = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    async def get(self, file_id: str, size: int = None) -> Optional[Dict]:
+        """Path, media type and validators of a file's preview, rendering it on first use
+
+        Without a size an image is served as uploaded and a PDF as its first
+        page; with one, the smallest configured thumbnail at least that large.
+        Returns None when the upload does not exist.
+        """
+        upload = await self._resolve(file_id)
+        if upload is None:
+            return None
+        path, content_hash = upload
+        is_pdf = path.lower().endswith('.pdf')
+
+        if size is None and not is_pdf:
+            return self._preview(path, content_hash, "original", media_type=None)
+
+        variant = "page1" if size is None else f"thumb{self._snap(size)}"
+        key = f"{content_hash}_{variant}"
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+                self.hits += 1
+                return self._preview(self._entry_path(key), content_hash, variant)
+
+        await self._render(key, path, is_pdf, variant)
+        return self._preview(self._entry_path(key), content_hash, variant)
+
+    def is_not_modified(self, preview: Dict, if_none_match: str = None, if_modified_since: str = None) -> bool:
+        """Whether the client's cached copy is current (If-None-Match wins over If-Modified-Since)"""
+        if if_none_match:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            fresh = "*" in tags or preview["etag"] in tags
+        elif if_modified_since:
+            try:
+                fresh = parsedate_to_datetime(if_modified_since).timestamp() >= int(preview["modified_at"])
+            except (TypeError, ValueError):
+                fresh = False
+        else:
+            fresh = False
+
+        if fresh:
+            with self._lock:
+                self.not_modified += 1
+        return fresh
+
+    def evict_uploads(self, uploads: Iterable[Dict]) -> int:
+        """Drop renders of unregistered uploads that no registered upload shares; returns renders removed"""
+        hashes = {upload["sha256"] for upload in uploads if upload["sha256"] and not file_registry.has_content(upload["sha256"])}
+        with self._lock:
+            keys = [key for key in self._index if key.split("_", 1)[0] in hashes]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def get_stats(self) -> Dict:
+        """Get render/hit/304 counters and current cache size"""
+        with self._lock:
+            lookups = self.hits + self.renders
+            return {
+                "hits": self.hits,
+                "renders": self.renders,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "size_mb": round(self._total_size / (1024 * 1024), 2),
+                "max_size_mb": round(self.max_size_bytes / (1024 * 1024), 2),
+                "thumbnail_sizes": self.sizes
+            }
+
+    async def _resolve(self, file_id: str) -> Optional[tuple]:
+        """Upload path and content hash of a registered file_id"""
+        upload = file_registry.get(file_id)
+        if upload is None or not os.path.isfile(upload["file_path"]):
+            return None
+        content_hash = upload["sha256"]
+        if not content_hash:
+            loop = asyncio.get_running_loop()
+            content_hash = await loop.run_in_executor(None, ExtractionCache.hash_image, upload["file_path"])
+        return upload["file_path"], content_hash
+
+    def _snap(self, size: int) -> int:
+        """Smallest configured thumbnail edge >= size, so arbitrary sizes share a few renders"""
+        return next((edge for edge in self.sizes if edge >= size), self.sizes[-1])
+
+    async def _render(self, key: str, path: str, is_pdf: bool, variant: str) -> None:
+        """Render one variant in the CPU pool; concurrent requests for it wait on the same render"""
+        with self._lock:
+            task = self._rendering.get(key)
+            if task is None:
+                task = self._rendering[key] = asyncio.ensure_future(self._render_and_store(key, path, is_pdf, variant))
+                task.add_done_callback(lambda _: self._rendering.pop(key, None))
+        await asyncio.shield(task)
+
+    async def _render_and_store(self, key: str, path: str, is_pdf: bool, variant: str) -> None:
+        self._store(key, await self._render_bytes(key, path, is_pdf, variant))
+
+    async def _render_bytes(self, key: str, path: str, is_pdf: bool, variant: str) -> bytes:
+        from app.services.cpu_pool import cpu_pool
+        from app.services.image_preprocessor import ImagePreprocessor
+        from app.services.pdf_converter import PDFConverter
+
+        source = path
+        if is_pdf:
+            # Thumbnails of a PDF are cut from its cached first page rather than rendering it again
+            page_key = f"{key.split('_', 1)[0]}_page1"
+            if variant != "page1":
+                with self._lock:
+                    cached = page_key in self._index
+                if not cached:
+                    await self._render(page_key, path, True, "page1")
+                source = self._entry_path(page_key)
+            else:
+                pages = await cpu_pool.run(PDFConverter.render_pages, path, 1, 1, settings.PREVIEW_PDF_DPI, 1)
+                if not pages:
+                    raise ValueError(f"PDF has no pages: {path}")
+                return pages[0][1]
+
+        return await cpu_pool.run(ImagePreprocessor.thumbnail, source, int(variant[len("thumb"):]))
+
+    def _store(self, key: str, data: bytes) -> None:
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(key)
+            temp_path = f"{entry_path}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, entry_path)
+
+            if key in self._index:
+                self._total_size -= self._index.pop(key)
+            self._index[key] = len(data)
+            self._total_size += len(data)
+            self.renders += 1
+
+            self._evict()
+
+    def _preview(self, path: str, content_hash: str, variant: str, media_type: str = "image/jpeg") -> Dict:
+        modified_at = os.path.getmtime(path)
+        return {
+            "path": path,
+            "media_type": media_type,
+            "etag": f'"{content_hash[:32]}-{variant}"',
+            "modified_at": modified_at,
+            "last_modified": formatdate(modified_at, usegmt=True)
+        }
+
+    def _load_index(self) -> None:
+        """Rebuild LRU order from render files on disk, oldest first"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.jpg'):
+                continue
+            stat = os.stat(os.path.join(self.cache_dir, filename))
+            entries.append((stat.st_mtime, filename[:-4], stat.st_size))
+
+        with self._lock:
+            for _, key, size in sorted(entries):
+                self._index[key] = size
+                self._total_size += size
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used renders until within bounds (caller holds lock)"""
+        while self._index and self._total_size > self.max_size_bytes:
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, key: str) -> None:
+        """Remove render from index and disk (caller holds lock)"""
+        self._total_size -= self._index.pop(key, 0)
+        self.evictions += 1
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.jpg")
+
+# Global instance
+preview_cache = PreviewCache()
@@ -19,6 +19,7 @@ class QueueManager:
                         "file_id": file_info["file_id"],
                         "filename": file_info["filename"],
                         "file_path": file_info["file_path"],
+                        "duplicate_of": file_info.get("duplicate_of"),
                         "status": "waiting",
                         "position": i + 1,
                         "uploaded_at": datetime.now().isoformat()
@@ -36,6 +37,28 @@ class QueueManager:
                 }
             }
     
+    def add_file(self, batch_id: str, file_info: Dict) -> None:
+        """Append one file to a batch's input queue, creating the batch on its first file"""
+        with self._lock:
+            if batch_id not in self._batches:
+                self._batches[batch_id] = {
+                    "input_queue": [],
+                    "output_queue": [],
+                    "metadata": {"current_file_id": None}
+                }
+            
+            input_queue = self._batches[batch_id]["input_queue"]
+            input_queue.append({
+                "file_id": file_info["file_id"],
+                "filename": file_info["filename"],
+                "file_path": file_info["file_path"],
+                "duplicate_of": file_info.get("duplicate_of"),
+                "status": "waiting",
+                "position": len(input_queue) + 1,
+                "uploaded_at": datetime.now().isoformat()
+            })
+            self._update_metadata(batch_id)
+    
     def get_next_from_input_queue(self, batch_id: str) -> Optional[Dict]:
         """Get next file from input queue"""
         with self._lock:
@@ -120,6 +143,15 @@ class QueueManager:
             
             return {"input": input_file, "output": output_file}
     
+    def find_output(self, file_id: str) -> Optional[Dict]:
+        """Get the output for a file_id from whichever batch holds it"""
+        with self._lock:
+            for batch in self._batches.values():
+                for output in batch["output_queue"]:
+                    if output["file_id"] == file_id:
+                        return output.copy()
+            return None
+    
     def get_all_outputs(self, batch_id: str) -> List[Dict]:
         """Get all completed outputs for CSV"""
         with self._lock:
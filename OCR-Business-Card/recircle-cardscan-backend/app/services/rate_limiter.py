@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict
+from app.config import settings
+
+
+class AdaptiveRateLimiter:
+    """Process-wide token bucket with AIMD concurrency control for all model calls
+
+    Every call takes a token (refilled at the current rate) and an in-flight slot.
+    A 429/quota error halves both the rate and the concurrency limit; each
+    success grows them back additively up to the configured maximums. Waiting
+    callers sleep on a condition that release notifies, waking early only for
+    the next token.
+    """
+
+    def __init__(self, max_rate: float = None, min_rate: float = None, burst: int = None, max_concurrency: int = None):
+        self.max_rate = max_rate or settings.GEMINI_RATE_LIMIT_RPS
+        self.min_rate = min_rate or settings.GEMINI_MIN_RATE_RPS
+        self.burst = burst or settings.GEMINI_RATE_LIMIT_BURST
+        self.max_concurrency = max_concurrency or settings.GEMINI_MAX_CONCURRENT_CALLS
+
+        self.rate = self.max_rate
+        self.concurrency_limit = float(self.max_concurrency)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+        self.in_flight = 0
+        self.total_calls = 0
+        self.throttle_events = 0
+        self._recent_calls = deque()
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        """Wait for a token and a free concurrency slot"""
+        async with self._condition:
+            while True:
+                self._refill()
+                if self.in_flight < int(self.concurrency_limit) and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    self.total_calls += 1
+                    self._recent_calls.append(time.monotonic())
+                    return
+
+                if self.in_flight >= int(self.concurrency_limit):
+                    # Only a release frees a slot
+                    await self._condition.wait()
+                    continue
+                # A slot is free but no token: wait for the refill, or a release that changed the rate
+                try:
+                    await asyncio.wait_for(self._condition.wait(), max((1 - self._tokens) / self.rate, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, throttled: bool = False) -> None:
+        """Free the slot, adapt rate/concurrency to the call outcome and wake waiting callers"""
+        # Accounting happens before the first await, so a cancelled caller still gives its slot back
+        self.in_flight = max(0, self.in_flight - 1)
+
+        if throttled:
+            # Multiplicative decrease
+            self.throttle_events += 1
+            self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+        else:
+            # Additive increase: about +1 slot per window of successful calls
+            self.concurrency_limit = min(float(self.max_concurrency), self.concurrency_limit + 1 / self.concurrency_limit)
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+        async with self._condition:
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict:
+        """Get current limits, in-flight calls and throttle counters"""
+        self._trim_recent_calls()
+        return {
+            "rate_limit_rps": round(self.rate, 2),
+            "max_rate_rps": self.max_rate,
+            "concurrency_limit": int(self.concurrency_limit),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "calls_last_minute": len(self._recent_calls),
+            "total_calls": self.total_calls,
+            "throttle_events": self.throttle_events
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _trim_recent_calls(self) -> None:
+        cutoff = time.monotonic() - 60
+        while self._recent_calls and self._recent_calls[0] < cutoff:
+            self._recent_calls.popleft()
+
+# Global instance
+rate_limiter = AdaptiveRateLimiter()
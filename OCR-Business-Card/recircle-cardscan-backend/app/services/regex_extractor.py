@@ -1,40 +1,140 @@
 import re
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from app.services.text_scanner import ADDRESS_WORDS, NAME_PREFIXES, ScanResult, keyword_pattern, text_scanner
+
+# Result per field: {"value": str, "confidence": float}, confidence 0.0 when nothing was found
+FieldResult = Dict[str, object]
 
 class RegexExtractor:
-    
+    """Local field extraction from card text, with a confidence score per field
+
+    Used as the first, free pass of the extraction cascade: fields scoring at or
+    above the cascade threshold are kept, the rest are left to the model.
+    """
+
     def __init__(self):
-        # Define regex patterns
+        # Candidates come from the single-pass text scanner; these only score them
+        self.scanner = text_scanner
         self.patterns = {
-            'name': r'([A-Z][a-z]+\s+[A-Z][a-z]+)',
-            'phone': r'(\+91[\s-]?\d{5}[\s-]?\d{5}|\d{10})',
-            'email': r'([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})',
-            'company': r'([A-Z][A-Za-z\s&.]+(?:Pvt\.?\s*Ltd\.?|Industries|International|Corporation|Corp\.?))',
-            'designation': r'(Managing\s+Director|Director|Manager|CEO|Executive|AGM)'
+            'email': re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'),
+            'phone_label': re.compile(r'\b(?:M|Mob|Mobile|Ph|Phone|Tel|T|Cell|O|Off|Landline)\b\.?\s*[:.-]', re.IGNORECASE),
+            'pincode': re.compile(r'(?<!\d)\d{3}\s?\d{3}(?!\d)'),
+            'address_word': re.compile(rf'\b(?:{keyword_pattern(ADDRESS_WORDS)})(?=\W|$)', re.IGNORECASE),
+            'name_prefix': re.compile(rf'^(?:{keyword_pattern(NAME_PREFIXES)})\s+', re.IGNORECASE)
         }
-    
+
     def extract_all(self, raw_text: str) -> Dict[str, Optional[str]]:
-        """Extract all fields from raw text"""
-        print(f"\n🔍 RAW TEXT FROM VISION AI:")
-        print(f"'{raw_text}'")
-        print(f"Length: {len(raw_text)} characters\n")
-        
-        extracted = {}
-        
-        for field, pattern in self.patterns.items():
-            match = re.search(pattern, raw_text, re.IGNORECASE)
-            if match:
-                if field == 'name':
-                    extracted[field] = match.group(1).strip()
-                elif field == 'designation':
-                    extracted[field] = match.group(1).strip()
-                elif field == 'company':
-                    extracted[field] = match.group(1).strip()
-                else:
-                    extracted[field] = match.group(0).strip()
-                print(f"✅ Extracted {field}: {extracted[field]}")
-            else:
-                extracted[field] = "N/A"
-                print(f"⚠️  No {field} found")
-        
-        return extracted
\ No newline at end of file
+        """Extract all fields from raw text (N/A when not found)"""
+        return {field: result["value"] for field, result in self.extract_with_confidence(raw_text).items()}
+
+    def extract_with_confidence(self, raw_text: str) -> Dict[str, FieldResult]:
+        """Extract all fields from raw text with a 0-1 confidence for each"""
+        return self.score(raw_text, self.scanner.scan(raw_text))
+
+    def extract_batch(self, texts: List[str]) -> List[Dict[str, FieldResult]]:
+        return [self.score(text, scan) for text, scan in zip(texts, self.scanner.scan_batch(texts))]
+
+    def score(self, raw_text: str, scan: ScanResult) -> Dict[str, FieldResult]:
+        """Pick the best scanner candidate per field and score it"""
+        raw_text = raw_text or ""
+        emails = self._pick_emails(raw_text, scan)
+        company = self._pick_company(scan, emails)
+        designation = self._pick_designation(scan)
+        return {
+            'name': self._pick_name(scan, emails, company["value"], designation["value"]),
+            'phone': self._pick_phones(raw_text, scan),
+            'email': emails,
+            'company': company,
+            'designation': designation,
+            'address': self._extract_address(raw_text)
+        }
+
+    def looks_like_multiple_cards(self, raw_text: str) -> bool:
+        """Several email domains in one text usually mean several cards in one image"""
+        domains = {email.split('@')[1].lower() for email in self.patterns['email'].findall(raw_text or "")}
+        return len(domains) > 1
+
+    @staticmethod
+    def _result(value: Optional[str], confidence: float) -> FieldResult:
+        if not value:
+            return {"value": "N/A", "confidence": 0.0}
+        return {"value": value, "confidence": round(confidence, 2)}
+
+    @staticmethod
+    def _line_of(text: str, span) -> str:
+        start = text.rfind('\n', 0, span[0]) + 1
+        end = text.find('\n', span[1])
+        return text[start:end if end >= 0 else len(text)]
+
+    def _pick_emails(self, text: str, scan: ScanResult) -> FieldResult:
+        emails = []
+        for candidate in scan['email']:
+            email = candidate['value'].lower()
+            if email not in emails:
+                emails.append(email)
+        # An '@' the scanner could not use points at an OCR error in an address
+        unmatched = text.count('@') > len(scan['email'])
+        return self._result(",".join(emails), 0.6 if unmatched else 0.95)
+
+    def _pick_phones(self, text: str, scan: ScanResult) -> FieldResult:
+        labelled = True
+        for candidate in scan['phone']:
+            digits = candidate['value']
+            is_mobile = len(digits) == 10 and digits[0] in '6789'
+            labelled = labelled and (is_mobile or bool(self.patterns['phone_label'].search(self._line_of(text, candidate['span']))))
+        phones = ",".join(candidate['value'] for candidate in scan['phone'])
+        return self._result(phones, 0.9 if labelled else 0.65)
+
+    def _pick_company(self, scan: ScanResult, emails: FieldResult) -> FieldResult:
+        domains = {email.split('@')[1].split('.')[0] for email in emails["value"].split(',') if '@' in email}
+        for candidate in scan['company']:
+            company = " ".join(candidate['value'].split())
+            if '@' in company:
+                continue
+            confidence = 0.85 if candidate['legal'] else 0.7
+            if any(domain in company.lower().replace(" ", "") for domain in domains):
+                confidence += 0.1
+            return self._result(company, confidence)
+        return self._result(None, 0.0)
+
+    def _pick_designation(self, scan: ScanResult) -> FieldResult:
+        for candidate in scan['designation']:
+            designation = " ".join(candidate['value'].split())
+            # A short line is usually the title itself, a long one a tagline mentioning it
+            return self._result(designation, 0.85 if len(designation.split()) <= 6 else 0.55)
+        return self._result(None, 0.0)
+
+    def _pick_name(self, scan: ScanResult, emails: FieldResult, company: str, designation: str) -> FieldResult:
+        local_parts = [email.split('@')[0].lower() for email in emails["value"].split(',') if '@' in email]
+        candidates = [
+            " ".join(candidate['value'].split()) for candidate in scan['name']
+            if " ".join(candidate['value'].split()) not in (company, designation)
+        ]
+
+        for candidate in candidates:
+            words = [word.lower().strip(".'") for word in self.patterns['name_prefix'].sub('', candidate).split()]
+            # The email's local part (nishant.choradia@...) confirms the name
+            if any(word in local for local in local_parts for word in words if len(word) > 2):
+                return self._result(candidate, 0.9)
+        for candidate in candidates:
+            if self.patterns['name_prefix'].match(candidate):
+                return self._result(candidate, 0.85)
+        if candidates:
+            return self._result(candidates[0], 0.6 if len(candidates) == 1 else 0.4)
+        return self._result(None, 0.0)
+
+    def _extract_address(self, raw_text: str) -> FieldResult:
+        lines = [" ".join(line.split()) for line in raw_text.splitlines()]
+        lines = [line for line in lines if line]
+        for index, line in enumerate(lines):
+            if not self.patterns['pincode'].search(line) or '@' in line:
+                continue
+            # The pincode ends the address; take the lines above it that look like address lines
+            start = index
+            while start > 0 and self.patterns['address_word'].search(lines[start - 1]) and index - start < 3:
+                start -= 1
+            address = ", ".join(lines[start:index + 1])
+            has_words = bool(self.patterns['address_word'].search(address))
+            return self._result(address, 0.8 if has_words else 0.5)
+        return self._result(None, 0.0)
@@ -0,0 +1,43 @@
+import threading
+from typing import Callable, Dict
+
+# Shared, lazily-created service instances. Building a GeminiService or
+# validator creates a model (and its HTTP channel on first call) and loads the
+# prompt store, so one instance of each is reused for every file and batch.
+_instances: Dict[str, object] = {}
+_lock = threading.RLock()  # Factories may fetch other shared services
+
+
+def _get_or_create(name: str, factory: Callable[[], object]):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = factory()
+                _instances[name] = instance
+    return instance
+
+
+def get_gemini_service():
+    """Shared GeminiService"""
+    from app.services.gemini_service import GeminiService
+    return _get_or_create("gemini_service", GeminiService)
+
+
+def get_business_card_validator():
+    """Shared BusinessCardValidator"""
+    from app.services.business_card_validator import BusinessCardValidator
+    return _get_or_create("business_card_validator", BusinessCardValidator)
+
+
+def get_memory_manager():
+    """Shared GeminiMemoryManager, so prompt updates are seen by extraction"""
+    from app.services.gemini_memory import GeminiMemoryManager
+    return _get_or_create("memory_manager", GeminiMemoryManager)
+
+
+def reset_services() -> None:
+    """Drop shared instances (e.g. after changing MODEL_BACKEND)"""
+    with _lock:
+        _instances.clear()
@@ -0,0 +1,90 @@
+import os
+import threading
+from typing import Optional
+
+from app.config import settings
+from app.services.image_preprocessor import ImagePreprocessor, ImageSource
+
+try:
+    import pytesseract
+except ImportError:  # Optional: without it the cascade always falls through to the model
+    pytesseract = None
+
+
+class TextDetector:
+    """Local text detection for the extraction cascade; the base class detects nothing
+
+    detect_text runs in a CPU pool worker, so the LOCAL_OCR_* settings are
+    passed in by the caller rather than read from the worker's own settings.
+    """
+
+    name = "none"
+
+    def is_available(self) -> bool:
+        return False
+
+    def detect_text(self, image_path: ImageSource, long_edge: Optional[int] = None, lang: str = "eng") -> str:
+        return ""
+
+
+class TesseractTextDetector(TextDetector):
+    """Tesseract OCR through pytesseract (needs the tesseract binary on PATH)"""
+
+    name = "tesseract"
+
+    def __init__(self):
+        self._available: Optional[bool] = None
+
+    def is_available(self) -> bool:
+        if self._available is None:
+            try:
+                self._available = pytesseract is not None and bool(pytesseract.get_tesseract_version())
+            except Exception as e:
+                print(f"⚠️ Tesseract not available, local text detection disabled: {e}")
+                self._available = False
+        return self._available
+
+    def detect_text(self, image_path: ImageSource, long_edge: Optional[int] = None, lang: str = "eng") -> str:
+        image = ImagePreprocessor.load_image(image_path, long_edge).convert("L")
+        return pytesseract.image_to_string(image, lang=lang)
+
+
+class SidecarTextDetector(TextDetector):
+    """Text already extracted elsewhere, read from <image>.txt next to the image"""
+
+    name = "sidecar"
+
+    def is_available(self) -> bool:
+        return True
+
+    def detect_text(self, image_path: ImageSource, long_edge: Optional[int] = None, lang: str = "eng") -> str:
+        if not isinstance(image_path, str):
+            return ""  # In-memory images have no sidecar
+        sidecar_path = image_path + ".txt"
+        if not os.path.exists(sidecar_path):
+            return ""
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+DETECTORS = {
+    "none": TextDetector,
+    "tesseract": TesseractTextDetector,
+    "sidecar": SidecarTextDetector
+}
+
+_detector = None
+_detector_mode = None
+_detector_lock = threading.Lock()
+
+
+def get_text_detector() -> TextDetector:
+    """Process-wide detector selected by settings.LOCAL_TEXT_DETECTOR"""
+    global _detector, _detector_mode
+    with _detector_lock:
+        if _detector is None or _detector_mode != settings.LOCAL_TEXT_DETECTOR:
+            if settings.LOCAL_TEXT_DETECTOR not in DETECTORS:
+                raise ValueError(f"Unknown LOCAL_TEXT_DETECTOR '{settings.LOCAL_TEXT_DETECTOR}', expected one of {', '.join(DETECTORS)}")
+            _detector = DETECTORS[settings.LOCAL_TEXT_DETECTOR]()
+            _detector_mode = settings.LOCAL_TEXT_DETECTOR
+        return _detector
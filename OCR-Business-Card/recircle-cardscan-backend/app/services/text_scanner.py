@@ -0,0 +1,153 @@
+import re
+from typing import Dict, List, Optional
+
+# Candidate per match: {"value": str, "span": (start, end)}; phones also carry
+# "raw" (the text as printed) and companies "legal" (ends in Pvt Ltd, LLP, ...)
+Candidate = Dict[str, object]
+ScanResult = Dict[str, List[Candidate]]
+
+SCAN_FIELDS = ["name", "phone", "email", "company", "designation", "website"]
+
+# Keywords are compared lowercased with dots stripped, two-word ones as word pairs
+LEGAL_SUFFIXES = {"pvt ltd", "private limited", "limited", "ltd", "llp", "inc", "llc", "corporation", "corp"}
+COMPANY_WORDS = {
+    "industries", "international", "enterprises", "group", "solutions", "technologies",
+    "traders", "impex", "exports", "associates", "consultants"
+}
+DESIGNATIONS = {
+    "managing director", "director", "general manager", "manager", "ceo", "cfo", "cto", "coo",
+    "chairman", "president", "vice president", "vp", "executive", "officer", "head", "agm", "dgm",
+    "gm", "proprietor", "partner", "owner", "founder", "co-founder", "consultant", "engineer",
+    "sales", "marketing", "business development"
+}
+ADDRESS_WORDS = {
+    "road", "rd", "street", "st", "marg", "nagar", "colony", "sector", "plot", "floor", "building",
+    "bldg", "tower", "complex", "estate", "area", "lane", "park", "chowk", "near", "opp", "phase",
+    "block", "industrial", "midc", "village", "dist", "taluka"
+}
+NAME_PREFIXES = {"mr", "mrs", "ms", "dr", "er", "prof", "ca", "adv"}
+
+# One finditer over the whole text tokenizes it; lines are classified from their words as they end
+TOKEN_PATTERN = re.compile(r"""
+    (?P<email>(?<![\w.%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,})
+  | (?P<website>(?i:www\.|https?://)[^\s,;]+)
+  | (?<![\w+])(?P<phone>
+        (?:\+?\s?91[\s-]?)?[6-9]\d{4}[\s-]?\d{5}        # mobile: 98765 43210, +91-9876543210
+      | \(?0\d{2,4}\)?[\s-]?\d{3,4}[\s-]?\d{4}         # landline with STD code: (022) 2345 6789
+      | \+?\d{8,12}                                   # any other run of 8-12 digits
+    )(?!\d)
+  | (?P<word>[A-Za-z][A-Za-z'.&-]*)
+  | (?P<other>[\d@]+)
+  | (?P<newline>\n)
+""", re.VERBOSE)
+
+NAME_LINE = re.compile(
+    r"(?:(?i:" + "|".join(NAME_PREFIXES) + r")\.?[ \t]+)?[A-Z][A-Za-z.']*(?:[ \t]+[A-Z][A-Za-z.']*){1,3}"
+)
+
+
+def normalize_phone(raw: str) -> Optional[str]:
+    """Digits of an Indian phone number without the 91 country code, None if not 8-12 digits"""
+    digits = ''.join(filter(str.isdigit, raw.strip()))
+
+    # Remove +91 if phone number is longer than 10 digits and starts with 91
+    if len(digits) > 10 and digits.startswith('91'):
+        digits = digits[2:]
+
+    # Accept 8-digit landlines, 10-digit mobiles and 11-12 digit numbers (with STD codes)
+    return digits if 8 <= len(digits) <= 12 else None
+
+
+def keyword_pattern(words) -> str:
+    """Regex alternation for a keyword set (dots and whitespace optional), for callers that search raw text"""
+    return "|".join(
+        r"\.?\s*".join(re.escape(part) for part in word.split()) + r"\.?"
+        for word in sorted(words, key=len, reverse=True)
+    )
+
+
+class TextScanner:
+    """Single-pass candidate extraction from card text
+
+    One tokenizing pass finds emails, websites and phones anywhere and
+    classifies each line from its words: company (legal suffix or company
+    word), designation (title keyword, no digits) and name (2-4 capitalised
+    words, optional Mr/Dr/... prefix, no other keywords). Every candidate is
+    returned with its span, in text order; phones are normalized with
+    normalize_phone and de-duplicated. Choosing between candidates is left to
+    the caller (see RegexExtractor).
+    """
+
+    def __init__(self):
+        self.pattern = TOKEN_PATTERN
+
+    def scan(self, text: str) -> ScanResult:
+        text = text or ""
+        result = {field: [] for field in SCAN_FIELDS}
+        phones = set()
+        line_start = 0
+        words = []  # (match, normalized) for the current line
+        plain = True  # only words so far on the current line
+
+        for match in self.pattern.finditer(text):
+            kind = match.lastgroup
+            if kind == "word":
+                words.append((match, match.group().lower().replace(".", "")))
+                continue
+            if kind == "newline":
+                self._classify_line(text, line_start, match.start(), words, plain, result)
+                line_start, words, plain = match.end(), [], True
+                continue
+
+            plain = False
+            if kind == "phone":
+                value = normalize_phone(match.group("phone"))
+                if value and value not in phones:
+                    phones.add(value)
+                    result["phone"].append({"value": value, "raw": match.group("phone"), "span": match.span("phone")})
+            elif kind in ("email", "website"):
+                result[kind].append({"value": match.group(kind).rstrip('.'), "span": match.span(kind)})
+
+        self._classify_line(text, line_start, len(text), words, plain, result)
+        return result
+
+    def scan_batch(self, texts: List[str]) -> List[ScanResult]:
+        return [self.scan(text) for text in texts]
+
+    @staticmethod
+    def _classify_line(text: str, start: int, end: int, words: list, plain: bool, result: ScanResult) -> None:
+        if not words:
+            return
+        keys = [key for _, key in words]
+        pairs = [f"{first} {second}" for first, second in zip(keys, keys[1:])]
+
+        # Company: the line up to its first legal suffix or company word
+        legal = False
+        company_end = None
+        for index, key in enumerate(keys):
+            pair = pairs[index - 1] if index else ""
+            if pair in LEGAL_SUFFIXES or key in LEGAL_SUFFIXES:
+                legal, company_end = True, words[index][0].end()
+                break
+            if key in COMPANY_WORDS:
+                company_end = words[index][0].end()
+                break
+        if company_end is not None:
+            first = words[0][0].start()
+            result["company"].append({"value": text[first:company_end].strip(" ,:-"), "span": (first, company_end), "legal": legal})
+
+        is_designation = any(key in DESIGNATIONS for key in keys) or any(pair in DESIGNATIONS for pair in pairs)
+        line = text[start:end].strip()
+        if is_designation and not legal and plain and not any(char.isdigit() for char in line):
+            first = words[0][0].start()
+            result["designation"].append({"value": line.strip(" ,:-|"), "span": (first, words[-1][0].end())})
+            return
+
+        # Name: 2-4 capitalised words (after an optional prefix) and nothing else on the line
+        if company_end is None and not is_designation and plain and 2 <= len(words) <= 5:
+            first, last = words[0][0].start(), words[-1][0].end()
+            if NAME_LINE.fullmatch(text, first, last) and not any(key in ADDRESS_WORDS for key in keys):
+                result["name"].append({"value": " ".join(text[first:last].split()), "span": (first, last)})
+
+# Global instance
+text_scanner = TextScanner()
@@ -55,6 +55,27 @@ class WebSocketManager:
                         if dead_ws in self._connections[batch_id]:
                             self._connections[batch_id].remove(dead_ws)
     
+    async def send_partial_extraction(self, batch_id: str, file_id: str, filename: str, card_index: int, field: str, value) -> None:
+        """Broadcast one extracted field as soon as the streamed model response contains it"""
+        await self.broadcast(batch_id, {
+            "type": "partial_extraction",
+            "file_id": file_id,
+            "filename": filename,
+            "card_index": card_index,
+            "field": field,
+            "value": value
+        })
+    
+    async def send_card_detection(self, batch_id: str, file_id: str, filename: str, cards: List[Dict]) -> None:
+        """Broadcast the cards found in a multi-card photo before they are extracted one by one"""
+        await self.broadcast(batch_id, {
+            "type": "cards_detected",
+            "file_id": file_id,
+            "filename": filename,
+            "count": len(cards),
+            "cards": cards
+        })
+    
     async def send_initial_status(self, batch_id: str, websocket: WebSocket) -> None:
         """Send initial status when client connects"""
         from app.routers.upload import batch_storage
@@ -1,51 +1,180 @@
 import os
 import uuid
-import aiofiles
-from fastapi import UploadFile
+import asyncio
+import hashlib
+import threading
+from fastapi import UploadFile, HTTPException
 from app.config import settings
-from typing import Dict
+from app.services.duplicate_index import duplicate_index
+from app.services.file_registry import file_registry
+from typing import BinaryIO, Dict, List, Optional
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadBudget:
+    """Running byte total of one upload batch, shared by its concurrent writers"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def add(self, size: int) -> bool:
+        """Count size more bytes; False once the batch is over its limit"""
+        with self._lock:
+            self.total += size
+            if self.total > self.max_bytes:
+                self.exceeded = True
+            return not self.exceeded
+
 
 class FileManager:
-    
+
     @staticmethod
     def generate_file_id() -> str:
         """Generate unique file ID"""
         return f"f_{uuid.uuid4().hex[:8]}"
-    
+
     @staticmethod
     def generate_batch_id() -> str:
         """Generate unique batch ID"""
         from datetime import datetime
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         return f"batch_{timestamp}"
-    
+
+    @staticmethod
+    async def save_uploaded_file(file: UploadFile, file_id: str, batch_id: str = None) -> Dict:
+        """Save uploaded file to storage and check it against earlier uploads for duplicates"""
+        stored = await FileManager._store_upload(file, file_id)
+        return await FileManager.register_stored_file(file_id, file.filename, file.content_type, stored, batch_id)
+
+    @staticmethod
+    async def save_uploaded_files(files: List[UploadFile], batch_id: str) -> List[Dict]:
+        """Save a batch of uploads concurrently, in chunks, within the per-file and batch size limits
+
+        Peak memory is a chunk per concurrent writer however large the batch.
+        If any file fails or the batch goes over MAX_BATCH_SIZE_MB, everything
+        already written is deleted and the error is raised. Files are then
+        registered in upload order, so the first of two near-duplicates in a
+        batch is always the original.
+        """
+        budget = UploadBudget(settings.MAX_BATCH_SIZE_MB * 1024 * 1024)
+        semaphore = asyncio.Semaphore(settings.UPLOAD_WRITE_CONCURRENCY)
+        file_ids = [FileManager.generate_file_id() for _ in files]
+
+        async def store(file: UploadFile, file_id: str) -> Dict:
+            async with semaphore:
+                return await FileManager._store_upload(file, file_id, budget)
+
+        results = await asyncio.gather(*(store(file, file_id) for file, file_id in zip(files, file_ids)), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            for result in results:
+                if not isinstance(result, BaseException):
+                    FileManager._remove_quietly(result["file_path"])
+            raise errors[0]
+
+        return [
+            await FileManager.register_stored_file(file_id, file.filename, file.content_type, stored, batch_id)
+            for file, file_id, stored in zip(files, file_ids, results)
+        ]
+
+    @staticmethod
+    async def _store_upload(file: UploadFile, file_id: str, budget: UploadBudget = None) -> Dict:
+        """Copy an upload to storage on a worker thread; returns its path, size, SHA-256 and dHash"""
+        file_path = FileManager.storage_path(file_id, file.filename)
+        loop = asyncio.get_running_loop()
+        size, sha256 = await loop.run_in_executor(None, FileManager._copy_upload, file.file, file.filename, file_path, budget)
+
+        # Decoded while the file is still in the page cache
+        phash = await FileManager.perceptual_hash(file_path, file.content_type)
+
+        return {"file_path": file_path, "size": size, "sha256": sha256, "phash": phash}
+
     @staticmethod
-    async def save_uploaded_file(file: UploadFile, file_id: str) -> Dict:
-        """Save uploaded file to storage"""
-        # Create storage directory if not exists
+    def storage_path(file_id: str, filename: str) -> str:
+        """Path an upload is stored at, creating the storage directory if needed"""
         os.makedirs(settings.TEMP_STORAGE_PATH, exist_ok=True)
-        
-        # Generate safe filename
-        file_extension = file.filename.split('.')[-1]
-        clean_filename = file.filename.replace('/', '_').replace('\\', '_')
-        safe_filename = f"{file_id}_{clean_filename}"
-        file_path = os.path.join(settings.TEMP_STORAGE_PATH, safe_filename)
-        
-        # Save file asynchronously
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
-        
+        clean_filename = filename.replace('/', '_').replace('\\', '_')
+        return os.path.join(settings.TEMP_STORAGE_PATH, f"{file_id}_{clean_filename}")
+
+    @staticmethod
+    async def perceptual_hash(file_path: str, content_type: str) -> Optional[str]:
+        """dHash for near-duplicate detection (PDFs are not hashed)"""
+        if content_type == 'application/pdf':
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, duplicate_index.compute_dhash, file_path)
+
+    @staticmethod
+    def _copy_upload(source: BinaryIO, filename: str, file_path: str, budget: UploadBudget = None) -> tuple:
+        """Chunked copy that hashes as it writes and stops at the size limits; returns (size, SHA-256)"""
+        max_file_bytes = settings.MAX_FILE_SIZE_MB * 1024 * 1024
+        sha256 = hashlib.sha256()
+        size = 0
+        error = None
+
+        source.seek(0)
+        with open(file_path, 'wb') as out_file:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > max_file_bytes:
+                    error = f"{filename} exceeds {settings.MAX_FILE_SIZE_MB}MB file size limit"
+                    break
+                if budget is not None and not budget.add(len(chunk)):
+                    error = f"Total batch size exceeds {settings.MAX_BATCH_SIZE_MB}MB limit"
+                    break
+                sha256.update(chunk)
+                out_file.write(chunk)
+
+        if error:
+            FileManager._remove_quietly(file_path)
+            raise HTTPException(status_code=400, detail=error)
+        return size, sha256.hexdigest()
+
+    @staticmethod
+    async def register_stored_file(file_id: str, filename: str, content_type: str, stored: Dict, batch_id: str = None) -> Dict:
+        """Add a stored upload (path, size, sha256, phash) to the duplicate index and file registry; returns its file info
+
+        Both indexes append to their logs on disk, so this runs on a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, FileManager._register_stored_file, file_id, filename, content_type, stored, batch_id
+        )
+
+    @staticmethod
+    def _register_stored_file(file_id: str, filename: str, content_type: str, stored: Dict, batch_id: str = None) -> Dict:
+        file_path = stored["file_path"]
+        duplicate_of = duplicate_index.register(file_id, filename, file_path, stored["phash"], batch_id, stored["sha256"])
+        file_registry.register(file_id, filename, file_path, stored["size"], content_type, stored["sha256"], batch_id)
+
         return {
             "file_id": file_id,
-            "filename": file.filename,
-            "file_type": file.content_type,
-            "size": len(content),
-            "file_path": file_path
+            "filename": filename,
+            "file_type": content_type,
+            "size": stored["size"],
+            "file_path": file_path,
+            "sha256": stored["sha256"],
+            "phash": stored["phash"],
+            "duplicate_of": duplicate_of["file_id"] if duplicate_of else None,
+            "duplicate_of_filename": duplicate_of["filename"] if duplicate_of else None,
+            "duplicate_exact": bool(duplicate_of and duplicate_of["exact"])
         }
-    
+
+    @staticmethod
+    def _remove_quietly(file_path: str) -> None:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
     @staticmethod
-    def cleanup_temp_files(batch_id: str) -> None:
-        """Delete temporary files after processing"""
-        # Implementation for cleanup
-        pass
\ No newline at end of file
+    def cleanup_temp_files(batch_id: str) -> List[Dict]:
+        """Delete a batch's stored uploads and unregister them; returns their registry entries"""
+        removed = file_registry.remove_batch(batch_id)
+        for entry in removed:
+            FileManager._remove_quietly(entry["file_path"])
+        return removed
@@ -38,19 +38,14 @@ class FileValidator:
             app_logger.error(f"[UPLOAD] {error_msg}")
             raise HTTPException(status_code=400, detail=error_msg)
         
-        # Check total batch size (20MB limit)
-        max_batch_size_bytes = 20 * 1024 * 1024  # 20MB
-        total_size = 0
-        
-        for file in files:
-            content = await file.read()
-            total_size += len(content)
-            await file.seek(0)  # Reset file pointer
+        # Check total batch size from the sizes the multipart parser recorded; the write to storage enforces it exactly
+        max_batch_size_bytes = settings.MAX_BATCH_SIZE_MB * 1024 * 1024
+        total_size = sum(file.size or 0 for file in files)
         
         total_size_mb = total_size / (1024 * 1024)
         
         if total_size > max_batch_size_bytes:
-            error_msg = f"Total batch size {total_size_mb:.1f}MB exceeds 20MB limit"
+            error_msg = f"Total batch size {total_size_mb:.1f}MB exceeds {settings.MAX_BATCH_SIZE_MB}MB limit"
             app_logger.error(f"[UPLOAD] {error_msg}")
             raise HTTPException(status_code=400, detail=error_msg)
         
@@ -0,0 +1,327 @@
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiofiles
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils.file_manager import FileManager
+from app.utils.file_validator import FileValidator
+
+# Status and chunk requests look for expired sessions at most this often
+PURGE_INTERVAL_SECONDS = 300
+
+
+class UploadSessions:
+    """Resumable chunked uploads of a batch
+
+    A session declares the batch's files up front and gets a batch_id and a
+    file_id per file. Each file is then sent as chunks appended at the
+    offset the server reports, straight into a .part file next to where it
+    will be stored. A chunk at the wrong offset is refused with the right
+    one, so a client that lost its connection asks for the status and
+    resumes from there. A file is hashed as its chunks arrive, and once
+    complete it is registered and added to the batch's processing queue
+    without waiting for the rest. The session manifest is kept on disk, and
+    the received bytes are the .part file sizes, so sessions survive a
+    restart. A file is marked as completing in the manifest before it is
+    moved into place and registered, so a restart in between finishes the
+    file on the next chunk request or finalize instead of taking it (and
+    registering it) again. A discarded session is flagged, so a chunk being
+    written when it is discarded ends with 410 instead of completing a
+    deleted file. Manifest writes and purges run on worker threads.
+    """
+
+    def __init__(self, sessions_dir: str = None):
+        self.sessions_dir = sessions_dir or os.path.join(settings.TEMP_STORAGE_PATH, "upload_sessions")
+
+        self._sessions: Dict[str, Dict] = {}
+        # file_id -> running SHA-256 of its .part file, rebuilt from disk after a restart
+        self._hashers: Dict[str, "hashlib._Hash"] = {}
+        self._file_locks: Dict[str, asyncio.Lock] = {}
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    async def create(self, files: List[Dict]) -> Dict:
+        """Start a session for files given as {filename, size, content_type}; returns its status"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.purge_expired)
+
+        if not files:
+            raise HTTPException(status_code=400, detail="No files declared")
+        if len(files) > settings.MAX_FILES_PER_BATCH:
+            raise HTTPException(status_code=400, detail=f"Maximum {settings.MAX_FILES_PER_BATCH} files allowed, got {len(files)}")
+        for file in files:
+            if not FileValidator.validate_file_extension(file["filename"]):
+                raise HTTPException(status_code=400, detail=f"Invalid file type: {file['filename']}")
+            if not 0 < file["size"] <= settings.MAX_FILE_SIZE_MB * 1024 * 1024:
+                raise HTTPException(status_code=400, detail=f"{file['filename']} must be between 1 byte and {settings.MAX_FILE_SIZE_MB}MB")
+        total_size = sum(file["size"] for file in files)
+        if total_size > settings.MAX_BATCH_SIZE_MB * 1024 * 1024:
+            raise HTTPException(status_code=400, detail=f"Total batch size {total_size / (1024 * 1024):.1f}MB exceeds {settings.MAX_BATCH_SIZE_MB}MB limit")
+
+        # Batch ids have one-second resolution, so concurrent sessions get a suffix
+        batch_id = f"{FileManager.generate_batch_id()}_{uuid.uuid4().hex[:6]}"
+        entries = []
+        for file in files:
+            file_id = FileManager.generate_file_id()
+            entries.append({
+                "file_id": file_id,
+                "filename": file["filename"],
+                "content_type": file.get("content_type") or mimetypes.guess_type(file["filename"])[0] or "application/octet-stream",
+                "size": file["size"],
+                "file_path": FileManager.storage_path(file_id, file["filename"]),
+                "file_info": None
+            })
+        session = {"batch_id": batch_id, "created_at": time.time(), "files": entries}
+
+        with self._lock:
+            self._sessions[batch_id] = session
+        await loop.run_in_executor(None, self._save, session)
+        return await self.status(batch_id)
+
+    async def status(self, batch_id: str) -> Dict:
+        """Bytes received of every file, for a client deciding where to resume"""
+        await self._purge_if_due()
+        session = self._get(batch_id)
+        files = [self._file_status(entry) for entry in session["files"]]
+        return {
+            "batch_id": batch_id,
+            "chunk_size": settings.UPLOAD_CHUNK_SIZE_MB * 1024 * 1024,
+            "total": len(files),
+            "completed": sum(1 for file in files if file["complete"]),
+            "received_bytes": sum(file["received"] for file in files),
+            "total_bytes": sum(file["size"] for file in files),
+            "files": files
+        }
+
+    async def write_chunk(self, batch_id: str, file_id: str, offset: int, chunks: AsyncIterator[bytes]) -> Dict:
+        """Append a chunk at offset to a file, completing the file when its last byte arrives"""
+        await self._purge_if_due()
+        session = self._get(batch_id)
+        entry = next((entry for entry in session["files"] if entry["file_id"] == file_id), None)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"File {file_id} is not part of upload {batch_id}")
+
+        async with self._file_lock(file_id):
+            self._check_not_discarded(session)
+            if entry["file_info"] is not None:
+                return self._file_status(entry)
+            if entry.get("completing"):
+                # All bytes arrived before a restart but the file was not registered: finish it
+                await self._complete(session, entry, entry["completing"])
+                return self._file_status(entry)
+
+            received = self._received(entry)
+            if offset != received:
+                raise HTTPException(status_code=409, detail={"message": f"Expected offset {received}", "offset": received})
+
+            part_path = f"{entry['file_path']}.part"
+            hasher = self._hashers.pop(file_id, None)
+            if hasher is None:
+                loop = asyncio.get_running_loop()
+                hasher = await loop.run_in_executor(None, self._hash_file, part_path) if received else hashlib.sha256()
+
+            # The hash covers exactly the bytes written, so it survives a dropped connection mid-chunk
+            too_large = False
+            async with aiofiles.open(part_path, 'ab') as out_file:
+                async for chunk in chunks:
+                    if received + len(chunk) > entry["size"]:
+                        too_large = True
+                        break
+                    await out_file.write(chunk)
+                    hasher.update(chunk)
+                    received += len(chunk)
+
+            if session.get("discarded"):
+                # Discarded while the chunk was written: the .part file may have been created again
+                self._remove_quietly(part_path)
+                self._check_not_discarded(session)
+            self._hashers[file_id] = hasher
+
+            if too_large:
+                raise HTTPException(status_code=400, detail=f"Chunk runs past the declared size of {entry['filename']} ({entry['size']} bytes)")
+            if received == entry["size"]:
+                await self._complete(session, entry, self._hashers.pop(file_id).hexdigest())
+            return self._file_status(entry)
+
+    async def finalize(self, batch_id: str) -> List[Dict]:
+        """File infos of a fully uploaded batch, in declared order; ends the session"""
+        session = self._get(batch_id)
+        for entry in session["files"]:
+            if entry["file_info"] is None and entry.get("completing"):
+                async with self._file_lock(entry["file_id"]):
+                    if entry["file_info"] is None:
+                        await self._complete(session, entry, entry["completing"])
+        missing = [entry["filename"] for entry in session["files"] if entry["file_info"] is None]
+        if missing:
+            raise HTTPException(status_code=409, detail={"message": f"{len(missing)} files are incomplete", "incomplete": missing})
+
+        with self._lock:
+            self._sessions.pop(batch_id, None)
+            self._remove_quietly(self._manifest_path(batch_id))
+        return [entry["file_info"] for entry in session["files"]]
+
+    def discard(self, batch_id: str) -> None:
+        """Drop a session and its partial files (completed files belong to the batch and are cleaned up with it)"""
+        with self._lock:
+            session = self._sessions.pop(batch_id, None) or self._load(batch_id)
+            if session is None:
+                return
+            # Writers holding this session see the flag and stop before completing a file
+            session["discarded"] = True
+            for entry in session["files"]:
+                self._hashers.pop(entry["file_id"], None)
+                self._file_locks.pop(entry["file_id"], None)
+                self._remove_quietly(f"{entry['file_path']}.part")
+                if entry["file_info"] is None and entry.get("completing"):
+                    # Moved into place but never registered, so the batch cleanup does not know it
+                    self._remove_quietly(entry["file_path"])
+            self._remove_quietly(self._manifest_path(batch_id))
+
+    def purge_expired(self) -> None:
+        """Discard sessions left unfinished for longer than UPLOAD_SESSION_TTL_HOURS, with their files"""
+        if not os.path.isdir(self.sessions_dir):
+            return
+        from app.services.queue_manager import queue_manager
+
+        cutoff = time.time() - settings.UPLOAD_SESSION_TTL_HOURS * 3600
+        for filename in os.listdir(self.sessions_dir):
+            path = os.path.join(self.sessions_dir, filename)
+            if filename.endswith('.json') and os.path.getmtime(path) < cutoff:
+                batch_id = filename[:-5]
+                self.discard(batch_id)
+                FileManager.cleanup_temp_files(batch_id)
+                queue_manager.clear_batch(batch_id)
+
+    async def _purge_if_due(self) -> None:
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+                return
+            self._last_purge = now
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.purge_expired)
+
+    async def _complete(self, session: Dict, entry: Dict, sha256: str) -> None:
+        """Move a finished file into place, register it and queue it for processing
+
+        Also finishes a file marked as completing by a run that stopped part way.
+        """
+        from app.services.queue_manager import queue_manager
+
+        loop = asyncio.get_running_loop()
+        if not entry.get("completing"):
+            with self._lock:
+                entry["completing"] = sha256
+            await loop.run_in_executor(None, self._save, session)
+
+        part_path = f"{entry['file_path']}.part"
+        if os.path.exists(part_path):
+            os.replace(part_path, entry["file_path"])
+        phash = await FileManager.perceptual_hash(entry["file_path"], entry["content_type"])
+        if session.get("discarded"):
+            # Discarded while hashing: the batch cleanup has already run, so the file is not registered
+            self._remove_quietly(entry["file_path"])
+            self._check_not_discarded(session)
+
+        stored = {"file_path": entry["file_path"], "size": entry["size"], "sha256": sha256, "phash": phash}
+        file_info = await FileManager.register_stored_file(
+            entry["file_id"], entry["filename"], entry["content_type"], stored, session["batch_id"]
+        )
+        queue_manager.add_file(session["batch_id"], file_info)
+
+        with self._lock:
+            entry["file_info"] = file_info
+            entry.pop("completing", None)
+            self._file_locks.pop(entry["file_id"], None)
+        await loop.run_in_executor(None, self._save, session)
+
+    def _get(self, batch_id: str) -> Dict:
+        with self._lock:
+            session = self._sessions.get(batch_id)
+            if session is None:
+                session = self._load(batch_id)
+                if session is not None:
+                    self._sessions[batch_id] = session
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Upload {batch_id} not found")
+        return session
+
+    @staticmethod
+    def _check_not_discarded(session: Dict) -> None:
+        if session.get("discarded"):
+            raise HTTPException(status_code=410, detail=f"Upload {session['batch_id']} was discarded")
+
+    def _file_lock(self, file_id: str) -> asyncio.Lock:
+        with self._lock:
+            return self._file_locks.setdefault(file_id, asyncio.Lock())
+
+    def _received(self, entry: Dict) -> int:
+        if entry["file_info"] is not None or entry.get("completing"):
+            return entry["size"]
+        try:
+            return os.path.getsize(f"{entry['file_path']}.part")
+        except OSError:
+            return 0
+
+    def _file_status(self, entry: Dict) -> Dict:
+        return {
+            "file_id": entry["file_id"],
+            "filename": entry["filename"],
+            "size": entry["size"],
+            "received": self._received(entry),
+            "complete": entry["file_info"] is not None,
+            "duplicate_of": entry["file_info"]["duplicate_of"] if entry["file_info"] else None
+        }
+
+    @staticmethod
+    def _hash_file(path: str) -> "hashlib._Hash":
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256
+
+    def _save(self, session: Dict) -> None:
+        """Write the session manifest as it is now (runs in a worker thread)
+
+        Session fields are changed under the lock, so the manifest written is
+        always the latest state, and a discarded session is not written back.
+        """
+        with self._lock:
+            if session.get("discarded"):
+                return
+            os.makedirs(self.sessions_dir, exist_ok=True)
+            path = self._manifest_path(session["batch_id"])
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(session, f)
+            os.replace(f"{path}.tmp", path)
+
+    def _load(self, batch_id: str) -> Optional[Dict]:
+        """Read a session manifest left by an earlier run (caller holds lock)"""
+        try:
+            with open(self._manifest_path(batch_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _manifest_path(self, batch_id: str) -> str:
+        return os.path.join(self.sessions_dir, f"{os.path.basename(batch_id)}.json")
+
+    @staticmethod
+    def _remove_quietly(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+# Global instance
+upload_sessions = UploadSessions()
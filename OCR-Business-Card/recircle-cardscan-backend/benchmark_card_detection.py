@@ -0,0 +1,82 @@
+"""Benchmark local card detection and per-card crop extraction.
+
+For every image in Test_DataSet: detection time, cards found, and the bytes
+sent to the model for the whole photo vs its per-card crops. With a Gemini
+API key it also extracts each photo whole and as parallel crops, reporting
+wall time and cards returned by each.
+
+Usage: python benchmark_card_detection.py [--offline]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+
+from app.config import settings
+from app.services.card_detector import card_detector
+from app.services.image_preprocessor import ImagePreprocessor
+from benchmark_image_tiers import TEST_IMAGES
+
+
+def upload_bytes(source) -> int:
+    return len(ImagePreprocessor.prepare(source)["data"])
+
+
+async def extract_whole_and_crops(gemini_service, image_path: str) -> tuple:
+    settings.CARD_DETECTION_ENABLED = False
+    start = time.perf_counter()
+    whole = await gemini_service.extract_document_data(image_path)
+    whole_time = time.perf_counter() - start
+
+    settings.CARD_DETECTION_ENABLED = True
+    start = time.perf_counter()
+    crops = await gemini_service.extract_document_data(image_path)
+    return len(whole), whole_time, len(crops), time.perf_counter() - start
+
+
+async def main(args):
+    settings.EXTRACTION_CACHE_ENABLED = False
+    online = not args.offline and bool(settings.GEMINI_API_KEY)
+    gemini_service = None
+    if online:
+        from app.services.gemini_service import GeminiService
+        gemini_service = GeminiService()
+    else:
+        print("⚠️ Offline: detection and upload size only (set GEMINI_API_KEY for extraction timing)")
+
+    work_dir = tempfile.mkdtemp()
+    print(f"\n{'image':>28} | {'detect ms':>9} | {'cards':>5} | {'whole KB':>8} | {'crops KB':>8} | {'whole s':>7} | {'crops s':>7} | {'cards w/c':>9}")
+    print("-" * 104)
+    try:
+        for source in TEST_IMAGES:
+            image_path = os.path.join(work_dir, os.path.basename(source))
+            shutil.copy(source, image_path)
+
+            image = cv2.imread(image_path)
+            start = time.perf_counter()
+            card_detector.detect(image)
+            detect_ms = (time.perf_counter() - start) * 1000
+
+            detections = card_detector.crop_cards(image_path)
+            whole_kb = upload_bytes(image_path) / 1024
+            crops_kb = sum(upload_bytes(detection["image"]) for detection in detections) / 1024 if detections else whole_kb
+
+            timing = f"{'-':>7} | {'-':>7} | {'-':>9}"
+            if online:
+                whole_cards, whole_time, crop_cards, crop_time = await extract_whole_and_crops(gemini_service, image_path)
+                timing = f"{whole_time:7.2f} | {crop_time:7.2f} | {f'{whole_cards}/{crop_cards}':>9}"
+
+            name = source.split("Test_DataSet")[-1][-28:]
+            print(f"{name:>28} | {detect_ms:9.1f} | {len(detections):5d} | {whole_kb:8.1f} | {crops_kb:8.1f} | {timing}")
+    finally:
+        shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offline", action="store_true", help="no model calls")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+"""Benchmark the local-first extraction cascade against full vision extraction.
+
+Every image in Test_DataSet is extracted twice: once with the vision prompt
+(the reference) and once through the cascade (local text detection + regex,
+text-only prompt for missing fields, vision re-request for key fields still
+missing). Reports the share of cards resolved locally, model calls and latency
+saved, and field accuracy of the cascade relative to the vision reference.
+
+Without a Gemini API key the fake model backend is used: the local pass and
+the cascade decisions are real, but model latency is simulated and the
+accuracy column is meaningless.
+
+Usage: python benchmark_cascade.py [--detector tesseract|sidecar] [--min-confidence 0.8]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.config import settings
+from app.services.extraction_cascade import extraction_cascade
+from app.services.text_detector import get_text_detector
+from benchmark_image_tiers import FIELDS, TEST_IMAGES, field_accuracy
+
+
+async def timed(coro) -> tuple:
+    start = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - start
+
+
+async def main(args):
+    settings.EXTRACTION_CACHE_ENABLED = False
+    settings.GEMINI_STREAMING = False
+    settings.LOCAL_TEXT_DETECTOR = args.detector
+    settings.LOCAL_FIELD_MIN_CONFIDENCE = args.min_confidence
+    if not settings.GEMINI_API_KEY:
+        settings.MODEL_BACKEND = "fake"
+        print("⚠️ No GEMINI_API_KEY: using the fake model backend, accuracy is not meaningful")
+
+    if not get_text_detector().is_available():
+        print(f"❌ Text detector '{args.detector}' is not available (for tesseract: pip install pytesseract and the tesseract binary)")
+        return
+
+    from app.services.gemini_service import GeminiService
+    gemini_service = GeminiService()
+
+    print(f"📊 {len(TEST_IMAGES)} images, detector {args.detector}, min confidence {args.min_confidence}\n")
+    print(f"{'image':>28} | {'local':>5} | {'vision s':>8} | {'cascade s':>9} | {'accuracy':>8}")
+    print("-" * 72)
+
+    vision_times, cascade_times, accuracies = [], [], []
+    local_counts = {field: 0 for field in FIELDS}
+    for image_path in TEST_IMAGES:
+        settings.EXTRACTION_CASCADE_ENABLED = False
+        reference, vision_time = await timed(gemini_service.extract_business_card_data(image_path))
+
+        _, fields = await extraction_cascade.detect_fields(image_path)
+        settled = [field for field, result in fields.items() if result["confidence"] >= args.min_confidence]
+        for field in settled:
+            local_counts[field] += 1
+
+        settings.EXTRACTION_CASCADE_ENABLED = True
+        records, cascade_time = await timed(gemini_service.extract_document_data(image_path))
+
+        vision_times.append(vision_time)
+        cascade_times.append(cascade_time)
+        accuracies.append(field_accuracy(reference, records))
+        name = image_path.split("Test_DataSet")[-1][-28:]
+        print(f"{name:>28} | {len(settled):>3}/6 | {vision_time:8.2f} | {cascade_time:9.2f} | {accuracies[-1]:8.1%}")
+
+    stats = extraction_cascade.stats.get_stats()
+    cards = len(TEST_IMAGES)
+    print(f"\n🏠 Resolved locally (no model call): {stats['resolved_locally']}/{cards} ({stats['resolved_locally'] / cards:.0%})")
+    print(f"📝 Text-only prompt: {stats['text_only']}, plus vision field re-request: {stats['vision_fields']}, "
+          f"full vision fallback: {stats['fell_through']}")
+    print(f"🔢 Fields settled locally: " + ", ".join(f"{field} {count}/{cards}" for field, count in local_counts.items()))
+    print(f"⏱️ Local pass: {stats['avg_local_ms']:.0f} ms/card")
+    print(f"⏱️ Vision: {statistics.mean(vision_times):.2f}s/card, cascade: {statistics.mean(cascade_times):.2f}s/card, "
+          f"saved {sum(vision_times) - sum(cascade_times):.1f}s total")
+    print(f"🎯 Cascade accuracy vs vision: {statistics.mean(accuracies):.1%} (delta {statistics.mean(accuracies) - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detector", default="tesseract", choices=["tesseract", "sidecar"])
+    parser.add_argument("--min-confidence", type=float, default=0.8)
+    asyncio.run(main(parser.parse_args()))
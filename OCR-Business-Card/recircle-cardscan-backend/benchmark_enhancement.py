@@ -0,0 +1,90 @@
+"""Benchmark OCR image enhancement: chained PIL passes vs single-pass cv2 in the CPU pool.
+
+Per image: CPU time to load, enhance and encode for upload with the previous
+four PIL passes (Brightness, Contrast, Sharpness, UnsharpMask) and with
+ImagePreprocessor.enhance, plus PSNR between the two outputs. Batch: images
+per second when the whole Test_DataSet (repeated) is prepared the old way on
+the model client's thread pool and the new way on the process pool.
+
+Usage: python benchmark_enhancement.py [--repeat 8]
+"""
+import argparse
+import asyncio
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from app.config import settings
+from app.services.cpu_pool import cpu_pool
+from app.services.image_preprocessor import ImagePreprocessor
+from benchmark_image_tiers import TEST_IMAGES
+
+
+def legacy_enhance(image_path: str) -> Image.Image:
+    """GeminiService._enhance_image_for_ocr before the single-pass version"""
+    image = ImagePreprocessor.load_image(image_path)
+    image = ImageEnhance.Brightness(image).enhance(1.2)
+    image = ImageEnhance.Contrast(image).enhance(1.3)
+    image = ImageEnhance.Sharpness(image).enhance(1.5)
+    return image.filter(ImageFilter.UnsharpMask(radius=1, percent=150, threshold=3))
+
+
+def legacy_prepare(image_path: str) -> dict:
+    return ImagePreprocessor.encode_for_model(legacy_enhance(image_path))
+
+
+def decode(blob: dict) -> np.ndarray:
+    return np.asarray(Image.open(io.BytesIO(blob["data"])).convert("RGB")).astype(np.float64)
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = ((a - b) ** 2).mean()
+    return float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def cpu_ms(func, *args) -> tuple:
+    start = time.process_time()
+    result = func(*args)
+    return result, (time.process_time() - start) * 1000
+
+
+async def main(args):
+    cv2.setNumThreads(1)  # Same as the pool workers, so CPU times compare one core against one core
+    new_prepare = lambda path: ImagePreprocessor.prepare(path, enhance=True)
+
+    print(f"\n{'image':>28} | {'PIL ms':>7} | {'cv2 ms':>7} | {'speedup':>7} | {'PSNR dB':>7}")
+    print("-" * 70)
+    for path in TEST_IMAGES:
+        old, old_ms = cpu_ms(legacy_prepare, path)
+        new, new_ms = cpu_ms(new_prepare, path)
+        name = path.split("Test_DataSet")[-1][-28:]
+        print(f"{name:>28} | {old_ms:7.1f} | {new_ms:7.1f} | {old_ms / new_ms:6.1f}x | {psnr(decode(old), decode(new)):7.1f}")
+
+    batch = TEST_IMAGES * args.repeat
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=settings.GEMINI_MAX_CONCURRENT_CALLS) as executor:
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(executor, legacy_prepare, path) for path in batch))
+        thread_seconds = time.perf_counter() - start
+
+    # Warm the pool up so worker start-up is not counted
+    await asyncio.gather(*(cpu_pool.run(ImagePreprocessor.thumbnail, path) for path in TEST_IMAGES[:cpu_pool.max_workers]))
+    start = time.perf_counter()
+    await asyncio.gather(*(cpu_pool.run(ImagePreprocessor.prepare, path, enhance=True) for path in batch))
+    pool_seconds = time.perf_counter() - start
+    cpu_pool.shutdown()
+
+    print(f"\nBatch of {len(batch)} images:")
+    print(f"  PIL on {settings.GEMINI_MAX_CONCURRENT_CALLS} threads:     {len(batch) / thread_seconds:6.1f} images/s ({thread_seconds:.2f}s)")
+    print(f"  cv2 on {cpu_pool.max_workers} processes:   {len(batch) / pool_seconds:6.1f} images/s ({pool_seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=8, help="times the test set is repeated in the batch run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""Benchmark model upload size, latency and accuracy per image resolution tier.
+
+For each long-edge tier, every image in Test_DataSet is downscaled and
+re-encoded the way GeminiService sends it. The script reports bytes sent and,
+when a Gemini API key is configured, extraction latency and field-level
+agreement with the full-resolution extraction (used as the reference).
+
+Usage: python benchmark_image_tiers.py [--offline] [--format JPEG|WEBP] [--quality 85]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import time
+
+from app.config import settings
+from app.services.image_preprocessor import ImagePreprocessor
+
+TIERS = [0, 2048, 1600, 1280, 1024, 768]  # 0 = full resolution
+FIELDS = ["name", "phone", "email", "company", "designation", "address"]
+TEST_IMAGES = sorted(
+    glob.glob(os.path.join("..", "Test_DataSet", "**", "*.jpg"), recursive=True) +
+    glob.glob(os.path.join("..", "Test_DataSet", "**", "*.png"), recursive=True)
+)
+
+
+def normalize(field: str, value: str) -> object:
+    value = (value or "N/A").strip().lower()
+    if field in ("phone", "email"):
+        return frozenset(v.strip() for v in value.split(",") if v.strip())
+    return " ".join(value.split())
+
+
+def field_accuracy(reference: list, candidate: list) -> float:
+    """Share of reference fields reproduced exactly, card by card"""
+    matched = total = 0
+    for index, ref_card in enumerate(reference):
+        cand_card = candidate[index] if index < len(candidate) else {}
+        for field in FIELDS:
+            total += 1
+            if normalize(field, ref_card.get(field)) == normalize(field, cand_card.get(field)):
+                matched += 1
+    return matched / total if total else 1.0
+
+
+def measure_bytes(image_path: str, tier: int, image_format: str, quality: int) -> tuple:
+    start = time.perf_counter()
+    blob = ImagePreprocessor.prepare(image_path, long_edge=tier, image_format=image_format, quality=quality)
+    return len(blob["data"]), time.perf_counter() - start
+
+
+async def extract_at_tier(gemini_service, image_path: str, tier: int) -> tuple:
+    settings.MODEL_IMAGE_LONG_EDGE = tier
+    start = time.perf_counter()
+    records = await gemini_service.extract_business_card_data(image_path)
+    return records, time.perf_counter() - start
+
+
+async def main(args):
+    settings.MODEL_IMAGE_FORMAT = args.format
+    settings.MODEL_IMAGE_QUALITY = args.quality
+    online = not args.offline and bool(settings.GEMINI_API_KEY)
+
+    gemini_service = None
+    if online:
+        from app.services.gemini_service import GeminiService
+        gemini_service = GeminiService()
+
+    print(f"📊 {len(TEST_IMAGES)} images, format {args.format}, quality {args.quality}")
+    if not online:
+        print("⚠️ Offline: reporting upload size only (set GEMINI_API_KEY for latency/accuracy)")
+
+    reference = {}
+    print(f"\n{'tier':>6} | {'avg KB':>8} | {'total KB':>9} | {'prep ms':>8} | {'model s':>8} | {'accuracy':>8}")
+    print("-" * 62)
+
+    for tier in TIERS:
+        sizes, prep_times, latencies, accuracies = [], [], [], []
+
+        for image_path in TEST_IMAGES:
+            size, prep_time = measure_bytes(image_path, tier, args.format, args.quality)
+            sizes.append(size)
+            prep_times.append(prep_time)
+
+            if online:
+                records, latency = await extract_at_tier(gemini_service, image_path, tier)
+                latencies.append(latency)
+                if tier == 0:
+                    reference[image_path] = records
+                accuracies.append(field_accuracy(reference[image_path], records))
+
+        label = "full" if tier == 0 else str(tier)
+        model_col = f"{statistics.mean(latencies):8.2f}" if latencies else f"{'-':>8}"
+        accuracy_col = f"{statistics.mean(accuracies):8.1%}" if accuracies else f"{'-':>8}"
+        print(
+            f"{label:>6} | {statistics.mean(sizes) / 1024:8.1f} | {sum(sizes) / 1024:9.1f} | "
+            f"{statistics.mean(prep_times) * 1000:8.1f} | {model_col} | {accuracy_col}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offline", action="store_true", help="only measure bytes, no model calls")
+    parser.add_argument("--format", default="JPEG", choices=["JPEG", "WEBP", "PNG"])
+    parser.add_argument("--quality", type=int, default=85)
+    asyncio.run(main(parser.parse_args()))
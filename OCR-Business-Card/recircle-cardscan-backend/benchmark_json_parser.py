@@ -0,0 +1,109 @@
+"""Microbenchmark the model-response JSON parser against recorded responses.
+
+Loads responses captured with MODEL_BACKEND=record (falling back to canned
+fake-backend responses when none exist) and derives the damaged variants seen
+in production: markdown fences, unquoted N/A, trailing commas and truncation.
+Each corpus is parsed by the old inline slicing parser and by
+parse_card_records, reporting success rate, fields recovered and µs/parse.
+
+Usage: python benchmark_json_parser.py [--repeat 200]
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from app.config import settings
+from app.services.json_repair import CARD_FIELDS, parse_card_records
+from app.services.model_backends import FakeBackend
+
+
+def legacy_parse(response_text: str) -> list:
+    """The parsing previously inlined in extract_business_card_data"""
+    response_text = response_text.strip()
+    if response_text.startswith('```json'):
+        response_text = response_text[7:]
+    elif response_text.startswith('```'):
+        response_text = response_text[3:]
+    if response_text.endswith('```'):
+        response_text = response_text[:-3]
+    response_text = response_text.strip()
+    response_text = response_text.replace(': N/A,', ': "N/A",').replace(': N/A}', ': "N/A"}')
+    if '[' in response_text and ']' in response_text:
+        response_text = response_text[response_text.find('['):response_text.rfind(']') + 1]
+    elif '{' in response_text and '}' in response_text:
+        response_text = '[' + response_text[response_text.find('{'):response_text.rfind('}') + 1] + ']'
+    cards = json.loads(response_text)
+    return cards if isinstance(cards, list) else [cards]
+
+
+def new_parse(response_text: str) -> list:
+    return parse_card_records(response_text)[0]
+
+
+def load_recorded() -> list:
+    responses = []
+    for path in glob.glob(os.path.join(settings.MODEL_RECORDINGS_PATH, "*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = json.load(f)["text"]
+        if text.lstrip().startswith("["):
+            responses.append(text)
+    if responses:
+        return responses
+
+    print("⚠️ No recorded extraction responses, using canned ones")
+    return [json.dumps([FakeBackend._canned_card(str(i).encode()) for i in range(i % 3 + 1)], indent=2) for i in range(30)]
+
+
+def variants(responses: list) -> dict:
+    return {
+        "clean": responses,
+        "fenced": [f"```json\n{text}\n```" for text in responses],
+        "unquoted N/A": [text.replace('"Manager"', 'N/A').replace('"designation": "N/A"', '"designation": N/A') for text in responses],
+        "trailing comma": [text.replace('}', ',}', 1) for text in responses],
+        "truncated 90%": [text[:int(len(text) * 0.9)] for text in responses],
+        "truncated 60%": [text[:int(len(text) * 0.6)] for text in responses],
+    }
+
+
+def fields_recovered(cards: list) -> int:
+    return sum(1 for card in cards if isinstance(card, dict) for field in CARD_FIELDS if card.get(field) not in (None, ""))
+
+
+def run(parser, corpus: list, repeat: int) -> tuple:
+    ok = fields = 0
+    for text in corpus:
+        try:
+            cards = parser(text)
+            ok += 1
+            fields += fields_recovered(cards)
+        except ValueError:
+            pass
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in corpus:
+            try:
+                parser(text)
+            except ValueError:
+                pass
+    per_parse = (time.perf_counter() - start) / (repeat * len(corpus)) * 1e6
+    return ok / len(corpus), fields, per_parse
+
+
+def main(args):
+    responses = load_recorded()
+    print(f"📊 {len(responses)} responses, {args.repeat} repeats\n")
+    print(f"{'variant':>15} | {'legacy ok':>9} | {'fields':>6} | {'µs':>7} | {'new ok':>7} | {'fields':>6} | {'µs':>7}")
+    print("-" * 75)
+    for label, corpus in variants(responses).items():
+        legacy = run(legacy_parse, corpus, args.repeat)
+        new = run(new_parse, corpus, args.repeat)
+        print(f"{label:>15} | {legacy[0]:9.0%} | {legacy[1]:6d} | {legacy[2]:7.1f} | {new[0]:7.0%} | {new[1]:6d} | {new[2]:7.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
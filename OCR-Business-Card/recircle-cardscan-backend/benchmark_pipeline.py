@@ -0,0 +1,139 @@
+"""Load-test the processing pipeline against the local fake model backend.
+
+Copies the Test_DataSet images into a scratch batch of N files and runs it
+through FileProcessor.process_all_files (the /process path) and AutoProcessor
+(the WebSocket path, with an in-memory socket counting messages). No Gemini
+key is needed; latency, error rate and 429 bursts come from the FAKE_MODEL_*
+settings and can be overridden on the command line. With --replay, responses
+captured earlier with MODEL_BACKEND=record are returned instead of canned JSON.
+
+Usage: python benchmark_pipeline.py [--files 200] [--latency-ms 1500] [--error-rate 0.02]
+                                    [--429-rate 0.01] [--replay] [--skip-auto]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from app.config import settings
+
+TEST_IMAGES = sorted(
+    glob.glob(os.path.join("..", "Test_DataSet", "**", "*.jpg"), recursive=True) +
+    glob.glob(os.path.join("..", "Test_DataSet", "**", "*.png"), recursive=True)
+)
+
+
+class CountingWebSocket:
+    """In-memory WebSocket that records message types and arrival times"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.messages.append((time.perf_counter(), json.loads(text)["type"]))
+
+
+def make_batch(scratch_dir: str, count: int) -> list:
+    """Copy test images into a scratch directory as `count` distinct uploads"""
+    files_list = []
+    for index in range(count):
+        source = TEST_IMAGES[index % len(TEST_IMAGES)]
+        file_id = str(uuid.uuid4())
+        extension = os.path.splitext(source)[1]
+        file_path = os.path.join(scratch_dir, f"{file_id}{extension}")
+        shutil.copyfile(source, file_path)
+        files_list.append({
+            "file_id": file_id,
+            "filename": f"card_{index:04d}{extension}",
+            "file_path": file_path,
+            "file_type": "image/png" if extension == ".png" else "image/jpeg",
+            "file_size": os.path.getsize(file_path)
+        })
+    return files_list
+
+
+async def run_file_processor(files_list: list) -> dict:
+    from app.core.processor import FileProcessor
+
+    batch_id = f"bench-{uuid.uuid4()}"
+    start = time.perf_counter()
+    result = await FileProcessor(batch_id).process_all_files(files_list)
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "processed": result["total_processed"], "records": result["records_count"]}
+
+
+async def run_auto_processor(files_list: list) -> dict:
+    from app.services.auto_processor import AutoProcessor
+    from app.services.queue_manager import queue_manager
+    from app.services.websocket_manager import websocket_manager
+
+    batch_id = f"bench-{uuid.uuid4()}"
+    queue_manager.initialize_batch(batch_id, files_list)
+    websocket = CountingWebSocket()
+    await websocket_manager.connect(batch_id, websocket)
+
+    start = time.perf_counter()
+    await AutoProcessor().start_batch_processing(batch_id)
+    elapsed = time.perf_counter() - start
+
+    await websocket_manager.disconnect(batch_id, websocket)
+    completions = [t for t, kind in websocket.messages if kind == "extraction_complete"]
+    gaps = [b - a for a, b in zip(completions, completions[1:])]
+    return {
+        "elapsed": elapsed,
+        "messages": len(websocket.messages),
+        "completed": len(completions),
+        "errors": sum(1 for _, kind in websocket.messages if kind == "error"),
+        "median_gap": statistics.median(gaps) if gaps else 0.0
+    }
+
+
+async def main(args):
+    settings.MODEL_BACKEND = "replay" if args.replay else "fake"
+    settings.FAKE_MODEL_LATENCY_MS = args.latency_ms
+    settings.FAKE_MODEL_ERROR_RATE = args.error_rate
+    settings.FAKE_MODEL_429_RATE = args.rate_429
+    # Every file must reach the model, not the cache
+    settings.EXTRACTION_CACHE_ENABLED = False
+
+    from app.services.rate_limiter import rate_limiter
+
+    scratch_dir = tempfile.mkdtemp(prefix="cardscan_bench_")
+    try:
+        files_list = make_batch(scratch_dir, args.files)
+        print(f"📊 {len(files_list)} files, backend {settings.MODEL_BACKEND}, "
+              f"latency {args.latency_ms}ms, errors {args.error_rate:.1%}, 429 bursts {args.rate_429:.1%}")
+
+        result = await run_file_processor(files_list)
+        print(f"\n🗂️ FileProcessor.process_all_files: {result['elapsed']:.2f}s "
+              f"({result['processed'] / result['elapsed']:.1f} files/s), {result['records']} records")
+
+        if not args.skip_auto:
+            result = await run_auto_processor(files_list)
+            print(f"🔌 AutoProcessor + WebSocket: {result['elapsed']:.2f}s "
+                  f"({result['completed'] / result['elapsed']:.2f} files/s), {result['messages']} messages, "
+                  f"{result['errors']} errors, median gap {result['median_gap']:.2f}s")
+
+        print(f"\n🚦 Rate limiter: {rate_limiter.get_stats()}")
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--latency-ms", type=int, default=settings.FAKE_MODEL_LATENCY_MS)
+    parser.add_argument("--error-rate", type=float, default=settings.FAKE_MODEL_ERROR_RATE)
+    parser.add_argument("--429-rate", dest="rate_429", type=float, default=settings.FAKE_MODEL_429_RATE)
+    parser.add_argument("--replay", action="store_true", help="return recorded responses where available")
+    parser.add_argument("--skip-auto", action="store_true", help="only benchmark FileProcessor")
+    asyncio.run(main(parser.parse_args()))
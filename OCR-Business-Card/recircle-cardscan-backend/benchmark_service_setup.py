@@ -0,0 +1,93 @@
+"""Benchmark per-file service setup: fresh instances vs the shared registry.
+
+Before the registry every processed file built a new GeminiService and
+BusinessCardValidator (a new model for each, and a GeminiMemoryManager
+re-reading prompts_storage.json on the event loop). This measures that
+setup cost per file against fetching the shared instances.
+
+With a Gemini API key and --online, it also times the first model call on a
+fresh model (new HTTP channel) against a call on the reused model.
+
+Usage: python benchmark_service_setup.py [--files 300] [--online]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import statistics
+import tempfile
+import time
+
+from app.config import settings
+from app.services.business_card_validator import BusinessCardValidator
+from app.services.gemini_memory import GeminiMemoryManager, initialize_default_prompts
+from app.services.gemini_service import GeminiService
+from app.services.service_registry import get_business_card_validator, get_gemini_service, reset_services
+
+TEST_IMAGES = sorted(os.path.abspath(p) for p in glob.glob(os.path.join("..", "Test_DataSet", "**", "*.jpg"), recursive=True))
+
+
+def per_file_setup() -> None:
+    """What each file used to pay: two models, their clients and a prompt store read on the event loop"""
+    service = GeminiService()
+    service.memory = GeminiMemoryManager()
+    BusinessCardValidator()
+
+
+def shared_setup() -> None:
+    get_gemini_service()
+    get_business_card_validator()
+
+
+def time_per_file(setup, files: int) -> list:
+    timings = []
+    for _ in range(files):
+        start = time.perf_counter()
+        setup()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def time_first_call(files: int) -> None:
+    image_path = TEST_IMAGES[0]
+    settings.EXTRACTION_CACHE_ENABLED = False
+
+    fresh, reused = [], []
+    for _ in range(files):
+        reset_services()
+        start = time.perf_counter()
+        await get_gemini_service().extract_business_card_data(image_path)
+        fresh.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await get_gemini_service().extract_business_card_data(image_path)
+        reused.append(time.perf_counter() - start)
+
+    print(f"\n🌐 First call on a fresh model: {statistics.median(fresh):.2f}s median")
+    print(f"🌐 Call on the reused model:    {statistics.median(reused):.2f}s median")
+
+
+def main(args):
+    # Time against a populated prompt store, as in a deployment after /prompts/init
+    os.chdir(tempfile.mkdtemp(prefix="service_setup_"))
+    asyncio.run(initialize_default_prompts())
+    reset_services()
+
+    per_file = time_per_file(per_file_setup, args.files)
+    reset_services()
+    shared = time_per_file(shared_setup, args.files)
+
+    print(f"📊 {args.files} files")
+    print(f"🐢 Fresh instances per file: {statistics.mean(per_file) * 1000:.3f} ms/file, {sum(per_file):.2f}s total")
+    print(f"🚀 Shared registry:          {statistics.mean(shared) * 1000:.3f} ms/file, {sum(shared):.4f}s total "
+          f"(first call {shared[0] * 1000:.2f} ms)")
+
+    if args.online and settings.GEMINI_API_KEY:
+        asyncio.run(time_first_call(min(args.files, 5)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--online", action="store_true", help="also time real model calls (needs GEMINI_API_KEY)")
+    main(parser.parse_args())
@@ -0,0 +1,159 @@
+"""Calibrate the local card pre-screen thresholds.
+
+Computes pre-screen features for every image in Test_DataSet (all business
+cards) and for negatives: synthetic blank pages, noisy paper, gradients,
+phone and desktop screenshots, rectangular non-cards (a bordered window on
+a photographed monitor, bordered document pages, an empty frame) and photo
+crops without a card, plus any images in --negatives. Not-card thresholds are set with a margin below the weakest
+card, then both sets are classified. The calibration is written only when no
+card is rejected and no negative is accepted; the summary shows how many
+files of each set would skip the model call. A lone card-shaped outline only
+counts as a card once the data set has such photos to set its threshold.
+
+Usage: python calibrate_prescreen.py [--negatives DIR] [--margin 0.5] [--output PATH]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.services.card_prescreen import CARD, NOT_CARD, UNSURE, DEFAULT_THRESHOLDS, CardPrescreen
+from benchmark_image_tiers import TEST_IMAGES
+
+
+def synthetic_negatives() -> dict:
+    rng = np.random.default_rng(7)
+    blank = np.full((1600, 1200, 3), 250, np.uint8)
+    paper = np.clip(blank.astype(np.int16) + rng.normal(0, 3, blank.shape), 0, 255).astype(np.uint8)
+    gradient = np.repeat(np.linspace(40, 220, 1200, dtype=np.uint8)[None, :, None], 1600, axis=0).repeat(3, axis=2)
+
+    screenshot = np.full((2340, 1080, 3), 245, np.uint8)
+    cv2.rectangle(screenshot, (0, 0), (1080, 180), (128, 94, 18), -1)
+    for row in range(8):
+        top = 260 + row * 250
+        cv2.circle(screenshot, (110, top + 80), 60, (200, 200, 200), -1)
+        cv2.putText(screenshot, f"Contact {row + 1}", (210, top + 70), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (30, 30, 30), 3)
+        cv2.putText(screenshot, "Last seen today at 10:42", (210, top + 130), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (120, 120, 120), 2)
+
+    negatives = {"blank": blank, "paper": paper, "gradient": gradient, "dark": np.zeros((1200, 1600, 3), np.uint8), "screenshot": screenshot}
+    negatives.update(rectangular_negatives(rng))
+    # Photo corners around the cards: table, cloth, background without a card
+    for path in TEST_IMAGES[:7]:
+        image = cv2.imread(path)
+        height, width = image.shape[:2]
+        negatives[f"corner_{os.path.basename(path)}"] = image[: height // 4, : width // 4]
+    return negatives
+
+
+def _text_lines(image, left: int, top: int, right: int, bottom: int, scale: float, step: int) -> None:
+    for row, y in enumerate(range(top, bottom - step // 2, step)):
+        words = "Quarterly report: revenue, costs and outlook" if row % 2 else "Section 4.2 Terms and conditions of supply"
+        cv2.putText(image, words, (left, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (40, 40, 40), 2)
+        if row % 4 == 3:
+            cv2.line(image, (left, y + step // 3), (right, y + step // 3), (180, 180, 180), 1)
+
+
+def _photographed(image: np.ndarray, rng) -> np.ndarray:
+    """Camera noise and blur, so a rendered image no longer has flat regions"""
+    noisy = image.astype(np.int16) + rng.normal(0, 4, image.shape)
+    return cv2.GaussianBlur(np.clip(noisy, 0, 255).astype(np.uint8), (3, 3), 0)
+
+
+def rectangular_negatives(rng) -> dict:
+    """Images with one card-shaped rectangle that are not cards"""
+    # Desktop screenshot: taskbar and one bordered window with text, at 16:9
+    desktop = np.full((1080, 1920, 3), (120, 90, 40), np.uint8)
+    cv2.rectangle(desktop, (0, 1030), (1920, 1080), (30, 30, 30), -1)
+    cv2.rectangle(desktop, (260, 140), (1660, 940), (250, 250, 250), -1)
+    cv2.rectangle(desktop, (260, 140), (1660, 200), (200, 200, 200), -1)
+    cv2.rectangle(desktop, (260, 140), (1660, 940), (60, 60, 60), 3)
+    _text_lines(desktop, 300, 270, 1600, 920, 1.1, 55)
+
+    # Document pages with a bordered box: a form, and a page with a boxed table
+    form = np.full((1754, 1240, 3), 248, np.uint8)
+    _text_lines(form, 90, 120, 1150, 520, 0.9, 45)
+    cv2.rectangle(form, (90, 560), (1150, 1180), (30, 30, 30), 4)
+    _text_lines(form, 130, 640, 1110, 1150, 0.9, 45)
+    _text_lines(form, 90, 1260, 1150, 1700, 0.9, 45)
+    framed_page = np.full((1240, 1754, 3), 248, np.uint8)
+    cv2.rectangle(framed_page, (80, 80), (1674, 1160), (20, 20, 20), 5)
+    _text_lines(framed_page, 140, 180, 1600, 1120, 1.0, 50)
+
+    # Empty picture frame or whiteboard: a card-shaped outline with nothing inside
+    frame = np.full((1200, 1600, 3), 200, np.uint8)
+    frame[:] = _photographed(frame, rng)
+    cv2.rectangle(frame, (250, 250), (1350, 900), (40, 40, 40), 30)
+    cv2.rectangle(frame, (280, 280), (1320, 870), (235, 235, 235), -1)
+
+    return {
+        "desktop_screenshot": desktop,
+        "monitor_photo": _photographed(desktop, rng),
+        "document_form_scan": _photographed(form, rng),
+        "document_framed_scan": _photographed(framed_page, rng),
+        "empty_frame": _photographed(frame, rng)
+    }
+
+
+def calibrate(positives: list, margin: float) -> dict:
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds["blank_std_max"] = round(min(f["gray_std"] for f in positives) * margin, 2)
+    thresholds["min_edge_density"] = round(min(f["edge_density"] for f in positives) * margin, 4)
+    thresholds["screenshot_flat_min"] = round(max(DEFAULT_THRESHOLDS["screenshot_flat_min"], max(f["flat_share"] for f in positives) + 0.1), 3)
+    # The single-outline verdict is only enabled by cards that need it; negatives then have to stay below it
+    single = [f["card_inner_edges"] for f in positives if f["card_inner_edges"] is not None]
+    thresholds["single_card_inner_edges_min"] = round(min(single) * margin, 4) if single else None
+    return thresholds
+
+
+def main(args):
+    prescreen = CardPrescreen(calibration_path=os.devnull)
+
+    positives = {os.path.relpath(path, os.path.join("..", "Test_DataSet")): prescreen.compute_features(cv2.imread(path)) for path in TEST_IMAGES}
+    negatives = {name: prescreen.compute_features(image) for name, image in synthetic_negatives().items()}
+    if args.negatives:
+        for path in sorted(glob.glob(os.path.join(args.negatives, "*"))):
+            image = cv2.imread(path)
+            if image is not None:
+                negatives[os.path.basename(path)] = prescreen.compute_features(image)
+
+    prescreen.thresholds = calibrate(list(positives.values()), args.margin)
+
+    failures = []
+    print(f"\n{'set':>8} | {'image':>34} | {'verdict':>8} | {'std':>6} | {'edges':>6} | {'flat':>5} | {'outlines':>8}")
+    print("-" * 92)
+    summary = {}
+    for label, features_by_name, wrong in (("card", positives, NOT_CARD), ("negative", negatives, CARD)):
+        counts = {CARD: 0, NOT_CARD: 0, UNSURE: 0}
+        for name, features in features_by_name.items():
+            verdict, _ = prescreen.classify_features(features)
+            counts[verdict] += 1
+            if verdict == wrong:
+                failures.append(f"{label} {name} classified {verdict}")
+            print(f"{label:>8} | {name[-34:]:>34} | {verdict:>8} | {features['gray_std']:6.1f} | {features['edge_density']:6.4f} | "
+                  f"{features['flat_share']:5.3f} | {features['card_outlines']:8d}")
+        summary[label] = counts
+
+    print("\nThresholds:", json.dumps(prescreen.thresholds, indent=2))
+    for label, counts in summary.items():
+        decided = counts[CARD] + counts[NOT_CARD]
+        print(f"{label:>8}: {counts}  -> {decided}/{sum(counts.values())} skip the model call")
+
+    if failures:
+        print("\n❌ Not written, misclassified:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({"thresholds": prescreen.thresholds, "summary": summary}, f, indent=2)
+    print(f"\n✅ Calibration written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--negatives", help="directory of images that are not business cards")
+    parser.add_argument("--margin", type=float, default=0.5, help="not-card thresholds as a share of the weakest card")
+    parser.add_argument("--output", default=settings.PRESCREEN_CALIBRATION_PATH)
+    main(parser.parse_args())
@@ -0,0 +1,50 @@
+"""Check that extraction and validation send their own Gemini API keys.
+
+Builds the shared GeminiService and BusinessCardValidator the way the routes
+do (both before any model call), reconfigures genai globally as another
+request might, then reads the x-goog-api-key header each model's client
+attaches to its calls. No network access is needed.
+
+Usage: python check_api_keys.py
+"""
+import sys
+
+import google.generativeai as genai
+
+from app.config import settings
+from app.services.service_registry import get_business_card_validator, get_gemini_service, reset_services
+
+
+def sent_key(model) -> str:
+    """API key header the model's client adds to every request"""
+    headers = {}
+    model._client._transport._credentials.apply(headers)
+    return headers.get("x-goog-api-key")
+
+
+def main() -> int:
+    settings.MODEL_BACKEND = "gemini"
+    settings.GEMINI_API_KEY = "check-extraction-key"
+    settings.GOOGLE_API_KEY = "check-validation-key"
+    reset_services()
+
+    service = get_gemini_service()
+    validator = get_business_card_validator()
+    genai.configure(api_key="check-global-key")
+
+    failures = 0
+    for label, model, expected in [
+        ("extraction", service.model, settings.GEMINI_API_KEY),
+        ("validation", validator.model, settings.GOOGLE_API_KEY),
+    ]:
+        key = sent_key(model)
+        ok = key == expected
+        print(f"{'✅' if ok else '❌'} {label} sends {key} (expected {expected})")
+        failures += not ok
+
+    print(f"\n{2 - failures}/2 passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
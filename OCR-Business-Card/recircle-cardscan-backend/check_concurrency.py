@@ -0,0 +1,82 @@
+"""Check that parallel Gemini extractions do not block the event loop.
+
+Replaces the Gemini model with a fake that sleeps for a fixed latency, then
+runs N extractions concurrently. With the shared model client the batch should
+take roughly one model latency, not N.
+
+Usage: python check_concurrency.py [N]
+"""
+import asyncio
+import glob
+import os
+import sys
+import time
+
+from app.config import settings
+from app.services.gemini_service import GeminiService
+from app.services.business_card_validator import BusinessCardValidator
+
+# Every call must reach the fake model, not the extraction cache
+settings.EXTRACTION_CACHE_ENABLED = False
+# Keep image preparation small next to the model latency: this checks model-call overlap, not encoding
+settings.MODEL_IMAGE_LONG_EDGE = 1024
+settings.MODEL_IMAGE_FORMAT = "JPEG"
+settings.MODEL_IMAGE_QUALITY = 85
+
+MODEL_LATENCY = 1.0
+TEST_IMAGES = glob.glob(os.path.join("..", "Test_DataSet", "test1", "*.jpg"))
+
+
+class SlowFakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class SlowFakeModel:
+    """Blocking stand-in for genai.GenerativeModel"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def generate_content(self, contents, generation_config=None):
+        time.sleep(MODEL_LATENCY)
+        return SlowFakeResponse(self.text)
+
+
+async def timed(coros) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*coros)
+    return time.perf_counter() - start
+
+
+async def main(n: int):
+    gemini_service = GeminiService()
+    gemini_service.model = SlowFakeModel('[{"name": "Test User", "phone": "9876543210"}]')
+    validator = BusinessCardValidator()
+    validator.model = SlowFakeModel("Business Card: YES\nConfidence: High\nReasoning: test")
+
+    image_path = TEST_IMAGES[0]
+
+    single = await timed([gemini_service.extract_document_data(image_path)])
+    parallel = await timed([gemini_service.extract_document_data(image_path) for _ in range(n)])
+    mixed = await timed(
+        [gemini_service.extract_document_data(image_path) for _ in range(n // 2)] +
+        [validator.validate_business_card(image_path) for _ in range(n - n // 2)]
+    )
+
+    print(f"\n📊 1 extraction: {single:.2f}s")
+    print(f"📊 {n} parallel extractions: {parallel:.2f}s")
+    print(f"📊 {n} parallel extractions + validations: {mixed:.2f}s")
+
+    # Allow for image decoding/enhancement on top of the fake model latency
+    limit = single * 2
+    if parallel <= limit and mixed <= limit:
+        print(f"✅ Parallel calls overlap (limit {limit:.2f}s)")
+        return 0
+    print(f"❌ Parallel calls are serialized (limit {limit:.2f}s)")
+    return 1
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    sys.exit(asyncio.run(main(count)))
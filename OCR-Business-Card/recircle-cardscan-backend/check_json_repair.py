@@ -0,0 +1,80 @@
+"""Check the tolerant JSON parser used for model responses.
+
+Each case is a model response seen in practice (or a damaged variant of one)
+and the cards / broken fields the parser must recover from it.
+
+Usage: python check_json_repair.py
+"""
+import sys
+
+from app.services.json_repair import loads_tolerant, parse_card_records
+
+CARD = '{"name": "Amit Kumar", "phone": "9876543210", "email": "amit@company.com", "company": "Tech Solutions", "designation": "Manager", "address": "Bangalore"}'
+
+# (label, response, expected status, expected names, expected broken)
+CASES = [
+    ("clean array", f"[{CARD}]", "clean", ["Amit Kumar"], {}),
+    ("markdown fence", f"```json\n[{CARD}]\n```", "clean", ["Amit Kumar"], {}),
+    ("prose around", f"Here is the data:\n[{CARD}]\nLet me know!", "clean", ["Amit Kumar"], {}),
+    ("single object", CARD, "clean", ["Amit Kumar"], {}),
+    ("unquoted N/A", '[{"name": "A", "phone": N/A, "email": N/A}]', "repaired", ["A"], {}),
+    ("trailing commas", '[{"name": "A", "phone": "1",},]', "repaired", ["A"], {}),
+    ("smart quotes", '[{“name”: “A”, “phone”: “1”}]', "repaired", ["A"], {}),
+    ("raw newline in string", '[{"name": "A", "address": "Line 1\nLine 2"}]', "clean", ["A"], {}),
+    ("truncated in value", '[{"name": "A", "phone": "98765', "truncated", ["A"],
+     {0: ["phone", "email", "company", "designation", "address"]}),
+    ("truncated in key", '[{"name": "A", "phone": "1"}, {"name": "B", "ema', "truncated", ["A", "B"],
+     {1: ["phone", "email", "company", "designation", "address"]}),
+    ("truncated after colon", '[{"name": "A", "email":', "truncated", ["A"],
+     {0: ["phone", "email", "company", "designation", "address"]}),
+    ("truncated in bare value", '[{"name": "A", "email": N/', "truncated", ["A"],
+     {0: ["phone", "email", "company", "designation", "address"]}),
+    ("nested value", '[{"name": "A", "phone": {"mobile": "1"}}]', "clean", ["A"], {0: ["phone"]}),
+    ("fused object", '{"is_business_card": true, "cards": [{"name": "A"}]}', "clean", ["A"], {}),
+    ("bracket in prose", 'Here [note] is: [{"name":"x"}]', "clean", ["x"], {}),
+]
+
+
+def main() -> int:
+    failures = 0
+    for label, response, status, names, broken in CASES:
+        try:
+            cards, got_broken, got_status = parse_card_records(response)
+            got_names = [card.get("name") for card in cards]
+            ok = got_status == status and got_names == names and got_broken == broken
+        except ValueError as e:
+            ok, got_status, got_names, got_broken = False, f"error: {e}", [], {}
+        print(f"{'✅' if ok else '❌'} {label}: {got_status} {got_names} {got_broken}")
+        failures += not ok
+
+    # Required (schema-constrained) output: missing fields are broken
+    cards, broken, _ = parse_card_records('[{"name": "A", "phone": "1"}]', required=True)
+    ok = broken == {0: ["email", "company", "designation", "address"]}
+    print(f"{'✅' if ok else '❌'} required fields: {broken}")
+    failures += not ok
+
+    # Leading-zero landlines must stay strings
+    value, _ = loads_tolerant('[{"phone": 02240123456}]')
+    ok = value == [{"phone": "02240123456"}]
+    print(f"{'✅' if ok else '❌'} leading zero number: {value}")
+    failures += not ok
+
+    # Bare values outside JSON's number grammar must be quoted, not emitted as invalid JSON
+    value, _ = loads_tolerant('[{"name": "A", "phone": +919876543210, "fax": 1_000, "email": inf, "website": nan}]')
+    ok = value == [{"name": "A", "phone": "+919876543210", "fax": "1_000", "email": "inf", "website": "nan"}]
+    print(f"{'✅' if ok else '❌'} non-JSON numbers: {value}")
+    failures += not ok
+
+    try:
+        loads_tolerant("Sorry, I cannot read this image.")
+        print("❌ no JSON: parsed")
+        failures += 1
+    except ValueError:
+        print("✅ no JSON: ValueError")
+
+    print(f"\n{len(CASES) + 4 - failures}/{len(CASES) + 4} passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())